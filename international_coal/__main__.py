@@ -0,0 +1,10 @@
+import sys
+from pathlib import Path
+
+# the models package lives in app/, next to the Streamlit pages
+sys.path.insert(0, str(Path(__file__).resolve().parent / "app"))
+
+from models.cli import main
+
+if __name__ == "__main__":
+  sys.exit(main())
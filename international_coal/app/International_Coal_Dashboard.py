@@ -2,15 +2,17 @@ import streamlit as st
 import plotly.express as px
 import gurobipy as gp 
 from gurobipy import GRB
+import numpy as np
 import polars as pl
-from models import run_model #, explain_model_results
-from datetime import datetime
+from scipy import stats
+from models import AsyncSolver, default_instance, default_pool, default_store, default_surrogate, monte_carlo_risk, parametric_curve, pareto_frontier, sensitivity_history #, explain_model_results
 
-months = ["June", "July", "August", "September", "October"]
-bands = ["WE_offpeak", "WE_peak", "WD_offpeak", "WD_peak"]
-fuels = ["Stockpile", "Columbian","Russian", "Scottish", "Biomass"]
-cv    = {"Stockpile":25.81, "Columbian":25.12, "Russian":24.50, "Scottish":26.20, "Biomass":18.00}
-so2   = {"Stockpile":0.0138, "Columbian":0.0070, "Russian":0.0035, "Scottish":0.0172, "Biomass":0.0001}
+instance = default_instance()
+months = instance.months
+bands = instance.bands
+fuels = instance.fuel_names
+cv    = dict(instance.fuels.select("fuel", "cv").iter_rows())
+so2   = dict(instance.fuels.select("fuel", "so2").iter_rows())
 
 if "fuels" not in st.session_state:
   st.session_state.fuels = fuels
@@ -21,11 +23,80 @@ if "cv" not in st.session_state:
 if "so2" not in st.session_state:
   st.session_state.so2 = so2
 
-def dashboard():
-  # st.session_state
-  if "experiments" not in st.session_state:
-    st.session_state.experiments = {"change_log":[], "sens_var": [], "sens_const": []}  # list of dicts
+@st.fragment(run_every=0.5)
+def _rerun_when_solved(job):
+  if job.done():
+    st.rerun()
+
+@st.cache_data(max_entries=8, show_spinner="Sampling scenarios...")
+def _risk_tables(n_samples, price_vol, fuel_vol, co2_sd, rho, **scenario):
+  distributions = {
+    "price": stats.lognorm(price_vol),
+    "fuel_cost": stats.lognorm(fuel_vol),
+    "co2_price": stats.truncnorm(-scenario["co2_price"] / co2_sd, np.inf, loc=scenario["co2_price"], scale=co2_sd),
+  }
+  return monte_carlo_risk(distributions, n_samples, correlation={("price", "co2_price"): rho}, seed=0, workers=1, **scenario)
+
+@st.cache_data(max_entries=8, show_spinner="Tracing the profit curve...")
+def _profit_curve(parameter, lo, hi, **scenario):
+  return parametric_curve(parameter, lo, hi, **scenario)
+
+@st.cache_data(max_entries=8, show_spinner="Tracing the frontier...")
+def _frontier(emission, **scenario):
+  return pareto_frontier(emission, **scenario)
+
+@st.cache_resource
+def _surrogate():
+  # trained with ``make surrogate``; without one the page just waits for the solver
+  return default_surrogate()
+
+def _predicted_kpis(predicted, surrogate):
+  if not predicted["in_distribution"]:
+    st.caption("This scenario is outside the surrogate's training data, waiting for the exact solve...")
+    return
+  error = {kpi: (p90, mae) for kpi, p90, mae in surrogate.report.select("kpi", "p90_abs_error", "relative_mae").iter_rows()}
+  shown = ["total_profit", "so2_emissions", *[f for f in fuels if f in predicted]]
+  labels = {"total_profit": "Total Profit (£)", "so2_emissions": "SO2 Emissions (tons)"}
+  st.caption("Surrogate estimate while the exact solve runs, with its held-out error: ± covers 90% of errors, MAE is relative")
+  for col, kpi in zip(st.columns(len(shown)), shown):
+    p90, mae = error[kpi]
+    col.metric(f"≈ {labels.get(kpi, f'{kpi} (tons)')}", f"{predicted[kpi]:,.0f}")
+    col.caption(f"± {p90:,.0f} · MAE {mae:.1%}")
+
+def _sensitivity_views(sensitivity_var_lf, sensitivity_constr_lf, sensitivity_map_lf, sensitivity_map_buffer_lf):
+  # every table shown below, collected together once per result
+  views = {
+    "var": sensitivity_var_lf,
+    "var_by_fuel": (
+      sensitivity_var_lf
+      .group_by("Fuel")
+      .agg(
+        pl.sum("Final Value").alias("total_tons"),
+        pl.mean("RC").alias("avg_RC"),
+        pl.len().alias("n_vars")
+      )
+      .sort("total_tons", descending=True)
+    ),
+    "constr": sensitivity_constr_lf,
+    "constr_by_group": (
+      sensitivity_constr_lf
+      .group_by(pl.col("Group").alias("constraint_group"))
+      .agg(
+        pl.mean("Pi (Dual Value)").alias("avg_pi"),
+        pl.max("Pi (Dual Value)").alias("max_pi"),
+        pl.len().alias("count"),
+        ((pl.col("constraint_status")==pl.lit("binding_resource")).cast(pl.Int32)).sum().alias("n_binding"),
+        pl.mean("Slack").alias("avg_slack"),
+        pl.col("Constraint").filter(pl.col("Pi (Dual Value)")>0).alias("active_members")
+      )
+      .sort("avg_pi", descending=True)
+    ),
+    "map": sensitivity_map_lf,
+    "map_buffer": sensitivity_map_buffer_lf,
+  }
+  return dict(zip(views, pl.collect_all(list(views.values()))))
 
+def dashboard():
   ## init container ##
   experiment_section = st.container()
   llm_explain_section = st.container()
@@ -39,24 +110,12 @@ def dashboard():
     # summary = st.toggle("Summary Sensitivity Analysis", value=False, key='summary')
     with st.expander("Optional Parameters Change"):
       edited_price = st.data_editor(
-        gp.tupledict({
-          ("June","WD_peak"):36.00, ("June","WD_offpeak"):27.00, ("June","WE_peak"):33.50, ("June","WE_offpeak"):26.20,
-          ("July","WD_peak"):36.35, ("July","WD_offpeak"):27.00, ("July","WE_peak"):34.30, ("July","WE_offpeak"):26.30,
-          ("August","WD_peak"):37.65, ("August","WD_offpeak"):28.20, ("August","WE_peak"):35.65, ("August","WE_offpeak"):27.50,
-          ("September","WD_peak"):38.35, ("September","WD_offpeak"):28.50, ("September","WE_peak"):35.80, ("September","WE_offpeak"):27.65,
-          ("October","WD_peak"):43.70, ("October","WD_offpeak"):31.70, ("October","WE_peak"):38.70, ("October","WE_offpeak"):30.10,
-        }),
+        gp.tupledict(instance.price),
         column_config={'value':st.column_config.NumberColumn("Price per electricity sold (£/MWh)", min_value=0., max_value=200., step=0.01, format="%0.2f £/MWh")},
         key='edited_price'
       )
       edited_fuel_cost = st.data_editor(
-        {
-          "Stockpile":42.56,
-          "Columbian":43.93,
-          "Russian":43.80,
-          "Scottish":42.00,
-          "Biomass":73.77,
-        },
+        instance.fuel_cost,
         column_config={'value':st.column_config.NumberColumn("Cost of fuel (£/tonne)", min_value=0., max_value=200., step=0.01, format="%0.2f £/tonne")},
         key='edited_fuel_cost'
       )
@@ -64,7 +123,7 @@ def dashboard():
       decimals = st.slider("sensitivity to change", min_value=0.001, max_value=10., step=0.001, value=1.)
 
     co2_price = st.slider("CO2 Price (€/tonne)", min_value=0., max_value=300., value=15., step=decimals, key='co2_price')
-    so2_bubble_limit = st.slider("SO2 Bubble Limit (tonnes)", min_value=0, max_value=30_000, value=9_000, step=100, key='so2_bubble_limit')
+    so2_bubble_limit = st.slider("SO2 Bubble Limit (tonnes)", min_value=0, max_value=30_000, value=int(instance.so2_bubble_limit), step=100, key='so2_bubble_limit')
     so2_price = st.slider("SO2 Price (£/tonne)", min_value=0., max_value=300., value=0., step=decimals, key='so2_price')
     biomass_limit=st.slider("Biomass Limit (%)", min_value=0., max_value=1., value=.1, step=.1, key='biomass_limit')
     if so2_price:
@@ -76,9 +135,16 @@ def dashboard():
     else:
       so2_reduced_eff = 0.0
       fgd_cost = 0
+    with st.expander("Solver Pool"):
+      st.json(default_pool().stats())
     
+  if "solver" not in st.session_state:
+    # one per session; it shuts its solve thread down when the closed session's state is dropped
+    st.session_state.solver = AsyncSolver()
+  solver = st.session_state.solver
+
   with st.spinner("Running optimization model..."):
-    st.session_state.result = model, fuel_strat_df, results, biomass_share_df, sensitivity_var_lf, sensitivity_constr_lf, sensitivity_map_lf, sensitivity_map_buffer_lf = run_model( #, energy_mb
+    scenario = dict(
       roc=roc,
       fuel_cost=edited_fuel_cost,
       price=edited_price,
@@ -90,22 +156,44 @@ def dashboard():
       biomass_limit=biomass_limit,
       # summary=summary,
     )
+    job = solver.submit(**scenario)
+    surrogate = _surrogate()
+    predicted = surrogate.predict(**scenario) if surrogate is not None and not job.done() else None
+    preview = kpi_section.empty()
+    if predicted is not None:
+      with preview.container():
+        _predicted_kpis(predicted, surrogate)
+    # the first solve has nothing to fall back on, and neither has a scenario the surrogate was
+    # not trained for; later ones show the last result while solving
+    exact_only = solver.latest is None or (predicted is not None and not predicted["in_distribution"])
+    fresh = solver.wait(job, timeout=None if exact_only else 1.0)
+    if fresh:
+      preview.empty()
+    if solver.latest is None:
+      st.stop()
+    seq, _, st.session_state.result = solver.latest
+    model, fuel_strat_df, results, biomass_share_df, *sensitivity_lfs = st.session_state.result #, energy_mb
+    if st.session_state.get("sensitivity_seq") != seq:
+      st.session_state.sensitivity = _sensitivity_views(*sensitivity_lfs)
+      st.session_state.sensitivity_seq = seq
+    sensitivity = st.session_state.sensitivity
+
+  if not fresh:
+    kpi_section.info(
+      "Solving the new scenario; the estimate above is replaced when it finishes, the previous result is shown below meanwhile..."
+      if predicted is not None and predicted["in_distribution"] else "Solving the new scenario, showing the previous result meanwhile..."
+    )
+    _rerun_when_solved(job)
+  else:
     change_log = {
-      "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
       "base_case": True if all((
         roc==45,
-        edited_fuel_cost=={"Stockpile":42.56, "Columbian":43.93, "Russian":43.80, "Scottish":42.00, "Biomass":73.77},
-        edited_price==gp.tupledict({
-          ("June","WD_peak"):36.00, ("June","WD_offpeak"):27.00, ("June","WE_peak"):33.50, ("June","WE_offpeak"):26.20,
-          ("July","WD_peak"):36.35, ("July","WD_offpeak"):27.00, ("July","WE_peak"):34.30, ("July","WE_offpeak"):26.30,
-          ("August","WD_peak"):37.65, ("August","WD_offpeak"):28.20, ("August","WE_peak"):35.65, ("August","WE_offpeak"):27.50,
-          ("September","WD_peak"):38.35, ("September","WD_offpeak"):28.50, ("September","WE_peak"):35.80, ("September","WE_offpeak"):27.65,
-          ("October","WD_peak"):43.70, ("October","WD_offpeak"):31.70, ("October","WE_peak"):38.70, ("October","WE_offpeak"):30.10,
-        }),
+        edited_fuel_cost==instance.fuel_cost,
+        edited_price==instance.price,
         co2_price==15,
         so2_reduced_eff==0,
         so2_price==0,
-        so2_bubble_limit==9000,
+        so2_bubble_limit==instance.so2_bubble_limit,
         fgd_cost==0,
         biomass_limit==0.1,
       )) else False,
@@ -118,52 +206,41 @@ def dashboard():
         so2_bubble_limit=so2_bubble_limit,
         fgd_cost=fgd_cost,
         biomass_limit=biomass_limit,
-        Stockpile_cost=edited_fuel_cost['Stockpile'],
-        Columbian_cost=edited_fuel_cost['Columbian'],
-        Russian_cost=edited_fuel_cost['Russian'],
-        Scottish_cost=edited_fuel_cost['Scottish'],
-        Biomass_cost=edited_fuel_cost['Biomass'],
+        **{f"{f}_cost": edited_fuel_cost[f] for f in fuels},
         roc=roc,
         # **{f: sum(model.getVarByName(x[f,m,b]) for m in months for b in bands) for f in fuels},
       ),
       **{"_".join(key): value for key, value in edited_price.items()},
       # "summary": summary,
     }
-    st.session_state.experiments['change_log'].append(change_log)
-    st.session_state.experiments['sens_var'].append(
-      sensitivity_var_lf
-      .select(pl.lit(change_log['timestamp']).alias('timestamp'), pl.all(), base_case=pl.lit(change_log["base_case"]))
-      .with_columns(
-        BindingChange=pl.col("Binding") != pl.col("Binding").first().over("Variable"),
-        RCChange=(pl.col('RC') - pl.col('RC').first().over("Variable")).abs() > pl.lit(1e-3)
-      )
-      .collect()
-    )
-    st.session_state.experiments['sens_const'].append(
-      sensitivity_constr_lf
-      .select(pl.lit(change_log['timestamp']).alias('timestamp'), pl.all(), base_case=pl.lit(change_log["base_case"]))
-      .with_columns(
-        BindingChange=pl.col("Binding") != pl.col("Binding").first().over("Constraint"),
-        PiChange=(pl.col('Pi (Dual Value)') - pl.col('Pi (Dual Value)').first().over("Constraint")).abs() > pl.lit(1e-3)
-      )
-      .collect()
+    default_store.append(
+      job.key,
+      change_log,
+      sensitivity["var"],
+      sensitivity["constr"],
     )
 
   with experiment_section.expander("💡 Experiments Records"):
-    st.dataframe(
-      pl.DataFrame(st.session_state.experiments['change_log'])
-      .unique(pl.col("*").exclude('timestamp', 'summary')) # type: ignore
+    n_shown = st.number_input("Experiments shown", min_value=1, value=20, step=10, key='n_experiments')
+    change_log_df = (
+      default_store.scan('change_log')
       .sort('timestamp')
-      # .with_columns()
-    )
-    ## sensitivity_var_df
-    st.dataframe(
-      pl.concat(st.session_state.experiments['sens_var'])
-    )
-    ## sensitivity_constr_df
-    st.dataframe(
-      pl.concat(st.session_state.experiments['sens_const'])
+      .tail(n_shown)
+      .collect()
     )
+    st.caption(f"{len(default_store)} experiments recorded")
+    st.dataframe(change_log_df.drop('scenario_hash', 'date', strict=False))
+    shown = change_log_df['scenario_hash'].implode()
+    against = st.radio("Compare sensitivity with", ["previous", "base"], horizontal=True, key='history_against')
+    for table in ('sens_var', 'sens_const'):
+      history = (
+        sensitivity_history(default_store, table, against=against)
+        .filter(pl.col('scenario_hash').is_in(shown))
+        .drop('scenario_hash', 'date', strict=False)
+      )
+      if st.toggle("Changes only", key=f'{table}_changes_only'):
+        history = history.filter(pl.any_horizontal(pl.col('^.*Change$')))
+      st.dataframe(history.sort('timestamp').collect())
   
 #   with llm_explain_section.expander("💡 Model Explanation using Gemini-2.5"):
 #     st.markdown("## Model Explanation using Gemini-2.5")
@@ -176,13 +253,13 @@ def dashboard():
     
 #     var_col, constr_col = st.columns(2)
 #     response = explain_model_results(
-#         df=sensitivity_var_lf.collect(), prompt=f"Based on data. Please conclude Sensitivity Analysis on Variables as easy and short as possible on variables in three bullets"
+#         df=sensitivity["var"], prompt=f"Based on data. Please conclude Sensitivity Analysis on Variables as easy and short as possible on variables in three bullets"
 #     )
 #     var_col.markdown(f"""## Sensitivity Analysis on Variables
 # ###### {response.text}""", unsafe_allow_html=True)
 
 #     response = explain_model_results(
-#         df=sensitivity_constr_lf.collect(), prompt=f"Based on data. Please conclude Sensitivity Analysis on Constraints as easy and short as possible on constraints in three bullets"
+#         df=sensitivity["constr"], prompt=f"Based on data. Please conclude Sensitivity Analysis on Constraints as easy and short as possible on constraints in three bullets"
 #     )
 #     constr_col.markdown(f"""## Sensitivity Analysis on Constraints
 # ###### {response.text}""", unsafe_allow_html=True)
@@ -222,9 +299,9 @@ def dashboard():
     # st.dataframe(fuel_strat_df)
     # st.text(fuel_strat_df['Stockpile'].sum() / 600_000)
     stockpile_bar = (
-      px.bar(pl.DataFrame({'Stockpile': fuel_strat_df['Stockpile'].sum(), 'Slack': 600_000 - fuel_strat_df['Stockpile'].sum()}),
+      px.bar(pl.DataFrame({'Stockpile': fuel_strat_df['Stockpile'].sum(), 'Slack': instance.stockpile_limit - fuel_strat_df['Stockpile'].sum()}),
              x=["Stockpile", "Slack"], orientation='h', labels="", height=220)
-      .add_annotation(y=0,text=f"{fuel_strat_df['Stockpile'].sum() / 600_000:.0%}", arrowsize=0.5, font={'size': 40})
+      .add_annotation(y=0,text=f"{fuel_strat_df['Stockpile'].sum() / instance.stockpile_limit:.0%}", arrowsize=0.5, font={'size': 40})
       .update_layout(yaxis_title=None, xaxis_title=None, showlegend=False, title="Stockpile Usage", yaxis={'showticklabels': False})
     )
     st.plotly_chart(stockpile_bar)
@@ -236,27 +313,114 @@ def dashboard():
     )
     st.plotly_chart(bar_chart)
 
+    with st.expander("📈 Parametric Profit Curve"):
+      curve_ranges = {
+        "co2_price": (0., 300.),
+        "so2_price": (0., 300.),
+        "so2_bubble_limit": (0., 30_000.),
+        "biomass_limit": (0., 1.),
+      }
+      curve_param = st.selectbox("Parameter", list(curve_ranges), key='curve_param')
+      if curve_param == "so2_bubble_limit" and so2_price:
+        st.warning("The SO2 bubble is disabled while a direct SO2 price is set.")
+      elif st.toggle("Trace profit curve", key='trace_curve'):
+        curve_params = dict(
+          roc=roc,
+          fuel_cost=edited_fuel_cost,
+          price=edited_price,
+          co2_price=co2_price,
+          so2_reduced_eff=so2_reduced_eff,
+          so2_price=so2_price,
+          so2_bubble_limit=so2_bubble_limit,
+          fgd_cost=fgd_cost,
+          biomass_limit=biomass_limit,
+        )
+        curve_params.pop(curve_param)
+        segments, n_solves = _profit_curve(curve_param, *curve_ranges[curve_param], **curve_params)
+        curve = pl.concat([
+          segments.select(theta="theta_start", profit="profit_start"),
+          segments.tail(1).select(theta="theta_end", profit="profit_end"),
+        ])
+        st.plotly_chart(
+          px.line(curve, x="theta", y="profit", markers=True)
+          .update_layout(xaxis_title=curve_param, yaxis_title="Total Profit (£)")
+        )
+        st.caption(f"{segments.height} segments from {n_solves} solves")
+        st.dataframe(segments)
+
+    with st.expander("🌿 Profit vs Emissions Frontier"):
+      emission = st.radio("Emission", ["co2", "so2"], format_func=str.upper, horizontal=True, key='frontier_emission')
+      if st.toggle("Trace frontier", key='trace_frontier'):
+        frontier = _frontier(
+          emission,
+          roc=roc,
+          fuel_cost=edited_fuel_cost,
+          price=edited_price,
+          co2_price=co2_price,
+          so2_reduced_eff=so2_reduced_eff,
+          so2_price=so2_price,
+          so2_bubble_limit=so2_bubble_limit,
+          fgd_cost=fgd_cost,
+          biomass_limit=biomass_limit,
+        )
+        emissions = f"{emission}_emissions"
+        st.plotly_chart(
+          px.line(frontier, x=emissions, y="total_profit", markers=True, hover_data=["marginal_cost", *fuels])
+          .add_scatter(x=[results[emissions]], y=[results['total_profit']], mode="markers", marker_size=12, name="Current plan")
+          .update_layout(xaxis_title=f"{emission.upper()} Emissions (tonnes)", yaxis_title="Total Profit (£)", showlegend=False)
+        )
+        st.caption(f"{frontier.height} points, {frontier['iterations'].sum()} simplex iterations")
+        st.dataframe(frontier)
+
+    with st.expander("🎲 Profit Risk (Monte Carlo)"):
+      risk_cols = st.columns(5)
+      n_samples = risk_cols[0].select_slider("Samples", options=[500, 1_000, 2_000, 5_000], value=1_000, key='mc_samples')
+      price_vol = risk_cols[1].number_input("Price volatility", min_value=0.01, max_value=1., value=0.1, step=0.01, key='mc_price_vol')
+      fuel_vol = risk_cols[2].number_input("Fuel cost volatility", min_value=0.01, max_value=1., value=0.1, step=0.01, key='mc_fuel_vol')
+      co2_sd = risk_cols[3].number_input("CO2 price std (€/t)", min_value=0.1, max_value=100., value=5., step=0.5, key='mc_co2_sd')
+      rho = risk_cols[4].number_input("Price-CO2 correlation", min_value=-0.95, max_value=0.95, value=0.5, step=0.05, key='mc_rho')
+      if st.toggle("Run Monte Carlo", key='run_mc'):
+        risk = _risk_tables(
+          n_samples, price_vol, fuel_vol, co2_sd, rho,
+          roc=roc,
+          fuel_cost=edited_fuel_cost,
+          price=edited_price,
+          co2_price=co2_price,
+          so2_reduced_eff=so2_reduced_eff,
+          so2_price=so2_price,
+          so2_bubble_limit=so2_bubble_limit,
+          fgd_cost=fgd_cost,
+          biomass_limit=biomass_limit,
+        )
+        var_cols = st.columns(len(risk["risk"]) * 2)
+        for i, (alpha, var, cvar) in enumerate(risk["risk"].iter_rows()):
+          var_cols[2 * i].metric(f"VaR {alpha:.0%} (£)", f"{var:,.0f}")
+          var_cols[2 * i + 1].metric(f"CVaR {alpha:.0%} (£)", f"{cvar:,.0f}")
+        profit_col, so2_col = st.columns(2)
+        profit_col.plotly_chart(
+          px.line(risk["quantiles"], x="total_profit", y="q")
+          .update_layout(xaxis_title="Total Profit (£)", yaxis_title="Probability", title="Profit Distribution (CDF)")
+        )
+        so2_chart = (
+          px.line(risk["quantiles"], x="so2_emissions", y="q")
+          .update_layout(xaxis_title="SO2 Emissions (tonnes)", yaxis_title="Probability", title=f"SO2 vs Bubble (at bubble {risk['p_so2_at_bubble']:.0%})")
+        )
+        if np.isfinite(risk["so2_bubble_limit"]):
+          so2_chart.add_vline(x=risk["so2_bubble_limit"], line_dash="dash")
+        so2_col.plotly_chart(so2_chart)
+        st.plotly_chart(
+          px.bar(risk["binding"].filter(pl.col("binding_probability").is_between(0, 1, closed="none")).head(20), x="binding_probability", y="Constraint", orientation='h')
+          .update_layout(title="Constraints Binding in Some Samples", xaxis_title="Binding Probability", yaxis_title=None)
+        )
+        st.dataframe(risk["summary"])
+        st.caption(f"{risk['samples']:,} samples ({risk['failed']} failed) in {risk['seconds']:.1f}s")
+
     st.markdown("### Sensitivity Analysis")
     var_col, constr_col = st.columns([2,1.5])
     with var_col:
       with st.expander("Variable Sensitivity Full Table"):
-        st.dataframe(sensitivity_var_lf.collect(), height=600)
-      st.dataframe(
-        sensitivity_var_lf
-        .with_columns(
-          Fuel=pl.col("Variable").str.extract("x\[([a-zA-Z]+),([^,]+),([^\]]+)\]",1),
-          Months=pl.col("Variable").str.extract("x\[([a-zA-Z]+),([^,]+),([^\]]+)\]",2),
-          Bands=pl.col("Variable").str.extract("x\[([a-zA-Z]+),([^,]+),([^\]]+)\]",3),
-        )
-        .group_by("Fuel")
-        .agg(
-          pl.sum("Final Value").alias("total_tons"),
-          pl.mean("RC").alias("avg_RC"),
-          pl.len().alias("n_vars")
-        )
-        .sort("total_tons", descending=True)
-        .collect()
-      )
+        st.dataframe(sensitivity["var"], height=600)
+      st.dataframe(sensitivity["var_by_fuel"])
       st.text("""
   ✅ Final Value>0 & RC≈0 → model is using it.
   ⚙️ Final Value=0 & RC<0 → model wants it (blocked by constraint).
@@ -265,31 +429,15 @@ def dashboard():
 
     with constr_col:
       with st.expander("Constraint Sensitivity Full Table"):
-        st.dataframe(sensitivity_constr_lf.collect(), height=600)
-      st.dataframe(
-        sensitivity_constr_lf
-        .with_columns(
-          pl.col("Constraint").str.replace(r"\[.*\]", "").alias("constraint_group")
-        )
-        .group_by("constraint_group")
-        .agg(
-          pl.mean("Pi (Dual Value)").alias("avg_pi"),
-          pl.max("Pi (Dual Value)").alias("max_pi"),
-          pl.len().alias("count"),
-          ((pl.col("constraint_status")==pl.lit("binding_resource")).cast(pl.Int32)).sum().alias("n_binding"),
-          pl.mean("Slack").alias("avg_slack"),
-          pl.col("Constraint").filter(pl.col("Pi (Dual Value)")>0).alias("active_members")
-        )
-        .sort("avg_pi", descending=True)
-        .collect()
-      )
+        st.dataframe(sensitivity["constr"], height=600)
+      st.dataframe(sensitivity["constr_by_group"])
       st.text("""
   🟥 Binding → π ≠ 0 and slack = 0 → drives the strategy.
   🟩 Non-binding → π = 0 and slack > 0 → safe to tighten without affecting profit.""")
     
     map_col, buffer_col = st.columns([2,1.5])
     with map_col:
-      st.dataframe(sensitivity_map_lf.collect())
+      st.dataframe(sensitivity["map"])
       st.text("""
     •	total_margin_profit_gain: Approximate total profit increase if that constraint were relaxed.
     •	Large total_gain + high π = this constraint dominates the strategy.
@@ -297,7 +445,7 @@ def dashboard():
     •	Negative total_gain = relaxing that constraint actually hurts another fuel’s profit (substitution effect).""")
     
     with buffer_col:
-      st.dataframe(sensitivity_map_buffer_lf.collect())
+      st.dataframe(sensitivity["map_buffer"])
     
 
 if __name__ == "__main__":
@@ -1,7 +1,56 @@
-from .model import run_model
-# from .llm_explain import explain_model_results
+import importlib
 
-__all__ = [
-  "run_model",
-  # "explain_model_results",
-]
\ No newline at end of file
+# Public names and the submodule that defines each. Submodules are imported on first access,
+# so a batch worker that only needs ``models.sweep`` does not load the solvers, samplers and
+# stores it never uses.
+_EXPORTS = {
+  "run_model": "model",
+  "solve_model": "model",
+  "CoalPurchaseModel": "model",
+  "PurchaseLP": "model",
+  "default_pool": "model",
+  "EnvPool": "env_pool",
+  "HighsPurchaseModel": "highs",
+  "ModelResult": "results",
+  "Instance": "instance",
+  "default_instance": "instance",
+  "load_instance": "instance",
+  "save_instance": "instance",
+  "synthetic_instance": "instance",
+  "run_scenarios": "sweep",
+  "parametric_curve": "parametric",
+  "breakpoints": "parametric",
+  "ResultCache": "cache",
+  "cached_run_model": "cache",
+  "scenario_hash": "cache",
+  "fgd_decision": "fgd",
+  "ExperimentStore": "experiments",
+  "default_store": "experiments",
+  "sensitivity_history": "history",
+  "change_summary": "history",
+  "AsyncSolver": "async_solve",
+  "ModelSession": "session",
+  "stochastic_plan": "stochastic",
+  "monte_carlo_risk": "montecarlo",
+  "rolling_horizon": "rolling",
+  "fleet_decomposition": "fleet",
+  "pareto_frontier": "pareto",
+  "Surrogate": "surrogate",
+  "default_surrogate": "surrogate",
+  "load_training": "surrogate",
+  # "explain_model_results": "llm_explain",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+  if name not in _EXPORTS:
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+  value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+  globals()[name] = value
+  return value
+
+
+def __dir__():
+  return sorted(__all__)
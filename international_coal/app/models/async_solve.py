@@ -0,0 +1,97 @@
+import threading
+import time
+import weakref
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+
+import gurobipy as gp
+
+from .cache import cached_run_model, scenario_hash
+from .model import default_pool
+
+
+class AsyncSolver:
+  """Solves the most recently submitted scenario on a background thread.
+
+  Meant for one dashboard session: every rerun submits its scenario and only the newest one
+  matters. A submitted scenario waits ``debounce`` seconds before solving and is dropped if a
+  newer one arrives meanwhile; a solve that is already running is interrupted through the
+  template's ``terminate``. ``latest`` holds the last completed ``(seq, params, result)`` so the
+  page can keep showing it while a newer solve is in flight. Without a ``template`` every
+  solve leases one from ``default_pool()``; only the lease held by this solver is ever
+  interrupted.
+  """
+
+  def __init__(self, template=None, solve=cached_run_model, debounce=0.25):
+    self.template = template
+    self.solve = solve
+    self.debounce = debounce
+    self.latest = None
+    self.pending = None
+    self.superseded = 0
+    self._seq = 0
+    self._running = None
+    self._lock = threading.Lock()
+    # one worker: solves on the template never overlap
+    self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="coal-solve")
+    # an owner that drops the solver without calling shutdown (a closed dashboard session) must
+    # not leave its thread behind
+    weakref.finalize(self, self._executor.shutdown, wait=False, cancel_futures=True)
+
+  def submit(self, **params):
+    """Queue ``params`` and return its future; re-submitting the pending scenario is a no-op."""
+    key = scenario_hash(template=self.template, **params)
+    with self._lock:
+      if self.pending is not None and self.pending.key == key:
+        return self.pending
+      self._seq += 1
+      seq = self._seq
+      if self._running is not None:
+        self._running.terminate()
+    future = self._executor.submit(self._run, seq, params)
+    future.key = key
+    self.pending = future
+    return future
+
+  def _current(self, seq):
+    with self._lock:
+      return seq == self._seq
+
+  def _run(self, seq, params):
+    time.sleep(self.debounce)
+    if not self._current(seq):
+      self.superseded += 1
+      return None
+    with nullcontext(self.template) if self.template is not None else default_pool().lease_template() as template:
+      with self._lock:
+        self._running = template
+      try:
+        result = self.solve(**params, template=template)
+      except (gp.GurobiError, ValueError):
+        # an interrupted solve has no solution and is not cached; anything else is a real failure
+        if self._current(seq):
+          raise
+        self.superseded += 1
+        return None
+      finally:
+        # cleared before the lease ends, so a later terminate() cannot hit another solve
+        with self._lock:
+          self._running = None
+    with self._lock:
+      if seq >= (self.latest[0] if self.latest else 0):
+        self.latest = (seq, params, result)
+    return result
+
+  def wait(self, future, timeout=None):
+    """Wait up to ``timeout`` seconds; ``True`` once ``future`` has a result to show."""
+    try:
+      return future.result(timeout=timeout) is not None
+    except TimeoutError:
+      return False
+
+  def shutdown(self):
+    with self._lock:
+      self._seq += 1
+      if self._running is not None:
+        self._running.terminate()
+    self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,212 @@
+"""Per-phase timings, peak memory and solver statistics of the purchase model.
+
+Runs headless from the app directory::
+
+  python -m models.benchmark                                  # print the table
+  python -m models.benchmark --save benchmarks/baseline.json  # record a baseline
+  python -m models.benchmark --compare benchmarks/baseline.json
+
+``--compare`` exits with status 1 if a phase got slower than the baseline by more than
+``--threshold``.
+"""
+import argparse
+import json
+import multiprocessing
+import platform
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import gurobipy as gp
+import plotly.express as px
+import polars as pl
+
+from .highs import HighsPurchaseModel
+from .instance import synthetic_instance
+from .model import CoalPurchaseModel, solve_model
+from .results import OUTPUTS
+
+SIZES = (
+  {"n_fuels": 5, "n_months": 12, "n_bands": 2},
+  {"n_fuels": 5, "n_months": 12, "n_bands": 24},
+  {"n_fuels": 5, "n_months": 12, "n_bands": 24, "n_plants": 4},
+  {"n_fuels": 10, "n_months": 52, "n_bands": 24},
+)
+LARGE_SIZES = (
+  {"n_fuels": 10, "n_months": 365, "n_bands": 24, "hours_per_band": 1},
+)
+SCENARIOS = (
+  {},
+  {"co2_price": 40.0},
+  {"biomass_limit": 0.2, "so2_bubble_limit": 5000.0},
+  {"so2_price": 300.0, "so2_reduced_eff": 0.7, "fgd_cost": 1e6},
+)
+BACKENDS = ("gurobi", "highs")
+# Phases in the order a dashboard rerun goes through them
+PHASES = ("build", "update", "optimize", "extract", "kpis", "fuel_strategy", "biomass_share", "sensitivity_frames", "render")
+KEYS = ("n_fuels", "n_months", "n_bands", "n_plants", "hours_per_band", "backend")
+
+
+def _render(result):
+  # the dashboard's result figures, serialised as Streamlit ships them to the browser
+  figures = (
+    # narrower gaps than plotly's default so long horizons still fit one facet per month
+    px.bar(
+      result.fuel_strategy, x="Period", y=list(result.fuels), facet_col="Month",
+      facet_col_spacing=min(0.03, 0.5 / len(result.months)),
+    ),
+    px.bar(result.biomass_share, x=["Biomass_MWh", "Other_MWh"], orientation='h'),
+  )
+  for figure in figures:
+    figure.to_json()
+
+
+def _peak_rss_mb():
+  try:
+    import resource
+  except ImportError:  # Windows
+    return None
+  # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+  return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 ** 2 if sys.platform == "darwin" else 1024)
+
+
+def _run_case(size, backend, scenarios, repeat):
+  instance = synthetic_instance(**size)
+  env = gp.Env(params={"OutputFlag": 0}) if backend == "gurobi" else None
+  best, stats = {}, {}
+  for _ in range(repeat):
+    timings = {phase: 0.0 for phase in PHASES}
+    start = time.perf_counter()
+    template = CoalPurchaseModel(instance, env=env) if backend == "gurobi" else HighsPurchaseModel(instance)
+    timings["build"] = time.perf_counter() - start
+    stats = {"runtime_s": 0.0, "iterations": 0, "solver_mem_gb": None}
+    for scenario in scenarios:
+      result = solve_model(**scenario, template=template, outputs=OUTPUTS)
+      result.kpis, result.fuel_strategy, result.biomass_share, result.sensitivity_frames
+      start = time.perf_counter()
+      _render(result)
+      result.timings["render"] = time.perf_counter() - start
+      for phase in PHASES[1:]:
+        timings[phase] += result.timings[phase]
+      stats["runtime_s"] += result.solver_stats["runtime_s"]
+      stats["iterations"] += result.solver_stats["iterations"]
+      stats["solver_mem_gb"] = result.solver_stats["solver_mem_gb"]
+    # the fastest repeat is the least disturbed by the rest of the machine
+    best = {phase: min(best.get(phase, seconds), seconds) for phase, seconds in timings.items()}
+  return {
+    "n_vars": len(template.var_names),
+    "n_constrs": len(template.constr_names),
+    "status": "ok",
+    **{f"{phase}_s": seconds for phase, seconds in best.items()},
+    "total_s": sum(best.values()),
+    **stats,
+    "peak_rss_mb": _peak_rss_mb(),
+    "total_profit": result.objval,
+  }
+
+
+def run_benchmark(sizes=SIZES, backends=BACKENDS, scenarios=SCENARIOS, repeat=3):
+  """One row per (instance size, backend) with per-phase seconds, memory and solver statistics.
+
+  Phase seconds are summed over ``scenarios`` (warm re-solves of one template) and the best
+  of ``repeat`` rounds is kept. Every case runs in a fresh process, so ``peak_rss_mb`` is the
+  peak of that case alone. Sizes beyond the Gurobi license limit are reported with their error
+  in ``status``.
+  """
+  rows = []
+  # spawn, not fork: a forked Gurobi environment is not safe to reuse
+  context = multiprocessing.get_context("spawn")
+  for size in sizes:
+    for backend in backends:
+      key = {k: size.get(k) for k in KEYS[:-1]} | {"backend": backend}
+      with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        try:
+          rows.append({**key, **pool.submit(_run_case, size, backend, scenarios, repeat).result()})
+        except gp.GurobiError as e:
+          rows.append({**key, "status": str(e)})
+  return pl.DataFrame(rows, infer_schema_length=None)
+
+
+def _git_commit():
+  try:
+    return subprocess.run(
+      ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+    ).stdout.strip()
+  except (OSError, subprocess.CalledProcessError):
+    return None
+
+
+def save_baseline(results, path):
+  """Write ``run_benchmark`` results with the commit and machine they were measured on."""
+  path = Path(path)
+  path.parent.mkdir(parents=True, exist_ok=True)
+  path.write_text(json.dumps({
+    "created": datetime.now().replace(microsecond=0).isoformat(),
+    "commit": _git_commit(),
+    "machine": platform.platform(),
+    "python": platform.python_version(),
+    "gurobi": ".".join(map(str, gp.gurobi.version())),
+    "rows": results.to_dicts(),
+  }, indent=2))
+
+
+def load_baseline(path):
+  return pl.DataFrame(json.loads(Path(path).read_text())["rows"], infer_schema_length=None)
+
+
+def compare_to_baseline(results, baseline, threshold=0.25, min_seconds=0.005):
+  """Per case and phase: baseline and current seconds, their ratio and whether it regressed.
+
+  A phase regresses if it is more than ``threshold`` slower and the slowdown is more than
+  ``min_seconds``, so that sub-millisecond noise never counts.
+  """
+  columns = [f"{phase}_s" for phase in PHASES] + ["total_s"]
+  keys = [k for k in KEYS if k in results.columns and k in baseline.columns]
+
+  def long(df):
+    return (
+      df.filter(pl.col("status") == "ok")
+      .select(*keys, *[c for c in columns if c in df.columns])
+      .unpivot(index=keys, variable_name="phase", value_name="seconds")
+    )
+
+  return (
+    long(baseline).rename({"seconds": "baseline_s"})
+    .join(long(results).rename({"seconds": "current_s"}), on=[*keys, "phase"], nulls_equal=True)
+    .with_columns(ratio=pl.col("current_s") / pl.col("baseline_s"))
+    .with_columns(
+      regressed=(pl.col("ratio") > 1 + threshold) & (pl.col("current_s") - pl.col("baseline_s") > min_seconds)
+    )
+  )
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(prog="python -m models.benchmark", description=__doc__.splitlines()[0])
+  parser.add_argument("--backend", choices=BACKENDS, action="append", help="repeat for several (default: all)")
+  parser.add_argument("--large", action="store_true", help="also run the hourly-year instance")
+  parser.add_argument("--repeat", type=int, default=3)
+  parser.add_argument("--save", metavar="PATH", help="write the results as a baseline file")
+  parser.add_argument("--compare", metavar="PATH", help="compare against a baseline file")
+  parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown per phase (0.25 = 25%%)")
+  args = parser.parse_args(argv)
+
+  sizes = SIZES + LARGE_SIZES if args.large else SIZES
+  results = run_benchmark(sizes, tuple(args.backend or BACKENDS), repeat=args.repeat)
+  with pl.Config(tbl_rows=-1, tbl_cols=-1, tbl_width_chars=200):
+    print(results)
+    if args.save:
+      save_baseline(results, args.save)
+      print(f"baseline written to {args.save}")
+    if args.compare:
+      comparison = compare_to_baseline(results, load_baseline(args.compare), args.threshold)
+      regressions = comparison.filter(pl.col("regressed"))
+      print(regressions if regressions.height else "no phase regressed")
+      return 1 if regressions.height else 0
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
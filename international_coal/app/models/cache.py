@@ -0,0 +1,181 @@
+import copy
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+
+from .instance import default_instance
+from .model import solve_model
+from .results import OUTPUTS
+
+# Names of the frames returned by run_model, in return order (after the model and result dict)
+TABLES = (
+  "fuel_strat",
+  "biomass_share",
+  "sensitivity_var",
+  "sensitivity_constr",
+  "sensitivity_map",
+  "sensitivity_map_buffer",
+)
+_LAZY_TABLES = TABLES[2:]
+
+
+def _canonical(value):
+  if isinstance(value, dict):
+    return sorted(
+      [list(k) if isinstance(k, tuple) else [k], _canonical(v)]
+      for k, v in value.items()
+    )
+  if isinstance(value, np.ndarray):
+    return value.astype(float).tolist()
+  if isinstance(value, bool) or value is None:
+    return value
+  if isinstance(value, (int, float)):
+    return float(value)
+  return value
+
+
+def scenario_params(**params):
+  """Resolve ``params`` against ``run_model``'s defaults and the template's instance data.
+
+  The template itself is replaced by the fingerprint of its instance.
+  """
+  bound = inspect.signature(solve_model).bind(**params)
+  bound.apply_defaults()
+  resolved = dict(bound.arguments)
+  resolved.pop("outputs")
+  template = resolved.pop("template", None)
+  instance = template.instance if template is not None else default_instance()
+  for name in ("price", "fuel_cost", "so2_bubble_limit"):
+    if resolved[name] is None:
+      resolved[name] = getattr(instance, name)
+  resolved["instance"] = instance.fingerprint
+  return resolved
+
+
+def scenario_hash(**params):
+  """Order-independent hash of a ``run_model`` scenario, ``price`` and ``fuel_cost`` included."""
+  canonical = {k: _canonical(v) for k, v in scenario_params(**params).items()}
+  payload = json.dumps(canonical, sort_keys=True, allow_nan=True)
+  return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResultCache:
+  """Bounded in-memory LRU of solved scenarios with an optional Parquet directory tier.
+
+  Entries hold only plain data (the result dict and collected DataFrames) so they can be
+  shared between Streamlit sessions and processes. ``path`` points at a directory that
+  several processes may read and write concurrently; entries are published atomically.
+  """
+
+  def __init__(self, maxsize=128, path=None):
+    self.maxsize = maxsize
+    self.path = Path(path) if path is not None else None
+    self.hits = 0
+    self.disk_hits = 0
+    self.misses = 0
+    self._entries = OrderedDict()
+    self._lock = threading.Lock()
+    if self.path is not None:
+      self.path.mkdir(parents=True, exist_ok=True)
+
+  def stats(self):
+    return {
+      "hits": self.hits,
+      "disk_hits": self.disk_hits,
+      "misses": self.misses,
+      "size": len(self._entries),
+      "maxsize": self.maxsize,
+    }
+
+  def get(self, key):
+    with self._lock:
+      if key in self._entries:
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return self._entries[key]
+    entry = self._read(key)
+    with self._lock:
+      if entry is None:
+        self.misses += 1
+        return None
+      self.disk_hits += 1
+      self._remember(key, entry)
+    return entry
+
+  def put(self, key, entry):
+    with self._lock:
+      self._remember(key, entry)
+    self._write(key, entry)
+
+  def clear(self):
+    with self._lock:
+      self._entries.clear()
+
+  def _remember(self, key, entry):
+    self._entries[key] = entry
+    self._entries.move_to_end(key)
+    while len(self._entries) > self.maxsize:
+      self._entries.popitem(last=False)
+
+  def _read(self, key):
+    if self.path is None or not (entry_dir := self.path / key).is_dir():
+      return None
+    try:
+      result = json.loads((entry_dir / "result.json").read_text())
+      tables = {name: pl.read_parquet(entry_dir / f"{name}.parquet") for name in TABLES}
+    except (OSError, ValueError, pl.exceptions.PolarsError):
+      return None
+    return result, tables
+
+  def _write(self, key, entry):
+    if self.path is None or (self.path / key).exists():
+      return
+    result, tables = entry
+    tmp = self.path / f".{key}.{uuid.uuid4().hex}"
+    tmp.mkdir()
+    (tmp / "result.json").write_text(json.dumps(result))
+    for name, df in tables.items():
+      df.write_parquet(tmp / f"{name}.parquet")
+    try:
+      tmp.rename(self.path / key)
+    except OSError:
+      # another process published the same scenario first
+      shutil.rmtree(tmp, ignore_errors=True)
+
+
+default_cache = ResultCache(path=os.getenv("COAL_CACHE_DIR"))
+
+
+def cached_run_model(cache=None, **params):
+  """``run_model`` backed by a ``ResultCache``.
+
+  Returns the same tuple as ``run_model`` except that the model slot is ``None``: everything
+  else is plain data, with the sensitivity tables handed back as LazyFrames over the cached
+  DataFrames. Only optimal solves are cached; an infeasible or interrupted solve raises
+  ``ValueError`` and leaves the cache untouched.
+  """
+  cache = cache or default_cache
+  key = scenario_hash(**params)
+  if (entry := cache.get(key)) is None:
+    # raises ValueError before anything is cached unless the solve is optimal
+    _, *frames = solve_model(**{**params, "outputs": OUTPUTS}).as_tuple()
+    result = frames.pop(1)
+    tables = {
+      name: frame.collect() if isinstance(frame, pl.LazyFrame) else frame
+      for name, frame in zip(TABLES, frames)
+    }
+    entry = (result, tables)
+    cache.put(key, entry)
+
+  result, tables = entry
+  frames = [tables[name].lazy() if name in _LAZY_TABLES else tables[name] for name in TABLES]
+  return None, frames[0], copy.deepcopy(result), *frames[1:]
@@ -0,0 +1,115 @@
+"""Solve scenario files headless and write the results as Parquet.
+
+Run from the repository root::
+
+  python -m international_coal scenarios.json -o out/
+  python -m international_coal grid.parquet -o out/ --workers 8 --backend highs
+
+A JSON file holds a list of ``run_model`` keyword dicts (or ``{"scenarios": [...]}``); a
+Parquet file holds one scenario per row. Fuel costs may be given as a ``fuel_cost`` dict or as
+``<Fuel>_cost`` columns and prices as a nested ``price`` dict or ``<Month>_<Band>`` columns, the
+same layout ``kpis.parquet`` uses. Missing costs and prices fall back to the instance's.
+"""
+import argparse
+import json
+import shutil
+import sys
+import time
+from pathlib import Path
+
+import polars as pl
+
+from .instance import default_instance, load_instance
+from .sweep import TABLE_OUTPUTS, run_scenarios
+
+PARAMS = (
+  "roc", "fuel_cost", "price", "co2_price", "so2_reduced_eff", "fgd_cost",
+  "so2_bubble_limit", "so2_price", "exchange_rate", "biomass_limit",
+)
+DEFAULT_TABLES = ("fuel_strategy", "sensitivity_var", "sensitivity_constr")
+
+
+def _read_rows(path):
+  if path.suffix == ".parquet":
+    return pl.read_parquet(path).to_dicts()
+  data = json.loads(path.read_text())
+  return data["scenarios"] if isinstance(data, dict) else data
+
+
+def _scenario(row, instance):
+  periods = {f"{m}_{b}": (m, b) for m in instance.months for b in instance.bands}
+  scenario, fuel_cost, price = {}, {}, {}
+  for key, value in row.items():
+    if value is None:
+      continue
+    if key == "fuel_cost":
+      fuel_cost.update(value)
+    elif key == "price":
+      price.update({(m, b): p for m, bands in value.items() for b, p in bands.items()})
+    elif key.endswith("_cost") and key[:-len("_cost")] in instance.fuel_names:
+      fuel_cost[key[:-len("_cost")]] = value
+    elif key in periods:
+      price[periods[key]] = value
+    elif key in PARAMS:
+      scenario[key] = value
+    else:
+      raise ValueError(f"unknown scenario field {key!r}")
+  if fuel_cost:
+    scenario["fuel_cost"] = {**instance.fuel_cost, **fuel_cost}
+  if price:
+    scenario["price"] = {**instance.price, **price}
+  return scenario
+
+
+def scenarios_from_rows(rows, instance=None):
+  """``run_model`` keyword dicts from flat rows in the ``kpis.parquet`` layout."""
+  instance = instance or default_instance()
+  return [_scenario(row, instance) for row in rows]
+
+
+def load_scenarios(path, instance=None):
+  """``run_model`` keyword dicts from a JSON or Parquet scenario file."""
+  return scenarios_from_rows(_read_rows(Path(path)), instance)
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(prog="python -m international_coal", description=__doc__.splitlines()[0])
+  parser.add_argument("scenarios", nargs="+", type=Path, help="JSON or Parquet scenario files")
+  parser.add_argument("-o", "--out", type=Path, default=Path("results"), help="output directory (default: results)")
+  parser.add_argument("--workers", type=int, help="solver processes (default: one per core)")
+  parser.add_argument("--threads", type=int, default=1, help="solver threads per process")
+  parser.add_argument("--backend", choices=("gurobi", "highs"), default="gurobi")
+  parser.add_argument(
+    "--tables", nargs="*", choices=sorted(TABLE_OUTPUTS), default=DEFAULT_TABLES,
+    help=f"per-scenario tables to write next to kpis.parquet (default: {' '.join(DEFAULT_TABLES)})",
+  )
+  parser.add_argument("--chunk-size", type=int, default=64)
+  parser.add_argument("--instance", type=Path, help="instance JSON file or directory (default: the case study)")
+  parser.add_argument("--keep-parts", action="store_true", help="keep the per-chunk parts, so a rerun resumes")
+  args = parser.parse_args(argv)
+
+  instance = load_instance(args.instance) if args.instance else None
+  scenarios = [s for path in args.scenarios for s in load_scenarios(path, instance)]
+  parts = args.out / "parts"
+  start = time.perf_counter()
+  kpis = run_scenarios(
+    scenarios, workers=args.workers, threads=args.threads, chunk_size=args.chunk_size,
+    checkpoint_dir=parts, backend=args.backend, tables=args.tables, instance=instance,
+  )
+  kpis.write_parquet(args.out / "kpis.parquet")
+  for name in args.tables:
+    if (parts / name).exists():
+      pl.scan_parquet(parts / name / "*.parquet").sort("scenario_id", maintain_order=True).sink_parquet(args.out / f"{name}.parquet")
+  if not args.keep_parts:
+    shutil.rmtree(parts)
+
+  failed = kpis.filter(pl.col("status") != "optimal").height if kpis.height else 0
+  print(
+    f"{len(scenarios)} scenarios in {time.perf_counter() - start:.1f}s, {failed} failed; "
+    f"wrote {', '.join(['kpis', *args.tables])} to {args.out}"
+  )
+  return 1 if failed else 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
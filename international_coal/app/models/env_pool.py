@@ -0,0 +1,98 @@
+import atexit
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import gurobipy as gp
+
+DEFAULT_PARAMS = {"OutputFlag": 0, "Threads": 1, "Method": -1}
+
+
+class _Slot:
+  def __init__(self, env):
+    self.env = env
+    self.template = None
+
+
+class EnvPool:
+  """A fixed number of pre-started Gurobi environments, leased out one solve at a time.
+
+  Every environment is started once with ``params`` (``Threads``, ``OutputFlag``, ``Method``
+  ...), so solves never pay environment start-up or an extra license checkout, and at most
+  ``size`` license sessions are in use however many users are connected. A lease waits up
+  to ``timeout`` seconds for a free environment and raises ``TimeoutError`` after that.
+  With ``build_template`` each environment also keeps one model, built on first use, for
+  ``lease_template``.
+  """
+
+  def __init__(self, size=2, params=None, timeout=30.0, build_template=None):
+    self.size = size
+    self.build_template = build_template
+    self.timeout = timeout
+    self.params = {**DEFAULT_PARAMS, **(params or {})}
+    self._free = queue.Queue()
+    for _ in range(size):
+      self._free.put(_Slot(gp.Env(params=self.params)))
+    self._lock = threading.Lock()
+    self._waiting = 0
+    self._stats = {"leases": 0, "timeouts": 0, "max_waiting": 0, "total_wait_s": 0.0, "max_wait_s": 0.0}
+
+  @contextmanager
+  def _slot(self, timeout):
+    timeout = self.timeout if timeout is None else timeout
+    with self._lock:
+      self._waiting += 1
+      self._stats["max_waiting"] = max(self._stats["max_waiting"], self._waiting)
+    start = time.perf_counter()
+    try:
+      slot = self._free.get(timeout=timeout)
+    except queue.Empty:
+      with self._lock:
+        self._stats["timeouts"] += 1
+      raise TimeoutError(f"no Gurobi environment free after {timeout:g}s ({self.size} in pool)") from None
+    finally:
+      waited = time.perf_counter() - start
+      with self._lock:
+        self._waiting -= 1
+    with self._lock:
+      self._stats["leases"] += 1
+      self._stats["total_wait_s"] += waited
+      self._stats["max_wait_s"] = max(self._stats["max_wait_s"], waited)
+    try:
+      yield slot
+    finally:
+      self._free.put(slot)
+
+  @contextmanager
+  def lease(self, timeout=None):
+    """Borrow an environment for one build-and-solve."""
+    with self._slot(timeout) as slot:
+      yield slot.env
+
+  @contextmanager
+  def lease_template(self, timeout=None):
+    """Borrow the template that lives on a pooled environment."""
+    with self._slot(timeout) as slot:
+      if slot.template is None:
+        slot.template = self.build_template(slot.env)
+      yield slot.template
+
+  def stats(self):
+    with self._lock:
+      stats = dict(self._stats)
+      waiting = self._waiting
+    return {
+      "size": self.size,
+      "in_use": self.size - self._free.qsize(),
+      "waiting": waiting,
+      **stats,
+      "mean_wait_s": stats["total_wait_s"] / stats["leases"] if stats["leases"] else 0.0,
+    }
+
+
+def worker_env(threads=1):
+  """A silent environment for the life of a worker process, disposed when the process exits."""
+  env = gp.Env(params={**DEFAULT_PARAMS, "Threads": threads})
+  atexit.register(env.dispose)
+  return env
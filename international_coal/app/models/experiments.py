@@ -0,0 +1,101 @@
+import os
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import polars as pl
+
+# Tables of one experiment: its scenario/KPI row and the two sensitivity reports
+EXPERIMENT_TABLES = ("change_log", "sens_var", "sens_const")
+
+
+class ExperimentStore:
+  """Append-only Parquet store of dashboard experiments, partitioned by date.
+
+  Every table lives under ``path/<table>/date=YYYY-MM-DD/<scenario_hash>.parquet`` (until
+  ``compact`` merges a day into one part) and carries ``timestamp`` and ``scenario_hash`` columns. A scenario is written once: later
+  runs of the same scenario are dropped, so the history holds one row set per distinct
+  scenario. Reads are lazy ``scan_parquet`` queries over the whole dataset.
+  """
+
+  def __init__(self, path):
+    self.path = Path(path)
+    self._seen = None
+    self._lock = threading.Lock()
+
+  def _files(self, table):
+    return sorted((self.path / table).glob("date=*/*.parquet"))
+
+  def seen(self):
+    """Scenario hashes already in the store."""
+    with self._lock:
+      if self._seen is None:
+        self._seen = set(self.scan("change_log").select("scenario_hash").collect().to_series())
+      return self._seen
+
+  def append(self, scenario_hash, change_log, sens_var, sens_const, timestamp=None):
+    """Record one experiment; returns ``False`` if the scenario is already stored."""
+    if scenario_hash in self.seen():
+      return False
+    # full resolution: the history orders experiments by it
+    timestamp = timestamp or datetime.now()
+    frames = {
+      "change_log": pl.DataFrame([change_log]).with_columns(pl.selectors.numeric().cast(pl.Float64)),
+      "sens_var": sens_var,
+      "sens_const": sens_const,
+    }
+    # the change log goes last: a scenario only counts as stored once its log row exists
+    for table in ("sens_var", "sens_const", "change_log"):
+      df = frames[table]
+      df = df.collect() if isinstance(df, pl.LazyFrame) else df
+      partition = self.path / table / f"date={timestamp:%Y-%m-%d}"
+      partition.mkdir(parents=True, exist_ok=True)
+      tmp = partition / f".{scenario_hash}.{uuid.uuid4().hex}"
+      df.select(
+        pl.lit(timestamp).alias("timestamp"), pl.lit(scenario_hash).alias("scenario_hash"), pl.all()
+      ).write_parquet(tmp)
+      tmp.replace(partition / f"{scenario_hash}.parquet")
+    with self._lock:
+      self._seen.add(scenario_hash)
+    return True
+
+  def scan(self, table):
+    """Lazy view of one table across all dates (empty if nothing was recorded yet)."""
+    if table not in EXPERIMENT_TABLES:
+      raise ValueError(f"unknown table {table!r}; choose from {EXPERIMENT_TABLES}")
+    if not (files := self._files(table)):
+      return pl.LazyFrame(schema={"timestamp": pl.Datetime("us"), "scenario_hash": pl.String})
+    # union of the file schemas, so a column that first appears in a later experiment is kept
+    schema = {}
+    for f in files:
+      for name, dtype in pl.read_parquet_schema(f).items():
+        if schema.get(name, pl.Null) == pl.Null:
+          schema[name] = dtype
+    return pl.scan_parquet(
+      self.path / table / "**" / "*.parquet",
+      schema=schema,
+      hive_partitioning=True,
+      missing_columns="insert",
+    )
+
+  def compact(self):
+    """Merge each date partition into one file so scans open a few files, not one per experiment.
+
+    Run it while no other process is appending.
+    """
+    for table in EXPERIMENT_TABLES:
+      for partition in sorted((self.path / table).glob("date=*")):
+        if len(files := sorted(partition.glob("*.parquet"))) < 2:
+          continue
+        tmp = partition / f".part-{uuid.uuid4().hex}"
+        pl.concat([pl.read_parquet(f) for f in files], how="diagonal_relaxed").write_parquet(tmp)
+        tmp.replace(partition / f"part-{uuid.uuid4().hex}.parquet")
+        for f in files:
+          f.unlink()
+
+  def __len__(self):
+    return len(self.seen())
+
+
+default_store = ExperimentStore(os.getenv("COAL_EXPERIMENTS_DIR", ".experiments"))
@@ -0,0 +1,120 @@
+import inspect
+from contextlib import nullcontext
+
+from gurobipy import GRB
+import numpy as np
+import polars as pl
+
+from .model import CoalPurchaseModel, default_pool, solve_model
+from .sweep import run_scenarios
+
+
+def _options_frame(options):
+  df = pl.DataFrame(options, schema={"option": pl.String, "so2_reduced_eff": pl.Float64, "fgd_cost": pl.Float64})
+  # run_model treats an FGD without cost or efficiency as no FGD at all
+  return df.filter((pl.col("so2_reduced_eff") > 0) & (pl.col("fgd_cost") > 0))
+
+
+def _base_params(params):
+  bound = inspect.signature(solve_model).bind(**params)
+  bound.apply_defaults()
+  return {
+    k: v for k, v in bound.arguments.items()
+    if k not in ("summary", "template", "outputs", "so2_reduced_eff", "fgd_cost")
+  }
+
+
+def _so2_upper_bound(template):
+  # most SO2 any plan can emit: every band at capacity on its dirtiest fuel per MWh
+  tons_at_capacity = template.instance.cap_mw * template.hours[None, :, :] / (template.k * template.cv[:, None, None])
+  return float((template.so2[:, None, None] * tons_at_capacity).max(axis=0).sum())
+
+
+def _solve_mip(options, params, instance, env):
+  # the MIP adds rows and binaries, so it gets its own model rather than a pooled template
+  template = CoalPurchaseModel(instance, env=env)
+  template.update(**template.resolve({**params, "so2_reduced_eff": 0.0, "fgd_cost": 0.0}))
+  model = template.model
+  so2_price = template.params["so2_price"]
+  names = options["option"].to_list()
+  so2_max = _so2_upper_bound(template)
+  so2_row = template.so2[template.col_fuel]
+
+  # Variables
+  invest = model.addVars(names, vtype=GRB.BINARY, obj=(-options["fgd_cost"]).to_list(), name='invest_fgd')
+  removed = model.addVars(names, lb=0, obj=so2_price, name='so2_removed')
+
+  # Constraints
+  # removed SO2 counts against the bubble; it is at most eff * raw SO2 and zero unless built
+  for name, eff in options.select("option", "so2_reduced_eff").iter_rows():
+    model.chgCoeff(template.sulphur_constr, removed[name], -1.0)
+    model.addMConstr(
+      np.append(-eff * so2_row, 1.0)[None, :], template._x_list + [removed[name]],
+      GRB.LESS_EQUAL, np.zeros(1), name=[f"FGD_Removal[{name}]"]
+    )
+    model.addConstr(removed[name] <= eff * so2_max * invest[name], name=f"FGD_Build[{name}]")
+  model.addConstr(invest.sum() <= 1, name='FGD_One_Option')
+
+  model.optimize()
+  if model.Status != GRB.OPTIMAL:
+    raise ValueError(f"FGD decision: {template.status_name}")
+  chosen = next((name for name in names if invest[name].X > 0.5), None)
+  profit = model.ObjVal
+
+  # value of investing: same model with every build decision switched off
+  model.setAttr("UB", list(invest.values()), [0.0] * len(names))
+  model.optimize()
+  if model.Status != GRB.OPTIMAL:
+    raise ValueError(f"FGD decision without investment: {template.status_name}")
+  return chosen, profit, model.ObjVal
+
+
+def fgd_decision(options, mode="mip", workers=None, instance=None, env=None, **params):
+  """Choose among FGD build options (or none) for one scenario.
+
+  ``options`` is an iterable of dicts with ``option``, ``so2_reduced_eff`` and ``fgd_cost``.
+  ``mode="mip"`` adds one binary per option, linked to the removed SO2 through big-M
+  rows, and solves a single MIP. ``mode="decomposed"`` solves the LP for every option plus
+  no-investment in parallel through ``run_scenarios`` and picks the best; it also returns
+  the per-option profits as ``candidates``. The other ``run_model`` parameters are
+  taken from ``params``.
+  """
+  options = _options_frame(list(options))
+  params = _base_params(params)
+
+  if mode == "mip":
+    with nullcontext(env) if env is not None else default_pool().lease() as env:
+      chosen, profit, no_invest = _solve_mip(options, params, instance, env)
+    candidates = None
+  elif mode == "decomposed":
+    base = {k: v for k, v in params.items() if v is not None}
+    scenarios = [base, *({**base, **option} for option in options.drop("option").to_dicts())]
+    solved = run_scenarios(scenarios, workers=workers or min(len(scenarios), 4), chunk_size=1, instance=instance)
+    if solved["status"][0] != "optimal":
+      raise ValueError(f"FGD decision without investment: {solved['status'][0]}")
+    candidates = (
+      solved
+      .select(pl.when(pl.col("status") == "optimal").then("total_profit").alias("total_profit"))
+      .with_columns(
+        option=pl.Series([None, *options["option"]], dtype=pl.String),
+        so2_reduced_eff=pl.Series([0.0, *options["so2_reduced_eff"]]),
+        fgd_cost=pl.Series([0.0, *options["fgd_cost"]]),
+      )
+      .select("option", "so2_reduced_eff", "fgd_cost", "total_profit")
+    )
+    best = candidates.row(candidates["total_profit"].arg_max(), named=True)
+    chosen, profit, no_invest = best["option"], best["total_profit"], candidates["total_profit"][0]
+  else:
+    raise ValueError(f"unknown mode {mode!r}; use 'mip' or 'decomposed'")
+
+  choice = options.filter(pl.col("option").eq_missing(chosen)).to_dicts()
+  return {
+    "mode": mode,
+    "option": chosen,
+    "so2_reduced_eff": choice[0]["so2_reduced_eff"] if choice else 0.0,
+    "fgd_cost": choice[0]["fgd_cost"] if choice else 0.0,
+    "total_profit": round(profit, 2),
+    "no_invest_profit": round(no_invest, 2),
+    "value_of_investing": round(profit - no_invest, 2),
+    "candidates": candidates,
+  }
@@ -0,0 +1,290 @@
+import dataclasses
+import inspect
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import gurobipy as gp
+from gurobipy import GRB
+import numpy as np
+import polars as pl
+
+from .env_pool import worker_env
+from .instance import default_instance
+from .model import CoalPurchaseModel, PurchaseLP, solve_model
+from .results import ModelResult
+
+METHODS = ("subgradient", "bundle")
+# Shared resources priced by the multipliers, in (stockpile, SO2) order
+RESOURCES = ("stockpile", "so2")
+# Bundle: share of the predicted decrease a step must achieve to move the centre
+SERIOUS_STEP = 0.1
+
+
+class _Plants:
+  """Warm templates of some plants of a fleet, re-solved at given prices and caps."""
+
+  def __init__(self, fleet, indices, base, backend, threads, env):
+    if backend == "highs":
+      from .highs import HighsPurchaseModel
+      build = lambda inst: HighsPurchaseModel(inst, threads=threads)
+    else:
+      build = lambda inst: CoalPurchaseModel(inst, env=env)
+    self.templates = {i: build(fleet[i]) for i in indices}
+    self.resolved = {i: t.resolve(base) for i, t in self.templates.items()}
+
+  def solve(self, requests):
+    """``(plant, charges, caps, want_x)`` per request; per-tonne charges and caps per resource."""
+    return [self._solve(*request) for request in requests]
+
+  def _solve(self, i, charges, caps, want_x):
+    t, p = self.templates[i], self.resolved[i]
+    stockpile = t.instance.stockpile_fuel
+    t.update(**{
+      **p,
+      "fuel_cost": {**p["fuel_cost"], stockpile: p["fuel_cost"][stockpile] + charges[0]},
+      "so2_price": p["so2_price"] + charges[1],
+      "so2_bubble_limit": caps[1],
+    })
+    t._set_rhs(t.stockpile_row, caps[0])
+    start = time.perf_counter()
+    t.optimize()
+    seconds = time.perf_counter() - start
+    result = ModelResult(t, outputs={"fuel_strategy"} if want_x else set())
+    X = result.X
+    use = np.array([
+      X[t.fuels.index(stockpile)].sum(),
+      (1 - p["so2_reduced_eff"]) * (t.so2[:, None, None] * X).sum(),
+    ])
+    return {
+      "plant": i,
+      "value": result.objval,
+      "profit": result.objval + charges @ use,
+      "use": use,
+      "seconds": seconds,
+      "iterations": result.solver_stats["iterations"],
+      "fuel_strategy": result.fuel_strategy if want_x else None,
+    }
+
+
+# The plants pinned to this worker process
+_worker = None
+
+
+def _init_worker(fleet, indices, base, backend, threads):
+  global _worker
+  _worker = _Plants(fleet, indices, base, backend, threads, worker_env(threads) if backend == "gurobi" else None)
+
+
+def _solve_requests(requests):
+  return _worker.solve(requests)
+
+
+def _allocate(use, limit, weights):
+  # split a shared limit between plants: scale usage down if over, share the rest by capacity
+  total = use.sum()
+  if not np.isfinite(limit):
+    return np.full(use.size, limit)
+  if total > limit:
+    return use * limit / total
+  return use + (limit - total) * weights
+
+
+def _bundle_step(cuts, centre, weight, env):
+  # proximal master: min r + weight/2 |mu - centre|^2, r above every cut, mu >= 0
+  master = gp.Model('fleet_bundle', env=env)
+  mu = master.addMVar(len(centre), lb=0)
+  r = master.addVar(lb=-GRB.INFINITY)
+  for value, grad, point in cuts:
+    master.addConstr(r >= value + grad @ (mu - point))
+  master.setObjective(r + weight / 2 * ((mu - centre) @ (mu - centre)), GRB.MINIMIZE)
+  master.optimize()
+  return mu.X, r.X
+
+
+def fleet_decomposition(
+    fleet=None,
+    method="subgradient",
+    workers=None,
+    threads=1,
+    max_iterations=100,
+    tol=1e-4,
+    backend="gurobi",
+    stockpile_limit=None,
+    instance=None,
+    env=None,
+    progress=None,
+    **params,
+  ):
+  """Fleet purchase plan with a shared stockpile and SO2 bubble, by Lagrangian decomposition.
+
+  ``fleet`` is a list of per-plant instances; by default every row of ``instance.plants``
+  becomes one plant of an otherwise identical instance. All plants draw on one stockpile
+  allowance (``stockpile_limit``, default the instance's) and one SO2 bubble
+  (``so2_bubble_limit``); the other ``params`` are ``run_model`` parameters applied to each
+  plant. The two shared rows are relaxed with multipliers (£ per tonne) and the plants are
+  solved separately, in parallel across ``workers`` processes that each keep warm templates
+  of the same plants. ``method="subgradient"`` moves the multipliers by Polyak steps,
+  ``"bundle"`` by a proximal bundle master, whose stability centre is the reported
+  multipliers. Every iteration also splits the shared limits between plants in proportion to
+  their use and re-solves them under those caps, which gives a feasible plan and a lower
+  bound; it stops when the relative gap to the Lagrangian bound is below ``tol``.
+  ``progress(iteration, gap)`` is called after every iteration.
+  """
+  if method not in METHODS:
+    raise ValueError(f"unknown method {method!r}; choose from {METHODS}")
+  if backend not in ("gurobi", "highs"):
+    raise ValueError(f"unknown backend {backend!r}; use 'gurobi' or 'highs'")
+  instance = instance or default_instance()
+  if fleet is None:
+    fleet = [dataclasses.replace(instance, plants=instance.plants[i:i + 1]) for i in range(instance.plants.height)]
+  bound = inspect.signature(solve_model).bind(**params)
+  bound.apply_defaults()
+  base = {k: v for k, v in bound.arguments.items() if k not in ("summary", "template", "outputs")}
+  resolved = PurchaseLP(instance).resolve(base)
+  limits = np.array([
+    float(stockpile_limit if stockpile_limit is not None else instance.stockpile_limit),
+    float(resolved["so2_bubble_limit"]),
+  ])
+  shared = np.isfinite(limits)
+  # multipliers are stepped in units of the limits so both resources move at a comparable pace
+  scale = np.where(shared, limits, 1.0)
+  weights = np.array([p.cap_mw for p in fleet]) / sum(p.cap_mw for p in fleet)
+  n = len(fleet)
+  workers = min(n, workers or os.cpu_count() or 1)
+
+  # an environment made here, for the in-process plants or the bundle master, is disposed on
+  # the way out
+  owned = None
+  if env is None and (method == "bundle" or (workers == 1 and backend == "gurobi")):
+    env = owned = gp.Env(params={"OutputFlag": 0, "Threads": threads})
+  pools = None
+  try:
+    groups = [list(range(w, n, workers)) for w in range(workers)]
+    if workers == 1:
+      local = _Plants(fleet, range(n), base, backend, threads, env)
+      evaluate = lambda requests: local.solve(requests)
+    else:
+      # spawn, not fork: a forked Gurobi environment is not safe to reuse; one process per group
+      # keeps every plant on the same warm template
+      context = multiprocessing.get_context("spawn")
+      pools = [
+        ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=_init_worker,
+                            initargs=(fleet, group, base, backend, threads))
+        for group in groups
+      ]
+      def evaluate(requests):
+        by_plant = {r[0]: r for r in requests}
+        futures = [
+          pool.submit(_solve_requests, [by_plant[i] for i in group if i in by_plant])
+          for pool, group in zip(pools, groups)
+        ]
+        return sorted((r for f in futures for r in f.result()), key=lambda r: r["plant"])
+
+    plant_stats = {i: {"solves": 0, "solve_s": 0.0, "iterations": 0} for i in range(n)}
+
+    def run(requests):
+      results = evaluate(requests)
+      for r in results:
+        stats = plant_stats[r["plant"]]
+        stats["solves"] += 1
+        stats["solve_s"] += r["seconds"]
+        stats["iterations"] += r["iterations"]
+      return results
+
+    mu = np.zeros(2)
+    upper, lower, best = np.inf, -np.inf, None
+    theta, stalled = 2.0, 0
+    cuts, centre, centre_value, prox = [], None, None, None
+    history = []
+    start = time.perf_counter()
+    for iteration in range(1, max_iterations + 1):
+      charges = mu / scale
+      relaxed = run([(i, charges, limits, False) for i in range(n)])
+      use = np.array([r["use"] for r in relaxed])
+      dual = sum(r["value"] for r in relaxed) + charges @ np.where(shared, limits, 0.0)
+      grad = np.where(shared, (limits - use.sum(axis=0)) / scale, 0.0)
+      if dual < upper:
+        upper, stalled = dual, 0
+      else:
+        stalled += 1
+      if method == "bundle":
+        cuts.append((dual, grad, mu.copy()))
+        if prox is None:
+          centre, centre_value = mu.copy(), dual
+        elif centre_value - dual >= SERIOUS_STEP * (centre_value - predicted):
+          # serious step: move the centre, and trust the model further if it predicted well
+          if centre_value - dual >= 0.5 * (centre_value - predicted):
+            prox /= 2
+          centre, centre_value = mu.copy(), dual
+        else:
+          prox *= 2
+
+      # Lagrangian heuristic: cap every plant at its share of the shared limits
+      caps = np.column_stack([_allocate(use[:, k], limits[k], weights) for k in range(2)])
+      repaired = run([(i, np.zeros(2), caps[i], True) for i in range(n)])
+      profit = sum(r["profit"] for r in repaired)
+      if profit > lower:
+        lower, best = profit, repaired
+      gap = (upper - lower) / max(1.0, abs(upper))
+      history.append({
+        "iteration": iteration,
+        "upper": upper,
+        "lower": lower,
+        "gap": gap,
+        "dual": dual,
+        **{f"{k}_price": c for k, c in zip(RESOURCES, charges)},
+        **{f"{k}_use": u for k, u in zip(RESOURCES, use.sum(axis=0))},
+      })
+      if progress is not None:
+        progress(iteration, gap)
+      if gap <= tol or not grad.any():
+        break
+
+      if method == "subgradient":
+        # Polyak step towards the best known plan, halved whenever the bound stalls; a slack
+        # resource whose price is already zero would only shrink the step, so it is left out
+        if stalled >= 5:
+          theta, stalled = theta / 2, 0
+        direction = np.where((mu <= 0) & (grad > 0), 0.0, grad)
+        if not direction.any():
+          break
+        mu = np.maximum(0.0, mu - theta * (dual - lower) / (direction @ direction) * direction)
+      else:
+        if prox is None:
+          # first trial step the size of a Polyak step
+          prox = (grad @ grad) / max(dual - lower, 1e-9)
+        mu, predicted = _bundle_step(cuts, centre, prox, env)
+  finally:
+    if pools is not None:
+      for pool in pools:
+        pool.shutdown()
+    if owned is not None:
+      owned.dispose()
+
+  plants = pl.DataFrame([
+    {
+      "plant": fleet[r["plant"]].plants["plant"][0],
+      "cap_mw": fleet[r["plant"]].cap_mw,
+      "profit": round(r["profit"], 2),
+      "stockpile": r["use"][0],
+      "so2": r["use"][1],
+      **plant_stats[r["plant"]],
+    }
+    for r in best
+  ])
+  return {
+    "total_profit": round(lower, 2),
+    "upper_bound": round(upper, 2),
+    "gap": gap,
+    "iterations": iteration,
+    "seconds": time.perf_counter() - start,
+    "multipliers": dict(zip(RESOURCES, ((mu if centre is None else centre) / scale).tolist())),
+    "plants": plants,
+    "history": pl.DataFrame(history),
+    "fuel_strategy": pl.concat([
+      r["fuel_strategy"].select(pl.lit(name).alias("plant"), pl.all())
+      for name, r in zip(plants["plant"], best)
+    ]),
+  }
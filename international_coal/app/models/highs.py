@@ -0,0 +1,151 @@
+import time
+
+import highspy
+import numpy as np
+import scipy.sparse as sp
+
+from .model import PurchaseLP
+
+
+class HighsPurchaseModel(PurchaseLP):
+  """The purchase LP on the open-source HiGHS solver, a drop-in ``template`` for ``solve_model``.
+
+  The sparse row blocks are handed to HiGHS in one ``passModel`` call and scenarios are
+  applied with ``changeColsCost``/``changeRowBounds``/``changeCoeff``, so re-solves start
+  from the previous basis as with Gurobi. Duals, reduced costs and objective ranging come
+  from HiGHS and follow Gurobi's sign conventions for a maximisation.
+  """
+
+  def __init__(self, instance=None, threads=None):
+    super().__init__(instance)
+    self.model = h = highspy.Highs()
+    h.setOptionValue("output_flag", False)
+    if threads is not None:
+      h.setOptionValue("threads", threads)
+    # polled by simplex so another thread can stop a running solve
+    self._stop = False
+    self._runtime = 0.0
+    h.cbSimplexInterrupt += self._interrupt
+
+    A, rhs, is_eq = self.matrix_form(self._biomass_limit)
+    A = A.tocsc()
+
+    lp = highspy.HighsLp()
+    lp.num_col_, lp.num_row_ = A.shape[1], A.shape[0]
+    lp.col_cost_ = np.zeros(A.shape[1])
+    lp.col_lower_ = np.zeros(A.shape[1])
+    lp.col_upper_ = np.full(A.shape[1], highspy.kHighsInf)
+    lp.row_lower_ = np.where(is_eq, rhs, -highspy.kHighsInf)
+    lp.row_upper_ = rhs
+    lp.a_matrix_.format_ = highspy.MatrixFormat.kColwise
+    lp.a_matrix_.start_ = A.indptr
+    lp.a_matrix_.index_ = A.indices
+    lp.a_matrix_.value_ = A.data
+    lp.sense_ = highspy.ObjSense.kMaximize
+    h.passModel(lp)
+    self._cols = np.arange(A.shape[1], dtype=np.int32)
+    self._obj = lp.col_cost_
+
+  def _set_objective(self, coeffs, constant):
+    self._obj = coeffs
+    self.model.changeColsCost(self._obj.size, self._cols, self._obj)
+    self.model.changeObjectiveOffset(constant)
+
+  def _set_obj_entries(self, cols, values):
+    self._obj = self._obj.copy()
+    self._obj[cols] = values
+    self.model.changeColsCost(cols.size, cols.astype(np.int32), values)
+
+  def _set_rhs(self, row, value):
+    # every parameter-dependent row is a <= row
+    self.model.changeRowBounds(row, -highspy.kHighsInf, min(value, highspy.kHighsInf))
+
+  def _set_coeffs(self, rows, cols, values):
+    for r, c, v in zip(rows.tolist(), cols.tolist(), values.tolist()):
+      self.model.changeCoeff(r, c, v)
+
+  def _add_row(self, name, coeffs, rhs):
+    cols = np.flatnonzero(coeffs).astype(np.int32)
+    self.model.addRow(-highspy.kHighsInf, min(rhs, highspy.kHighsInf), cols.size, cols, coeffs[cols])
+
+  @property
+  def status(self):
+    return self.model.getModelStatus()
+
+  @property
+  def status_name(self):
+    return self.model.modelStatusToString(self.status).lower()
+
+  @property
+  def objval(self):
+    return self.model.getInfo().objective_function_value
+
+  def solution(self):
+    if self.status != highspy.HighsModelStatus.kOptimal:
+      raise ValueError(f"HiGHS: {self.status_name}")
+    return self.to_dense(np.array(self.model.getSolution().col_value))
+
+  def slack(self):
+    h = self.model
+    return np.minimum(np.array(h.getLp().row_upper_), 1e100) - np.array(h.getSolution().row_value)
+
+  def duals(self):
+    return np.array(self.model.getSolution().row_dual)
+
+  def basis(self):
+    basis = self.model.getBasis()
+    return list(basis.col_status), list(basis.row_status)
+
+  def set_basis(self, cols, rows):
+    basis = highspy.HighsBasis()
+    basis.col_status = [highspy.HighsBasisStatus.kLower if s is None else s for s in cols]
+    basis.row_status = [highspy.HighsBasisStatus.kBasic if s is None else s for s in rows]
+    basis.valid = True
+    # HiGHS rejects a basis with the wrong number of basic entries and then solves cold
+    self.model.setBasis(basis)
+
+  def obj_ranging(self):
+    _, ranging = self.model.getRanging()
+    n = self.model.getLp().num_col_
+    return np.array(ranging.col_cost_dn.value_)[:n], np.array(ranging.col_cost_up.value_)[:n]
+
+  def sensitivity_arrays(self):
+    h = self.model
+    solution = h.getSolution()
+    lp = h.getLp()
+    _, ranging = h.getRanging()
+    A = sp.csc_matrix(
+      (lp.a_matrix_.value_, lp.a_matrix_.index_, lp.a_matrix_.start_), shape=(lp.num_row_, lp.num_col_)
+    )
+    row_value = np.array(solution.row_value)
+    rhs = np.array(lp.row_upper_)
+    return {
+      "var_names": self.var_names,
+      "constr_names": self.constr_names,
+      "X": np.array(solution.col_value),
+      "Obj": self._obj,
+      "RC": np.array(solution.col_dual),
+      # HiGHS appends the row slacks to the column ranging records
+      "SAObjUp": np.array(ranging.col_cost_up.value_)[:lp.num_col_],
+      "SAObjLow": np.array(ranging.col_cost_dn.value_)[:lp.num_col_],
+      "Slack": np.minimum(rhs, 1e100) - row_value,
+      "RHS": rhs,
+      "Pi": np.array(solution.row_dual),
+      "A": A.tocoo(),
+    }
+
+  def _interrupt(self, event):
+    # HiGHS keeps the flag between solves, so write it every time
+    event.interrupt(self._stop)
+
+  def solve_stats(self):
+    return {"runtime_s": self._runtime, "iterations": self.model.getInfo().simplex_iteration_count, "solver_mem_gb": None}
+
+  def optimize(self):
+    self._stop = False
+    start = time.perf_counter()
+    self.model.run()
+    self._runtime = time.perf_counter() - start
+
+  def terminate(self):
+    self._stop = True
@@ -0,0 +1,83 @@
+import polars as pl
+
+# Per sensitivity table: the row key and the marginal value tracked across experiments
+HISTORY_TABLES = {
+  "sens_var": ("Variable", "RC", "RC"),
+  "sens_const": ("Constraint", "Pi (Dual Value)", "Pi"),
+}
+
+
+def _base_hash(store):
+  # the most recent base-case experiment
+  change_log = store.scan("change_log")
+  if "base_case" not in change_log.collect_schema():
+    return pl.LazyFrame(schema={"scenario_hash": pl.String})
+  return (
+    change_log
+    .filter(pl.col("base_case"))
+    .sort("timestamp")
+    .select(pl.col("scenario_hash").last())
+  )
+
+
+def sensitivity_history(store, table="sens_var", against="previous", tol=1e-3):
+  """Binding and marginal-value changes of every stored sensitivity row, as a LazyFrame.
+
+  With ``against="previous"`` each row is compared with the same variable/constraint in the
+  previous experiment (by ``timestamp``) that reported it; with ``against="base"`` it is
+  compared with the latest base-case experiment. Adds ``BindingChange``, ``RCChange``/``PiChange``
+  (moved by more than ``tol``) and ``RCDelta``/``PiDelta``; rows without a reference are null.
+  The comparison is one window or one join over the whole history, so filter the result
+  rather than the input to look at a few experiments. An empty store gives an empty frame.
+  """
+  if table not in HISTORY_TABLES:
+    raise ValueError(f"unknown table {table!r}; choose from {sorted(HISTORY_TABLES)}")
+  key, value, short = HISTORY_TABLES[table]
+  sens = store.scan(table)
+  if key not in sens.collect_schema():
+    # nothing recorded yet
+    sens = pl.LazyFrame(schema={
+      "timestamp": pl.Datetime("us"), "scenario_hash": pl.String, key: pl.String, value: pl.Float64, "Binding": pl.Boolean,
+    })
+
+  if against == "previous":
+    # the hash breaks timestamp ties, so "previous" never depends on file order
+    order = ["timestamp", "scenario_hash"]
+    history = sens.with_columns(
+      ref_timestamp=pl.col("timestamp").shift().over(key, order_by=order),
+      ref_binding=pl.col("Binding").shift().over(key, order_by=order),
+      ref_value=pl.col(value).shift().over(key, order_by=order),
+    )
+  elif against == "base":
+    base = (
+      sens.join(_base_hash(store), on="scenario_hash", how="semi")
+      .select(key, ref_timestamp="timestamp", ref_binding="Binding", ref_value=value)
+    )
+    history = sens.join(base, on=key, how="left")
+  else:
+    raise ValueError(f"unknown reference {against!r}; use 'previous' or 'base'")
+
+  return (
+    history
+    .with_columns(
+      BindingChange=pl.col("Binding") != pl.col("ref_binding"),
+      **{f"{short}Delta": pl.col(value) - pl.col("ref_value")},
+    )
+    .with_columns(**{f"{short}Change": pl.col(f"{short}Delta").abs() > tol})
+    .drop("ref_binding", "ref_value")
+  )
+
+
+def change_summary(history, table="sens_var"):
+  """Per experiment: how many bindings flipped and how far the marginal values moved."""
+  _, _, short = HISTORY_TABLES[table]
+  return (
+    history
+    .group_by("timestamp", "scenario_hash")
+    .agg(
+      pl.col("BindingChange").sum().alias("binding_changes"),
+      pl.col(f"{short}Change").sum().alias(f"{short}_changes"),
+      pl.col(f"{short}Delta").abs().max().alias(f"max_abs_{short}_delta"),
+    )
+    .sort("timestamp")
+  )
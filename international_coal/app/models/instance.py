@@ -0,0 +1,234 @@
+import hashlib
+import json
+from dataclasses import dataclass, field
+from functools import cache, cached_property
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+
+TABLES = ("fuels", "periods", "plants", "unavailable")
+SCHEMAS = {
+  "fuels": {"fuel": pl.String, "cv": pl.Float64, "so2": pl.Float64, "cost": pl.Float64},
+  "periods": {"month": pl.String, "band": pl.String, "hours": pl.Float64, "price": pl.Float64},
+  "plants": {"plant": pl.String, "cap_mw": pl.Float64},
+  "unavailable": {"fuel": pl.String, "month": pl.String},
+}
+
+
+@dataclass(frozen=True, eq=False)
+class Instance:
+  """Planning problem data: fuels, the month × band horizon, plants and fuel availability.
+
+  ``periods`` must cover every (month, band) pair; months and bands keep their order of first
+  appearance. Plant capacities add up in the capacity rows. ``unavailable`` lists
+  (fuel, month) pairs that cannot be burnt in any band of that month.
+  """
+  fuels: pl.DataFrame
+  periods: pl.DataFrame
+  plants: pl.DataFrame
+  unavailable: pl.DataFrame = field(default_factory=lambda: pl.DataFrame(schema=SCHEMAS["unavailable"]))
+  stockpile_fuel: str = "Stockpile"
+  stockpile_limit: float = 600_000
+  biomass_fuel: str = "Biomass"
+  efficiency: float = 0.35
+  so2_bubble_limit: float = 0.3*30_000
+
+  def __post_init__(self):
+    for name in TABLES:
+      df = getattr(self, name).select(SCHEMAS[name].keys()).cast(SCHEMAS[name])
+      object.__setattr__(self, name, df)
+    if self.periods.select(pl.struct("month", "band").is_duplicated().any()).item():
+      raise ValueError("periods has duplicate (month, band) rows")
+    if self.periods.height != len(self.months) * len(self.bands):
+      raise ValueError("periods must list every (month, band) combination")
+
+  @property
+  def settings(self):
+    return dict(
+      stockpile_fuel=self.stockpile_fuel,
+      stockpile_limit=self.stockpile_limit,
+      biomass_fuel=self.biomass_fuel,
+      efficiency=self.efficiency,
+      so2_bubble_limit=self.so2_bubble_limit,
+    )
+
+  @cached_property
+  def fuel_names(self):
+    return self.fuels["fuel"].to_list()
+
+  @cached_property
+  def months(self):
+    return self.periods["month"].unique(maintain_order=True).to_list()
+
+  @cached_property
+  def bands(self):
+    return self.periods["band"].unique(maintain_order=True).to_list()
+
+  @cached_property
+  def cap_mw(self):
+    return self.plants["cap_mw"].sum()
+
+  def _period_matrix(self, column):
+    out = np.empty((len(self.months), len(self.bands)))
+    m = self.periods["month"].replace_strict({m: i for i, m in enumerate(self.months)}, return_dtype=pl.Int64)
+    b = self.periods["band"].replace_strict({b: i for i, b in enumerate(self.bands)}, return_dtype=pl.Int64)
+    out[m.to_numpy(), b.to_numpy()] = self.periods[column].to_numpy()
+    return out
+
+  @cached_property
+  def hours(self):
+    return self._period_matrix("hours")
+
+  @cached_property
+  def price_matrix(self):
+    return self._period_matrix("price")
+
+  @property
+  def price(self):
+    return {(m, b): p for m, b, p in self.periods.select("month", "band", "price").iter_rows()}
+
+  @property
+  def fuel_cost(self):
+    return dict(self.fuels.select("fuel", "cost").iter_rows())
+
+  @cached_property
+  def fingerprint(self):
+    h = hashlib.sha256(json.dumps(self.settings, sort_keys=True).encode())
+    for name in TABLES:
+      h.update(name.encode())
+      h.update(getattr(self, name).hash_rows().to_numpy().tobytes())
+    return h.hexdigest()
+
+
+@cache
+def default_instance():
+  """The International Coal case: one 1,000 MW unit, June–October, four demand bands."""
+  bands = ["WD_peak", "WD_offpeak", "WE_peak", "WE_offpeak"]
+  weekend_hours = {"June": 96, "July": 108, "August": 108, "September": 96, "October": 120}
+  weekday_hours = {"June": 264, "July": 264, "August": 264, "September": 264, "October": 252}
+  price = {
+    "June": [36.00, 27.00, 33.50, 26.20],
+    "July": [36.35, 27.00, 34.30, 26.30],
+    "August": [37.65, 28.20, 35.65, 27.50],
+    "September": [38.35, 28.50, 35.80, 27.65],
+    "October": [43.70, 31.70, 38.70, 30.10],
+  }
+  return Instance(
+    fuels=pl.DataFrame({
+      "fuel": ["Stockpile", "Columbian", "Russian", "Scottish", "Biomass"],
+      "cv": [25.81, 25.12, 24.50, 26.20, 18.00],
+      "so2": [0.0138, 0.0070, 0.0035, 0.0172, 0.0001],
+      "cost": [42.56, 43.93, 43.80, 42.00, 73.77],
+    }),
+    periods=pl.DataFrame([
+      {
+        "month": m,
+        "band": b,
+        "hours": weekday_hours[m] if b.startswith("WD") else weekend_hours[m],
+        "price": p,
+      }
+      for m, prices in price.items()
+      for b, p in zip(bands, prices)
+    ]),
+    plants=pl.DataFrame({"plant": ["Unit 1"], "cap_mw": [1000.]}),
+    unavailable=pl.DataFrame([
+      {"fuel": f, "month": m}
+      for f in ["Columbian", "Russian", "Scottish"]
+      for m in ["June", "July", "August"]
+    ]),
+  )
+
+
+def _read_table(path):
+  if path.suffix == ".parquet":
+    return pl.read_parquet(path)
+  return pl.read_csv(path)
+
+
+def load_instance(path):
+  """Load an instance from a JSON file or a directory of ``<table>.parquet``/``<table>.csv``
+  files plus an optional ``settings.json``."""
+  path = Path(path)
+  if path.suffix == ".json":
+    data = json.loads(path.read_text())
+    tables = {name: pl.DataFrame(data.pop(name), schema=SCHEMAS[name]) for name in TABLES if name in data}
+    return Instance(**tables, **data)
+
+  tables = {}
+  for name in TABLES:
+    for suffix in (".parquet", ".csv"):
+      if (table_path := path / f"{name}{suffix}").exists():
+        tables[name] = _read_table(table_path)
+        break
+  settings_path = path / "settings.json"
+  settings = json.loads(settings_path.read_text()) if settings_path.exists() else {}
+  return Instance(**tables, **settings)
+
+
+def save_instance(instance, path):
+  """Write ``instance`` as JSON (``*.json``) or as a directory of Parquet tables."""
+  path = Path(path)
+  if path.suffix == ".json":
+    data = {name: getattr(instance, name).to_dicts() for name in TABLES}
+    path.write_text(json.dumps({**data, **instance.settings}, indent=2))
+    return path
+  path.mkdir(parents=True, exist_ok=True)
+  for name in TABLES:
+    getattr(instance, name).write_parquet(path / f"{name}.parquet")
+  (path / "settings.json").write_text(json.dumps(instance.settings, indent=2))
+  return path
+
+
+def synthetic_instance(
+    n_fuels=5,
+    n_months=12,
+    n_bands=24,
+    n_plants=1,
+    hours_per_band=None,
+    unavailable_share=0.2,
+    seed=0,
+  ):
+  """Random instance of arbitrary size for scaling runs.
+
+  With the defaults each band is one hour of a representative day per month; pass
+  ``n_months=365, n_bands=24, hours_per_band=1`` for a full hourly year. Besides the
+  stockpile and biomass fuels, ``n_fuels - 2`` imported coals are generated.
+  """
+  rng = np.random.default_rng(seed)
+  n_coal = max(n_fuels - 2, 0)
+  coal = [f"Coal_{i}" for i in range(n_coal)]
+  months = [f"M{i:03d}" for i in range(n_months)]
+  bands = [f"H{i:02d}" if n_bands == 24 else f"B{i:03d}" for i in range(n_bands)]
+  hours_per_band = hours_per_band or 30 * 24 / n_bands
+
+  # electricity price follows a daily shape plus noise
+  shape = 30 + 10 * np.sin(np.linspace(0, 2 * np.pi, n_bands, endpoint=False) - np.pi / 2)
+  price = shape[None, :] + rng.normal(0, 2, (n_months, n_bands)) + rng.normal(0, 3, (n_months, 1))
+
+  unavailable = [
+    {"fuel": f, "month": m}
+    for f in coal for m in months
+    if rng.random() < unavailable_share
+  ]
+  return Instance(
+    fuels=pl.DataFrame({
+      "fuel": ["Stockpile", *coal, "Biomass"],
+      "cv": [25.81, *rng.uniform(23, 27, n_coal), 18.00],
+      "so2": [0.0138, *rng.uniform(0.003, 0.018, n_coal), 0.0001],
+      "cost": [42.56, *rng.uniform(41, 46, n_coal), 73.77],
+    }),
+    periods=pl.DataFrame({
+      "month": np.repeat(months, n_bands),
+      "band": np.tile(bands, n_months),
+      "hours": np.full(n_months * n_bands, hours_per_band, dtype=float),
+      "price": price.reshape(-1).round(2),
+    }),
+    plants=pl.DataFrame({
+      "plant": [f"Unit {i + 1}" for i in range(n_plants)],
+      "cap_mw": rng.choice([500., 660., 1000.], n_plants),
+    }),
+    unavailable=pl.DataFrame(unavailable, schema=SCHEMAS["unavailable"]),
+    stockpile_limit=600_000 * n_plants * n_months / 5,
+    so2_bubble_limit=9_000 * n_plants * n_months / 5,
+  )
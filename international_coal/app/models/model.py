@@ -1,369 +1,415 @@
+import os
+import threading
+import time
+from contextlib import nullcontext
+from functools import wraps
+
 import gurobipy as gp
 from gurobipy import GRB
+import numpy as np
 import polars as pl
-import streamlit as st
+import scipy.sparse as sp
+
+from .env_pool import EnvPool
+from .instance import default_instance
+from .profiling import timed
+from .results import OUTPUTS, ModelResult
+
+# Gurobi status codes by lower-case name ("optimal", "infeasible", "interrupted", ...)
+_STATUS_NAMES = {getattr(GRB.Status, name): name.lower() for name in dir(GRB.Status) if name.isupper()}
+
+
+class PurchaseLP:
+  """Solver-independent matrix form of the purchase LP.
+
+  Holds the instance data as fuel-major arrays and the constraint families as sparse row
+  blocks over the LP columns: one per available (fuel, month, band), i.e. the positions
+  ``cols`` of the fuel-major flattened (fuels * months * bands) grid that the instance's
+  ``unavailable`` table does not exclude. ``to_cols``/``to_dense`` convert between the grid
+  and the columns; ``solution`` is returned on the grid with zeros for the missing triples.
+  Backends build their model from
+  ``blocks`` and implement ``_set_objective``, ``_set_obj_entries``, ``_set_rhs``,
+  ``_set_coeffs``, ``_add_row``, ``optimize``, ``solution``, ``slack``, ``duals``, ``solve_stats``,
+  ``obj_ranging``, ``sensitivity_arrays`` and ``basis``/``set_basis``; ``update`` is shared, so
+  every backend rewrites the same coefficients between scenarios.
+  """
+
+  def __init__(self, instance=None):
+    self.instance = instance = instance or default_instance()
+    self.params = {}
+    self.fuels, self.months, self.bands = instance.fuel_names, instance.months, instance.bands
+    F, M, B = len(self.fuels), len(self.months), len(self.bands)
+    MB = M * B
+
+    # Data as arrays, fuel-major like x
+    self.k = instance.efficiency / 3.6
+    self.cv = instance.fuels["cv"].to_numpy()
+    self.so2 = instance.fuels["so2"].to_numpy()
+    self.hours = instance.hours
+    self.is_biomass = instance.fuels["fuel"].eq(instance.biomass_fuel).to_numpy()
+    # £/MWh transmission charge and tonnes of CO2 per MWh generated
+    self.transmission_cost, self.co2_factor = 0.65, 0.8
+    eye = sp.identity(MB, format='csr')
+    mb_names = [f"{m},{b}" for m in self.months for b in self.bands]
+
+    # Sparse variable index: only available (fuel, month, band) triples become columns
+    available = np.ones((F, M), dtype=bool)
+    for f, m in instance.unavailable.rows():
+      available[self.fuels.index(f), self.months.index(m)] = False
+    self.cols = np.flatnonzero(np.repeat(available, B, axis=1).reshape(-1))
+    self.col_fuel, self.col_period = np.divmod(self.cols, MB)
+
+    # Constraints as (names, rows, sense, rhs), built on the grid and cut down to the columns
+    # Stockpile
+    stockpile = (
+      ['Stockpile_Inventory'],
+      sp.csr_matrix(np.kron(np.array(self.fuels) == instance.stockpile_fuel, np.ones(MB))),
+      '<', np.array([instance.stockpile_limit], dtype=float),
+    )
+    # Biomass (coefficients are rewritten by ``update``)
+    biomass = (
+      [f"Biomass_Limit[{mb}]" for mb in mb_names],
+      sp.kron(self._biomass_coeffs(0.1)[None, :], eye, format='csr'),
+      '<', np.zeros(MB),
+    )
+    # Sulphur Bubble
+    sulphur = (
+      ['Sulphur_Bubble_Limit'],
+      sp.csr_matrix(np.kron(self.so2, np.ones(MB))),
+      '<', np.array([instance.so2_bubble_limit], dtype=float),
+    )
+    # Capacity Limit
+    capacity = (
+      [f"CapacityLimit[{mb}]" for mb in mb_names],
+      sp.kron(self.k * self.cv[None, :], eye, format='csr'),
+      '<', instance.cap_mw * self.hours.reshape(-1),
+    )
+    self.blocks = [
+      (names, rows.tocsc()[:, self.cols].tocsr(), sense, rhs)
+      for names, rows, sense, rhs in (stockpile, biomass, sulphur, capacity)
+    ]
+
+    # Row positions of the parameter-dependent constraints
+    self.stockpile_row = 0
+    self.biomass_rows = np.arange(1, 1 + MB)
+    self.sulphur_row = 1 + MB
+    x_names = np.array([f"x[{f},{m},{b}]" for f in self.fuels for m in self.months for b in self.bands])
+    self.var_names = pl.Series("Variable", x_names[self.cols], dtype=pl.String)
+    self.constr_names = pl.Series("Constraint", [n for names, *_ in self.blocks for n in names], dtype=pl.String)
+    # Index columns of every variable and constraint row, so reports never parse the names
+    self.var_index = pl.DataFrame({
+      "Fuel": np.array(self.fuels)[self.col_fuel],
+      "Month": np.repeat(self.months, B)[self.col_period],
+      "Band": np.tile(self.bands, M)[self.col_period],
+    })
+    self.constr_groups = pl.Series(
+      "Group", [names[0].split("[")[0] for names, *_ in self.blocks for _ in names], dtype=pl.String
+    )
+    self._biomass_limit = 0.1
+    self._so2_factor = 1.0
+
+  @property
+  def shape(self):
+    return len(self.fuels), len(self.months), len(self.bands)
+
+  def to_cols(self, values):
+    """Per-column entries of a (fuels, months, bands) array."""
+    return values.reshape(-1)[self.cols]
+
+  def to_dense(self, values):
+    """Per-column ``values`` on the (fuels, months, bands) grid, zero where no column exists."""
+    out = np.zeros(self.shape)
+    out.reshape(-1)[self.cols] = values
+    return out
+
+  def _biomass_block(self, biomass_limit):
+    # row i of the biomass block touches every column of period i
+    MB = len(self.months) * len(self.bands)
+    return sp.csr_matrix(
+      (self._biomass_coeffs(biomass_limit)[self.col_fuel], (self.col_period, np.arange(self.cols.size))),
+      shape=(MB, self.cols.size),
+    )
+
+  def matrix_form(self, biomass_limit=0.1):
+    """All constraint rows stacked as ``(A, rhs, is_equality)`` for the given biomass limit."""
+    blocks = list(self.blocks)
+    names, _, sense, rhs = blocks[1]
+    blocks[1] = (names, self._biomass_block(biomass_limit), sense, rhs)
+    return (
+      sp.vstack([rows for _, rows, _, _ in blocks], format='csr'),
+      np.concatenate([rhs for *_, rhs in blocks]),
+      np.concatenate([np.full(len(names), sense == '=') for names, _, sense, _ in blocks]),
+    )
+
+  def add_cap(self, name, coeffs, rhs=float('inf')):
+    """Append a ``<=`` row with per-column ``coeffs`` and return its position, for ``_set_rhs``.
+
+    The row is not part of ``blocks`` and ``update`` leaves its RHS alone.
+    """
+    row = self.constr_names.len()
+    self._add_row(name, coeffs, rhs)
+    self.constr_names = self.constr_names.append(pl.Series([name]))
+    self.constr_groups = self.constr_groups.append(pl.Series([name.split("[")[0]]))
+    return row
+
+  def _biomass_coeffs(self, biomass_limit):
+    # energy_fmb['Biomass'] - biomass_limit * energy_mb, per fuel
+    return self.k * self.cv * np.where(self.is_biomass, 1 - biomass_limit, -biomass_limit)
+
+  def price_matrix(self, price):
+    if isinstance(price, np.ndarray):
+      return price
+    return np.array([[price[m,b] for b in self.bands] for m in self.months], dtype=float)
+
+  def fuel_cost_vector(self, fuel_cost):
+    if isinstance(fuel_cost, np.ndarray):
+      return fuel_cost
+    return np.array([fuel_cost[f] for f in self.fuels], dtype=float)
+
+  def resolve(self, params):
+    """Fill instance defaults into a scenario dict and apply the SO2 price / FGD rules."""
+    params = dict(params)
+    for name in ("fuel_cost", "price", "so2_bubble_limit"):
+      if params[name] is None:
+        params[name] = getattr(self.instance, name)
+    if params["so2_price"]:
+      params["so2_bubble_limit"] = float('inf')
+    if not params["fgd_cost"] or not params["so2_reduced_eff"]:
+      params["so2_reduced_eff"] = 0.0
+      params["fgd_cost"] = 0.0
+    return params
+
+  def objective_coefficients(self, roc, fuel_cost, price, co2_price, so2_reduced_eff, so2_price, exchange_rate, **_):
+    kcv = self.k * self.cv
+    return (
+      (self.price_matrix(price)[None, :, :] - self.transmission_cost) * kcv[:, None, None]
+      + (roc * kcv * self.is_biomass
+        - self.fuel_cost_vector(fuel_cost)
+        - co2_price * exchange_rate * self.co2_factor * kcv
+        - (1 - so2_reduced_eff) * self.so2 * so2_price)[:, None, None]
+    )
+
+  def update(
+      self,
+      roc,
+      fuel_cost,
+      price,
+      co2_price,
+      so2_reduced_eff,
+      fgd_cost,
+      so2_bubble_limit,
+      so2_price,
+      exchange_rate,
+      biomass_limit,
+    ):
+    so2_factor = 1 - so2_reduced_eff
+
+    # Objectives
+    self._set_objective(self.to_cols(self.objective_coefficients(
+      roc=roc, fuel_cost=fuel_cost, price=price, co2_price=co2_price,
+      so2_reduced_eff=so2_reduced_eff, so2_price=so2_price, exchange_rate=exchange_rate,
+    )), -fgd_cost)
+
+    # RHS
+    self._set_rhs(self.stockpile_row, self.instance.stockpile_limit)
+    self._set_rhs(self.sulphur_row, so2_bubble_limit)
+
+    # Parameter-dependent matrix coefficients
+    N = self.cols.size
+    if biomass_limit != self._biomass_limit:
+      self._set_coeffs(
+        self.biomass_rows[self.col_period], np.arange(N), self._biomass_coeffs(biomass_limit)[self.col_fuel]
+      )
+      self._biomass_limit = biomass_limit
+
+    if so2_factor != self._so2_factor:
+      self._set_coeffs(np.full(N, self.sulphur_row), np.arange(N), so2_factor * self.so2[self.col_fuel])
+      self._so2_factor = so2_factor
+
+    self.params = dict(
+      roc=roc, fuel_cost=fuel_cost, price=price, co2_price=co2_price,
+      so2_reduced_eff=so2_reduced_eff, fgd_cost=fgd_cost, so2_bubble_limit=so2_bubble_limit,
+      so2_price=so2_price, exchange_rate=exchange_rate, biomass_limit=biomass_limit,
+    )
+
+
+class CoalPurchaseModel(PurchaseLP):
+  """Purchase LP built once in Gurobi; scenarios only rewrite the parameter-dependent coefficients.
+
+  Objective coefficients, the ``Stockpile_Inventory``/``Sulphur_Bubble_Limit`` RHS and the
+  ``Biomass_Limit``/``Sulphur_Bubble_Limit`` matrix coefficients are updated in place, so
+  each re-solve starts from the previous optimal basis.
+
+  The model is assembled in matrix form: ``x`` is an MVar over the available (fuel, month,
+  band) columns and every constraint family is a single sparse ``addMConstr`` call.
+  """
 
-def run_model(
+  def __init__(self, instance=None, env=None):
+    super().__init__(instance)
+    self.model = model = gp.Model('purchase', env=env)
+
+    # Variables
+    self.x = x = model.addMVar(self.cols.size, lb=0, name=self.var_names.to_list())
+    # fgd = model.addVar(vtype=GRB.BINARY, name='invest_fgd')
+
+    # Constraints
+    senses = {'<': GRB.LESS_EQUAL, '=': GRB.EQUAL}
+    for names, rows, sense, rhs in self.blocks:
+      model.addMConstr(rows, x, senses[sense], rhs, name=names)
+
+    model.ModelSense = GRB.MAXIMIZE
+    model.update()
+    self._x_list = x.tolist()
+    # Model structure is fixed, so object lists are read once
+    self.vars = model.getVars()
+    self.constrs = model.getConstrs()
+    self.stockpile_constr = self.constrs[self.stockpile_row]
+    self.biomass_constrs = [self.constrs[i] for i in self.biomass_rows]
+    self.sulphur_constr = self.constrs[self.sulphur_row]
+
+  def _set_objective(self, coeffs, constant):
+    self.x.Obj = coeffs
+    self.model.ObjCon = constant
+
+  def _set_obj_entries(self, cols, values):
+    self.model.setAttr("Obj", [self._x_list[c] for c in cols.tolist()], values.tolist())
+
+  def _set_rhs(self, row, value):
+    self.constrs[row].RHS = min(value, GRB.INFINITY)
+
+  def _set_coeffs(self, rows, cols, values):
+    for r, c, v in zip(rows.tolist(), cols.tolist(), values.tolist()):
+      self.model.chgCoeff(self.constrs[r], self._x_list[c], v)
+
+  def _add_row(self, name, coeffs, rhs):
+    self.model.addMConstr(
+      sp.csr_matrix(coeffs[None, :]), self.x, GRB.LESS_EQUAL, np.array([min(rhs, GRB.INFINITY)]), name=[name]
+    )
+    self.model.update()
+    self.constrs = self.model.getConstrs()
+
+  @property
+  def status(self):
+    return self.model.Status
+
+  @property
+  def status_name(self):
+    return _STATUS_NAMES.get(self.model.Status, str(self.model.Status))
+
+  @property
+  def objval(self):
+    return self.model.ObjVal
+
+  def solution(self):
+    if self.model.Status != GRB.OPTIMAL:
+      raise ValueError(f"Gurobi: {self.status_name}")
+    return self.to_dense(self.x.X)
+
+  def slack(self):
+    return np.array(self.model.getAttr("Slack", self.constrs))
+
+  def duals(self):
+    return np.array(self.model.getAttr("Pi", self.constrs))
+
+  def basis(self):
+    """Column and row basis statuses, in ``var_names``/``constr_names`` order."""
+    return self.model.getAttr("VBasis", self.vars), self.model.getAttr("CBasis", self.constrs)
+
+  def set_basis(self, cols, rows):
+    """Start the next solve from a basis; ``None`` entries are at their lower bound / basic."""
+    # a solved model ignores a new basis and restarts from its own until the solution is dropped
+    self.model.reset()
+    self.model.setAttr("VBasis", self.vars, [-1 if s is None else s for s in cols])
+    self.model.setAttr("CBasis", self.constrs, [0 if s is None else s for s in rows])
+
+  def solve_stats(self):
+    model = self.model
+    return {"runtime_s": model.Runtime, "iterations": int(model.IterCount), "solver_mem_gb": model.MaxMemUsed}
+
+  def obj_ranging(self):
+    return tuple(np.array(self.model.getAttr(attr, self.vars)) for attr in ("SAObjLow", "SAObjUp"))
+
+  def sensitivity_arrays(self):
+    # One bulk getAttr per attribute and one sparse read of the matrix
+    model, vars_, constrs = self.model, self.vars, self.constrs
+    return {
+      "var_names": self.var_names,
+      "constr_names": self.constr_names,
+      **{attr: np.array(model.getAttr(attr, vars_)) for attr in ("X", "Obj", "RC", "SAObjUp", "SAObjLow")},
+      **{attr: np.array(model.getAttr(attr, constrs)) for attr in ("Slack", "RHS", "Pi")},
+      "A": model.getA().tocoo(),
+    }
+
+  def optimize(self):
+    # An already solved LP keeps its basis across attribute changes, so this re-solve is warm
+    self.model.optimize()
+    self.model.update()
+
+  def terminate(self):
+    # safe to call from another thread while optimize() runs
+    self.model.terminate()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def default_pool():
+  """Process-wide ``EnvPool`` of default-instance templates; ``COAL_GUROBI_ENVS`` sets its size (default 2)."""
+  global _pool
+  with _pool_lock:
+    if _pool is None:
+      _pool = EnvPool(
+        size=int(os.getenv("COAL_GUROBI_ENVS", 2)),
+        build_template=lambda env: CoalPurchaseModel(env=env),
+      )
+    return _pool
+
+
+def solve_model(
     roc=45.,
-    fuel_cost={"Stockpile":42.56, "Columbian":43.93, "Russian":43.80, "Scottish":42.00, "Biomass":73.77},
-    price=gp.tupledict({
-      ("June","WD_peak"):36.00, ("June","WD_offpeak"):27.00, ("June","WE_peak"):33.50, ("June","WE_offpeak"):26.20,
-      ("July","WD_peak"):36.35, ("July","WD_offpeak"):27.00, ("July","WE_peak"):34.30, ("July","WE_offpeak"):26.30,
-      ("August","WD_peak"):37.65, ("August","WD_offpeak"):28.20, ("August","WE_peak"):35.65, ("August","WE_offpeak"):27.50,
-      ("September","WD_peak"):38.35, ("September","WD_offpeak"):28.50, ("September","WE_peak"):35.80, ("September","WE_offpeak"):27.65,
-      ("October","WD_peak"):43.70, ("October","WD_offpeak"):31.70, ("October","WE_peak"):38.70, ("October","WE_offpeak"):30.10,
-    }),
+    fuel_cost=None,         # £/tonne per fuel; None uses the instance's costs
+    price=None,             # £/MWh per (month, band); None uses the instance's price deck
     co2_price=15.0,          # £/ton CO2
     so2_reduced_eff=0.0,            # e.g., 0.0 (no FGD), 0.7, 0.8, 0.9
     fgd_cost=0.0,           # £/year fixed cost added once to objective
-    so2_bubble_limit=0.3*30_000,
+    so2_bubble_limit=None,  # tonnes; None uses the instance's bubble (0.3*30_000 for the case study)
     so2_price=0.0,        # £/t SO2; None means no direct SO2 cost
     exchange_rate=0.87,
     biomass_limit=0.1,
     summary=False,
+    template=None,
+    outputs=OUTPUTS,        # subset of {"kpis", "fuel_strategy", "biomass_share", "sensitivity"}
   ):
-  if so2_price:
-    so2_bubble_limit = float('inf')
-  if not fgd_cost or not so2_reduced_eff:
-    so2_reduced_eff = 0.0
-    fgd_cost = 0.0
-
-  # Data
-  fuels = {'Stockpile', 'Columbian', 'Russian', 'Scottish', 'Biomass'}
-  mixes_3 = {'Columbian', 'Russian', 'Scottish'}
-  assert mixes_3.issubset(fuels)
-
-  months = {'June', 'July', 'August', 'September', 'October'}
-  jun_aug = {'June', 'July', 'August'}
-  assert jun_aug.issubset(months)
-
-  bands = {'WD_peak', 'WD_offpeak', 'WE_peak', 'WE_offpeak'}
-
-  fuels, cv, so2 = gp.multidict({
-    "Stockpile": [25.81, 0.0138],
-    "Columbian": [25.12, 0.0070],
-    "Russian"  : [24.50, 0.0035],
-    "Scottish" : [26.20, 0.0172],
-    "Biomass": [18.00, 0.0001],
-  })
-
-  Hours = gp.tupledict({
-    ('June', 'WD_peak'): 264,
-    ('June', 'WD_offpeak'): 264,
-    ('June', 'WE_peak'): 96,
-    ('June', 'WE_offpeak'): 96,
-
-    ('July', 'WD_peak'): 264,
-    ('July', 'WD_offpeak'): 264,
-    ('July', 'WE_peak'): 108,
-    ('July', 'WE_offpeak'): 108,
-
-    ('August', 'WD_peak'): 264,
-    ('August', 'WD_offpeak'): 264,
-    ('August', 'WE_peak'): 108,
-    ('August', 'WE_offpeak'): 108,
-
-    ('September', 'WD_peak'): 264,
-    ('September', 'WD_offpeak'): 264,
-    ('September', 'WE_peak'): 96,
-    ('September', 'WE_offpeak'): 96,
-
-    ('October', 'WD_peak'): 252,
-    ('October', 'WD_offpeak'): 252,
-    ('October', 'WE_peak'): 120,
-    ('October', 'WE_offpeak'): 120,
-  })
-
-  Cap_MW = 1000
-
-  model = gp.Model('purchase')
-
-  # Variables
-  x = model.addVars(fuels, months, bands, lb=0, name='x')
-  # fgd = model.addVar(vtype=GRB.BINARY, name='invest_fgd')
-
-  energy_fmb = {
-    (f, m, b): (0.35 / 3.6) * cv[f] * x[f, m, b]
-    for f in fuels for m in months for b in bands
-  }
-
-  energy_mb = {
-    (m, b): gp.quicksum(energy_fmb[f, m, b] for f in fuels)
-    for m in months for b in bands
-  }
-
-  so2_reduced = {
-    (m, b): (1 - so2_reduced_eff) * gp.quicksum(so2[f] * x[f,m,b] for f in fuels)
-    for m in months for b in bands
-  }
-
-  # Constraints
-  # Stockpile
-  model.addConstr(
-    gp.quicksum(x['Stockpile', m, b] for m in months for b in bands) <= 600_000,
-    name='Stockpile_Inventory'
-  )
-
-  # Biomass
-  model.addConstrs(
-    (energy_fmb['Biomass', m, b] <= biomass_limit * energy_mb[m, b]
-      for m in months for b in bands),
-    name="Biomass_Limit"
-  )
-
-  # Sulphur Bubble
-  model.addConstr(
-    gp.quicksum(so2_reduced[m,b] for m in months for b in bands) <= so2_bubble_limit,
-    name='Sulphur_Bubble_Limit'
-  )
-
-  # Capacity Limit
-  model.addConstrs(
-    (energy_mb[m, b] <= Cap_MW * Hours[m,b] for m in months for b in bands),
-    name="CapacityLimit"
-  )
-
-  # No Coal Summer
-  model.addConstrs(
-    (x[f, m, b] == 0
-    for f in mixes_3
-    for m in jun_aug
-    for b in bands),
-    name="No_Coal_Summer"
-  )
-
-  # Objectives
-  model.setObjective(
-    gp.quicksum(
-      (price[m,b] - 0.65) * energy_mb[m,b] + roc * energy_fmb['Biomass', m, b]
-      - gp.quicksum(fuel_cost[f] * x[f,m,b] for f in fuels)
-      - co2_price * exchange_rate * 0.8 * energy_mb[m,b]
-      - so2_reduced[m,b]*so2_price
-      for m in months for b in bands
-    )
-    - fgd_cost,
-    GRB.MAXIMIZE
-  )
-
-  model.optimize()
-  model.update()
-
-  # 𝑃𝑟𝑜𝑓𝑖𝑡 = 𝑅𝑒𝑣𝑒𝑛𝑢𝑒 − (𝑇𝑟𝑎𝑛𝑠𝑚𝑖𝑠𝑠𝑖𝑜𝑛 𝐶𝑜𝑠𝑡 + 𝐶𝑂2 𝐶𝑜𝑠𝑡 + 𝐹𝑢𝑒𝑙 𝐶𝑜𝑠𝑡) + 𝑅𝑂𝐶 𝐼𝑛𝑐𝑒𝑛𝑡𝑖𝑣𝑒
-  rev_minus_tx = gp.quicksum((price[m,b] - 0.65) * energy_mb[m,b] for m in months for b in bands).getValue()
-  co2_cost = gp.quicksum(co2_price * exchange_rate * 0.8 * energy_mb[m,b] for m in months for b in bands).getValue()
-  total_fuel_cost = gp.quicksum(fuel_cost[f] * model.getVarByName(f"x[{f},{m},{b}]").X for f in fuels for m in months for b in bands).getValue()
-  roc_incentive = 45 * gp.quicksum(energy_fmb['Biomass', m, b] for m in months for b in bands).getValue()
-  so2_tonnes = gp.quicksum(so2_reduced[m,b] for m in months for b in bands).getValue()
-
-
-  # transfer the for loop results into a polars DataFrame:
-  # Month Period Stockpile Russian Scottish Biomass Total (tons)
-  # sort by Month and Period
-
-  cv_map = {f: cv[f] for f in fuels}
-  results = []
-  for f in fuels:
-    for m in months:
-      for b in bands:
-        results.append({
-          "Fuel": f,
-          "Month": m,
-          "Band": b,
-          "Tons": x[f,m,b].X
-        })
-  df = (
-    pl.DataFrame(results)
-    .with_columns(pl.col("Fuel").replace(cv_map).cast(pl.Float32).alias('CV_GJ_per_t'))
-    .with_columns(
-      Energy_MWh=pl.col("Tons") * pl.col("CV_GJ_per_t")
-    )
-  )
-  # Biomass energy per month
-  biomass = (
-    df
-    .filter(pl.col("Fuel") == "Biomass")
-    .group_by("Month")
-    .agg(pl.col("Energy_MWh").sum().alias("Biomass_MWh"))
-  )
-  # Aggregate total energy per month
-  biomass_share_df = (
-      df.group_by("Month")
-      .agg(pl.col("Energy_MWh").sum().alias("Total_MWh"))
-      .join(biomass, on="Month", how="left")
-      .fill_null(0)
-      .sort("Month")
-      .select(pl.all().exclude('Month'))
-      .sum()
-      .with_columns(
-          (pl.col("Biomass_MWh") / pl.col("Total_MWh")).round(3).alias("Biomass Share (%)"),
-          Other_MWh=pl.col("Total_MWh") - pl.col("Biomass_MWh")
-      )
-  )
-
-  fuel_strat_df = (
-    pl.DataFrame({
-      "Month": [m for m in months for b in bands],
-      "Period": [b for m in months for b in bands],
-      **{f: [x[f,m,b].X for m in months for b in bands] for f in fuels},
-      "Total (tons)": [sum(x[f,m,b].X for f in fuels) for m in months for b in bands],
-    })
-    .with_columns(
-      month_index = pl.when(pl.col("Month") == "June").then(6)
-      .when(pl.col("Month") == "July").then(7)
-      .when(pl.col("Month") == "August").then(8)
-      .when(pl.col("Month") == "September").then(9)
-      .when(pl.col("Month") == "October").then(10)
-    )
-    .sort(["month_index", "Period"])
-  )
-
-  sensitivity_var = {
-    "Variable": [],
-    "Final Value": [],
-    "Obj": [],
-    "RC": [],
-    "Allowable Increase": [],
-    "Allowable Decrease": [],
-    "Binding": [],
-    # "SAObjUp": [],
-    # "SAObjLow": [],
-  }
-
-  sensitivity_constr = {
-    "Constraint": [],
-    "Slack": [],
-    "Final Value": [],
-    # "SARHSUp": [],
-    # "SARHSLow": [],
-    "Pi (Dual Value)": [],
-    "Binding": [],
-  }
-
-  sensitivity_map = {
-    "Constraint": [],
-    "Variable": [],
-    "Coeff": [],
-  }
-
-  for v in model.getVars():
-    sensitivity_var["Variable"].append(v.VarName)
-    sensitivity_var["Final Value"].append(v.X)
-    sensitivity_var["Obj"].append(v.Obj)
-    sensitivity_var["RC"].append(v.RC)
-
-    sensitivity_var["Allowable Increase"].append(v.SAObjUp - v.Obj)
-    sensitivity_var["Allowable Decrease"].append(v.Obj - v.SAObjLow)
-    sensitivity_var["Binding"].append(abs(v.RC) < 1e-6)
-
-  for c in model.getConstrs():
-    sensitivity_constr["Constraint"].append(c.ConstrName)
-    sensitivity_constr['Slack'].append(c.Slack)
-    sensitivity_constr['Final Value'].append(c.RHS - c.Slack)
-    # sensitivity_constr["SARHSUp"].append(c.SARHSUp)
-    # sensitivity_constr["SARHSLow"].append(c.SARHSLow)
-    sensitivity_constr["Pi (Dual Value)"].append(c.Pi)
-    sensitivity_constr["Binding"].append(abs(c.Slack) < 1e-6)
-    
-    row = model.getRow(c)
-    for i in range(row.size()):
-      sensitivity_map['Constraint'].append(c.ConstrName)
-      sensitivity_map['Variable'].append(row.getVar(i).VarName)
-      sensitivity_map['Coeff'].append(row.getCoeff(i))
-
-  
-  tol = 1e-6
-  x_tol   = 1e-6
-  rc_tol  = 1e-6
-  pi_tol  = 1e-8
-  slack_min_step = 0.1  # e.g., 0.1 kt or 0.1 pp, set to your policy granularity
-
-  filter_expr = pl.col("Binding") if summary is True else pl.lit(True)
-  sensitivity_constr_lf = (
-    pl.LazyFrame(sensitivity_constr)
-    .filter(pl.col("Pi (Dual Value)").abs().le(pl.lit(pi_tol)).and_(pl.col("Slack").lt(slack_min_step)).not_())
-    .with_columns(
-      pl.when((pl.col("Slack").abs() < tol) & (pl.col("Pi (Dual Value)") > tol))
-      .then(pl.lit("binding_resource"))
-      .when((pl.col("Slack").abs() < tol) & (pl.col("Pi (Dual Value)") < -tol))
-      .then(pl.lit("binding_requirement"))
-      .otherwise(pl.lit("non_binding"))
-      .alias("constraint_status")
-    )
-    .with_columns(pl.col("*").exclude('Constraint', 'Binding', 'constraint_status').round(5))
-    .filter(filter_expr)
-    # .sort(by='Pi (Dual Value)', descending=True)
-  )
-
-  filter_expr = pl.col("Binding") if summary is True else pl.lit(True)
-  sensitivity_var_lf = (
-    pl.LazyFrame(sensitivity_var)
-    .filter(pl.col("Final Value").abs().le(pl.lit(x_tol)).and_(pl.col("RC").abs().le(pl.lit(rc_tol))).not_())
-    .with_columns(
-      pl.when((pl.col("Final Value") > 0) & (pl.col("RC").abs() < tol))
-      .then(pl.lit("utilised"))
-      .when((pl.col("Final Value") == 0) & (pl.col("RC") < 0))
-      .then(pl.lit("better_if"))
-      .when((pl.col("Final Value") == 0) & (pl.col("RC") > 0))
-      .then(pl.lit("worse_if"))
-      .otherwise(pl.lit("neutral"))
-      .alias("variable_status")
-    )
-    .with_columns(pl.col("*").exclude('Variable', 'Binding', 'variable_status').round(5))
-    .filter(filter_expr)
-  )
-
-  sensitivity_map_lf = (
-    (sensitivity_map_buffer_lf := pl.LazyFrame(sensitivity_map)
-    .with_columns(pl.col("*").exclude('Variable', 'Constraint').round(5))
-    .join(sensitivity_constr_lf, on='Constraint', suffix="_const")
-    .join(sensitivity_var_lf, on='Variable', suffix="_var")
-    .rename(dict(Binding='Binding_const'))
-    .with_columns(
-      (pl.col("Coeff") * pl.col("Pi (Dual Value)")).alias("margin_profit_gain"),
-      Fuel=pl.col("Variable").str.extract("x\[([a-zA-Z]+),([^,]+),([^\]]+)\]",1),
-      Months=pl.col("Variable").str.extract("x\[([a-zA-Z]+),([^,]+),([^\]]+)\]",2),
-      Bands=pl.col("Variable").str.extract("x\[([a-zA-Z]+),([^,]+),([^\]]+)\]",3),
+  timings = {}
+  start = time.perf_counter()
+  with nullcontext(template) if template is not None else default_pool().lease_template() as template:
+    # waiting for a pooled template, and building it on first use
+    timings["lease"] = time.perf_counter() - start
+    params = template.resolve(dict(
+      roc=roc,
+      fuel_cost=fuel_cost,
+      price=price,
+      co2_price=co2_price,
+      so2_reduced_eff=so2_reduced_eff,
+      fgd_cost=fgd_cost,
+      so2_bubble_limit=so2_bubble_limit,
+      so2_price=so2_price,
+      exchange_rate=exchange_rate,
+      biomass_limit=biomass_limit,
     ))
-    # .filter(pl.col('Constraint').str.contains('CapacityLimit').not_())
-    .group_by("Fuel", "Constraint")
-    .agg(
-      pl.col('margin_profit_gain').sum().alias("total_margin_profit_gain"),
-      pl.col('Pi (Dual Value)').mean().alias("avg_pi"),
-      pl.col('Months').unique(),
-      pl.col('Bands').unique(),
-      # sum marginal gains, average π, list months/bands.
-    )
-    .sort("total_margin_profit_gain", descending=True)
-  )
-
-  sensitivity_map_buffer_lf = (
-    sensitivity_map_buffer_lf
-    .filter(pl.col('Pi (Dual Value)').eq(0))
-    .with_columns(profit_change_per_unit_tighten=-1 * pl.col("Obj") / pl.col("Coeff"))
-    .group_by("Constraint")
-    .agg(pl.sum("profit_change_per_unit_tighten"))
-  )
-  
-  result = {
-    "roc": roc,
-    "fuel_cost": fuel_cost,
-    "co2_price": co2_price,
-    "so2_reduced_eff": so2_reduced_eff,
-    "fgd_cost": fgd_cost,
-    "so2_bubble_limit": so2_bubble_limit,
-    "so2_price": so2_price,
-    "exchange_rate": exchange_rate,
-    "biomass_limit": biomass_limit,
-    "total_profit": round(model.ObjVal, 2),
-    "revenue_minus_transmission": round(rev_minus_tx, 2),
-    "roc_incentive": round(roc_incentive, 2),
-    "total_fuel_cost": round(total_fuel_cost, 2),
-    "total_co2_cost": round(co2_cost, 2),
-    "total_so2_cost": round(so2_tonnes * so2_price, 2),
-    "co2_emissions": round(0.8 * sum(energy_mb[m,b].getValue() for m in months for b in bands), 2),
-    "so2_emissions": round(so2_tonnes, 2),
-    "total_generation": round(sum(energy_mb[m,b].getValue() for m in months for b in bands), 2),
-    **{f: sum(x[f,m,b].X for m in months for b in bands) for f in fuels}
-  }
-
-  return model, fuel_strat_df, result, biomass_share_df, sensitivity_var_lf, sensitivity_constr_lf, sensitivity_map_lf, sensitivity_map_buffer_lf, #energy_mb_df
\ No newline at end of file
+    with timed(timings, "update"):
+      template.update(**params)
+    with timed(timings, "optimize"):
+      template.optimize()
+    # results are copied off the model here, before the template goes back to the pool
+    with timed(timings, "extract"):
+      result = ModelResult(template, outputs=outputs, summary=summary, timings=timings)
+    return result
+
+
+@wraps(solve_model)
+def run_model(*args, **kwargs):
+  # (None, fuel_strat_df, result, biomass_share_df, sensitivity_var_lf, sensitivity_constr_lf, sensitivity_map_lf, sensitivity_map_buffer_lf);
+  # the model slot stays for callers that unpack it, see ModelResult.as_tuple
+  return solve_model(*args, **kwargs).as_tuple()
@@ -0,0 +1,332 @@
+import inspect
+import math
+import multiprocessing
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
+
+import gurobipy as gp
+import numpy as np
+import polars as pl
+from scipy import stats
+
+from .env_pool import worker_env
+from .highs import HighsPurchaseModel
+from .model import CoalPurchaseModel, PurchaseLP, default_pool, solve_model
+
+# KPIs tracked for every sample
+METRICS = ("total_profit", "so2_emissions", "co2_emissions", "total_generation", "total_fuel_cost")
+QUANTILES = np.round(np.arange(0.01, 1.0, 0.01), 2)
+BINDING_TOL = 1e-6
+
+# One long-lived template and sampling setup per worker process
+_worker = None
+
+
+class QuantileSketch:
+  """Mergeable quantile sketch with relative accuracy ``relative_accuracy`` (DDSketch).
+
+  Values go into logarithmic buckets, so memory grows with the log of the value range and
+  not with the number of values; count, mean, standard deviation, min and max are exact.
+  """
+
+  def __init__(self, relative_accuracy=0.005, min_value=1e-6):
+    self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+    self.min_value = min_value
+    self._log_gamma = math.log(self.gamma)
+    self.positive, self.negative, self.zero = Counter(), Counter(), 0
+    self.count, self.mean, self._m2 = 0, 0.0, 0.0
+    self.min, self.max = math.inf, -math.inf
+
+  def _add_moments(self, count, mean, m2, lo, hi):
+    # Chan et al. pairwise update, exact for any split of the stream
+    total = self.count + count
+    delta = mean - self.mean
+    self.mean += delta * count / total
+    self._m2 += m2 + delta ** 2 * self.count * count / total
+    self.count = total
+    self.min, self.max = min(self.min, lo), max(self.max, hi)
+
+  def add(self, values):
+    values = np.asarray(values, dtype=float)
+    if not values.size:
+      return
+    mean = values.mean()
+    self._add_moments(values.size, mean, ((values - mean) ** 2).sum(), values.min(), values.max())
+    for sign, buckets in ((1, self.positive), (-1, self.negative)):
+      magnitude = sign * values[sign * values > self.min_value]
+      keys, counts = np.unique(np.ceil(np.log(magnitude) / self._log_gamma).astype(np.int64), return_counts=True)
+      buckets.update(dict(zip(keys.tolist(), counts.tolist())))
+    self.zero += int((np.abs(values) <= self.min_value).sum())
+
+  def merge(self, other):
+    if other.count:
+      self._add_moments(other.count, other.mean, other._m2, other.min, other.max)
+      self.positive.update(other.positive)
+      self.negative.update(other.negative)
+      self.zero += other.zero
+
+  @property
+  def std(self):
+    return math.sqrt(self._m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+  def quantile(self, q):
+    """Values at quantiles ``q`` (scalar or array), each within the relative accuracy."""
+    q = np.asarray(q, dtype=float)
+    if not self.count:
+      return np.full(q.shape, np.nan)
+    neg = sorted(self.negative, reverse=True)
+    pos = sorted(self.positive)
+    keys = np.array(neg + pos, dtype=float)
+    # each bucket is represented by the point of least relative error
+    mid = 2 * self.gamma ** keys / (self.gamma + 1)
+    values = np.concatenate([-mid[:len(neg)], [0.0], mid[len(neg):]])
+    counts = np.array([self.negative[k] for k in neg] + [self.zero] + [self.positive[k] for k in pos])
+    index = np.searchsorted(np.cumsum(counts), q * (self.count - 1), side="right")
+    return np.clip(values[np.minimum(index, len(values) - 1)], self.min, self.max)
+
+
+class _RiskAccumulator:
+  """Streaming aggregates of a batch of samples, merged across batches and workers."""
+
+  def __init__(self, n_constrs, tail_size, relative_accuracy):
+    self.sketches = {m: QuantileSketch(relative_accuracy) for m in METRICS}
+    self.tail_size = tail_size
+    # the lowest profits, exact: VaR/CVaR only ever look at the worst max(alphas) share
+    self.tail = np.empty(0)
+    self.binding = np.zeros(n_constrs, dtype=np.int64)
+    self.samples = 0
+    self.failed = 0
+
+  def _keep_tail(self, values):
+    tail = np.concatenate([self.tail, values])
+    if tail.size > self.tail_size:
+      tail = np.partition(tail, self.tail_size - 1)[:self.tail_size]
+    self.tail = tail
+
+  def add(self, values, binding):
+    for m in METRICS:
+      self.sketches[m].add(values[m])
+    self._keep_tail(np.asarray(values["total_profit"], dtype=float))
+    self.binding += binding
+    self.samples += len(values["total_profit"])
+
+  def merge(self, other):
+    for m in METRICS:
+      self.sketches[m].merge(other.sketches[m])
+    self._keep_tail(other.tail)
+    self.binding += other.binding
+    self.samples += other.samples
+    self.failed += other.failed
+
+
+class _Sampler:
+  """Draws the factors from their marginals, correlated through a Gaussian copula."""
+
+  def __init__(self, distributions, correlation=None):
+    self.names = list(distributions)
+    self.marginals = [distributions[name] for name in self.names]
+    n = len(self.names)
+    if correlation is None:
+      corr = np.eye(n)
+    elif isinstance(correlation, dict):
+      corr = np.eye(n)
+      index = {name: i for i, name in enumerate(self.names)}
+      for (a, b), rho in correlation.items():
+        if a not in index or b not in index:
+          raise ValueError(f"correlation between {a!r} and {b!r}: both must be sampled")
+        corr[index[a], index[b]] = corr[index[b], index[a]] = rho
+    else:
+      corr = np.asarray(correlation, dtype=float)
+      if corr.shape != (n, n):
+        raise ValueError(f"correlation must be {n}x{n}, one row per distribution")
+    try:
+      self._chol = np.linalg.cholesky(corr)
+    except np.linalg.LinAlgError:
+      raise ValueError("correlation matrix is not positive definite") from None
+
+  def draw(self, rng, n):
+    u = stats.norm.cdf(rng.standard_normal((n, len(self.names))) @ self._chol.T)
+    return {name: m.ppf(u[:, i]) for i, (name, m) in enumerate(zip(self.names, self.marginals))}
+
+
+def _scenario(base, draws, i):
+  params = dict(base)
+  for name, values in draws.items():
+    value = float(values[i])
+    if name == "price":
+      params["price"] = {mb: p * value for mb, p in base["price"].items()}
+    elif name == "fuel_cost":
+      params["fuel_cost"] = {f: c * value for f, c in params["fuel_cost"].items()}
+    elif name in base:
+      params[name] = value
+  # per-fuel costs go last so they override a fuel_cost multiplier
+  if fuel_costs := {n[:-len("_cost")]: float(v[i]) for n, v in draws.items() if n.endswith("_cost") and n not in base}:
+    params["fuel_cost"] = {**params["fuel_cost"], **fuel_costs}
+  return params
+
+
+def _evaluate(template, base, draws, tail_size, relative_accuracy):
+  acc = _RiskAccumulator(len(template.constr_names), tail_size, relative_accuracy)
+  values = {m: [] for m in METRICS}
+  binding = np.zeros(len(template.constr_names), dtype=np.int64)
+  # neighbouring samples in the leading factor re-solve from a nearby basis
+  for i in np.argsort(next(iter(draws.values())), kind="stable"):
+    try:
+      kpis = solve_model(**_scenario(base, draws, i), template=template, outputs={"kpis"}).kpis
+    except (gp.GurobiError, AttributeError, ValueError):
+      acc.failed += 1
+      continue
+    for m in METRICS:
+      values[m].append(kpis[m])
+    binding += np.abs(template.slack()) < BINDING_TOL
+  acc.add(values, binding)
+  return acc
+
+
+def _init_worker(instance, base, sampler, seed, tail_size, relative_accuracy, backend, threads):
+  global _worker
+  if backend == "highs":
+    template = HighsPurchaseModel(instance, threads=threads)
+  else:
+    template = CoalPurchaseModel(instance, env=worker_env(threads))
+  _worker = (template, base, sampler, seed, tail_size, relative_accuracy)
+
+
+def _solve_batch(batch):
+  template, base, sampler, seed, tail_size, relative_accuracy = _worker
+  batch_id, size = batch
+  draws = sampler.draw(np.random.default_rng([seed, batch_id]), size)
+  return _evaluate(template, base, draws, tail_size, relative_accuracy)
+
+
+def _report(acc, lp, alphas, base, seconds, seed):
+  n = acc.samples
+  summary = pl.DataFrame([
+    {
+      "metric": m,
+      "mean": s.mean if n else None,
+      "std": s.std if n else None,
+      "min": s.min if n else None,
+      **{f"p{q * 100:02.0f}": float(s.quantile(q)) for q in (0.01, 0.05, 0.5, 0.95, 0.99)},
+      "max": s.max if n else None,
+    }
+    for m, s in acc.sketches.items()
+  ])
+  tail = np.sort(acc.tail)
+  risk = pl.DataFrame(
+    [
+      {"alpha": a, "VaR": tail[k - 1], "CVaR": tail[:k].mean()} if n else {"alpha": a, "VaR": None, "CVaR": None}
+      for a in alphas
+      for k in [max(1, math.ceil(a * n))]
+    ],
+    schema={"alpha": pl.Float64, "VaR": pl.Float64, "CVaR": pl.Float64},
+  )
+  binding = (
+    pl.DataFrame({"Constraint": lp.constr_names, "binding_count": acc.binding})
+    .with_columns(binding_probability=pl.col("binding_count") / max(n, 1))
+    .sort("binding_count", descending=True, maintain_order=True)
+  )
+  quantiles = pl.DataFrame({"q": QUANTILES, **{m: s.quantile(QUANTILES) for m, s in acc.sketches.items()}})
+  return {
+    "samples": n,
+    "failed": acc.failed,
+    "seconds": seconds,
+    "seed": seed,
+    "so2_bubble_limit": base["so2_bubble_limit"],
+    "p_so2_at_bubble": acc.binding[lp.sulphur_row] / n if n else None,
+    "summary": summary,
+    "risk": risk,
+    "quantiles": quantiles,
+    "binding": binding,
+  }
+
+
+def monte_carlo_risk(
+    distributions,
+    n_samples=10_000,
+    correlation=None,
+    alphas=(0.01, 0.05),
+    seed=None,
+    workers=None,
+    threads=1,
+    batch_size=256,
+    backend="gurobi",
+    relative_accuracy=0.005,
+    progress=None,
+    instance=None,
+    **params,
+  ):
+  """Profit and emission distributions over randomly drawn scenarios.
+
+  ``distributions`` maps a factor to a ``scipy.stats`` distribution (anything with ``ppf``):
+  ``price`` and ``fuel_cost`` are multipliers on the price deck and on every fuel cost,
+  ``<Fuel>_cost`` is one fuel's £/tonne, and ``co2_price`` or any other scalar ``run_model``
+  parameter is drawn as is. ``correlation`` couples the factors through a Gaussian copula,
+  either as ``{("price", "co2_price"): 0.6, ...}`` or as a matrix in ``distributions`` order.
+  The other ``params`` are the fixed ``run_model`` parameters.
+
+  Samples are solved in batches of ``batch_size`` on one warm template per worker process
+  (in-process if ``workers=1``) and only streaming aggregates are kept: quantile sketches of
+  the KPIs, how often each constraint binds, and the lowest profits needed for VaR/CVaR, so
+  memory does not grow with ``n_samples``. ``VaR`` is the ``alpha`` quantile of total profit
+  and ``CVaR`` the mean profit of the worst ``alpha`` share of samples. ``progress(done, total)``
+  is called after every batch. Results are reproducible for a given ``seed``.
+  """
+  if backend not in ("gurobi", "highs"):
+    raise ValueError(f"unknown backend {backend!r}; use 'gurobi' or 'highs'")
+  bound = inspect.signature(solve_model).bind(**params)
+  bound.apply_defaults()
+  base = {k: v for k, v in bound.arguments.items() if k not in ("summary", "template", "outputs")}
+  lp = PurchaseLP(instance)
+  for name in ("price", "fuel_cost", "so2_bubble_limit"):
+    if base[name] is None:
+      base[name] = getattr(lp.instance, name)
+  known = set(base) | {f"{f}_cost" for f in lp.fuels}
+  if unknown := set(distributions) - known:
+    raise ValueError(f"cannot sample {sorted(unknown)}; choose from {sorted(known)}")
+
+  sampler = _Sampler(distributions, correlation)
+  seed = np.random.SeedSequence().entropy if seed is None else seed
+  tail_size = max(1, math.ceil(max(alphas) * n_samples))
+  batches = [(b, min(batch_size, n_samples - start)) for b, start in enumerate(range(0, n_samples, batch_size))]
+  workers = min(workers or max(1, (os.cpu_count() or 1) // threads), max(len(batches), 1))
+  acc = _RiskAccumulator(len(lp.constr_names), tail_size, relative_accuracy)
+  start = time.perf_counter()
+
+  def collect(part):
+    acc.merge(part)
+    if progress is not None:
+      progress(acc.samples + acc.failed, n_samples)
+
+  if workers == 1:
+    with default_pool().lease() if backend == "gurobi" else nullcontext() as env:
+      if backend == "gurobi":
+        template = CoalPurchaseModel(instance, env=env)
+      else:
+        template = HighsPurchaseModel(instance, threads=threads)
+      for batch_id, size in batches:
+        draws = sampler.draw(np.random.default_rng([seed, batch_id]), size)
+        collect(_evaluate(template, base, draws, tail_size, relative_accuracy))
+  else:
+    # spawn, not fork: a forked Gurobi environment is not safe to reuse
+    with ProcessPoolExecutor(
+      max_workers=workers,
+      mp_context=multiprocessing.get_context("spawn"),
+      initializer=_init_worker,
+      initargs=(instance, base, sampler, seed, tail_size, relative_accuracy, backend, threads),
+    ) as pool:
+      pending = set()
+      for batch in batches:
+        pending.add(pool.submit(_solve_batch, batch))
+        # a bounded queue keeps only a few batch aggregates in flight
+        if len(pending) >= 2 * workers:
+          finished = next(as_completed(pending))
+          pending.remove(finished)
+          collect(finished.result())
+      for finished in as_completed(pending):
+        collect(finished.result())
+
+  return _report(acc, lp, alphas, base, time.perf_counter() - start, seed)
@@ -0,0 +1,151 @@
+import inspect
+from contextlib import nullcontext
+
+import polars as pl
+
+from .model import default_pool, solve_model
+
+# How each slider enters the LP
+OBJECTIVE_PARAMETERS = {"co2_price", "so2_price", "roc", "exchange_rate"}
+RHS_PARAMETERS = {"so2_bubble_limit"}
+MATRIX_PARAMETERS = {"biomass_limit"}
+PARAMETERS = OBJECTIVE_PARAMETERS | RHS_PARAMETERS | MATRIX_PARAMETERS
+
+
+class _Tracer:
+  """Re-solves one template at chosen parameter values, warm from the previous basis."""
+
+  def __init__(self, template, parameter, params):
+    self.template = template
+    self.parameter = parameter
+    self.params = params
+    self.solves = 0
+
+  def scenario(self, theta):
+    return self.template.resolve({**self.params, self.parameter: theta})
+
+  def evaluate(self, theta):
+    template = self.template
+    params = self.scenario(theta)
+    template.update(**params)
+    template.optimize()
+    self.solves += 1
+    if template.status_name != "optimal":
+      raise ValueError(f"{self.parameter}={theta}: {template.status_name}")
+
+    X = template.solution()
+    if self.parameter in OBJECTIVE_PARAMETERS:
+      # the value function is max over x of a line in theta; its slope is d(obj)/d(theta) at x*
+      step = template.objective_coefficients(**self.scenario(theta + 1.)) - template.objective_coefficients(**params)
+      slope = float((step * X).sum())
+    elif self.parameter in RHS_PARAMETERS:
+      slope = float(template.duals()[template.sulphur_row])
+    else:
+      slope = None
+    cols, rows = template.basis()
+    return {
+      "theta": theta,
+      "profit": template.objval,
+      "slope": slope,
+      "tons": X.sum(axis=(1, 2)),
+      "basis": (tuple(cols), tuple(rows)),
+    }
+
+
+def _linear_breakpoints(tracer, lo, hi, tol):
+  # Sandwich search: intersect the supporting lines at both ends of an interval and re-solve
+  # only at the intersection. The value function is convex (objective) or concave (RHS)
+  # piecewise linear, so the intersection either lies on it (a breakpoint) or splits the
+  # interval into two with strictly fewer pieces.
+  ends = {lo: tracer.evaluate(lo), hi: tracer.evaluate(hi)}
+  breakpoints = {}
+  stack = [(lo, hi)]
+  while stack:
+    a, b = stack.pop()
+    pa, pb = ends[a], ends[b]
+    if abs(pa["slope"] - pb["slope"]) <= tol * max(1., abs(pa["slope"])):
+      continue
+    theta = (pb["profit"] - pa["profit"] + pa["slope"] * a - pb["slope"] * b) / (pa["slope"] - pb["slope"])
+    if theta - a <= tol * max(1., abs(a)) or b - theta <= tol * max(1., abs(b)):
+      breakpoints[theta] = pa["profit"] + pa["slope"] * (theta - a)
+      continue
+    ends[theta] = point = tracer.evaluate(theta)
+    if abs(point["profit"] - (pa["profit"] + pa["slope"] * (theta - a))) <= tol * max(1., abs(point["profit"])):
+      breakpoints[theta] = point["profit"]
+    else:
+      stack.extend([(a, theta), (theta, b)])
+  return {lo: ends[lo]["profit"], **breakpoints, hi: ends[hi]["profit"]}
+
+
+def _basis_breakpoints(tracer, lo, hi, resolution):
+  # Matrix coefficients make the value function nonlinear, so bisect on basis changes instead
+  points = {lo: tracer.evaluate(lo), hi: tracer.evaluate(hi)}
+  stack = [(lo, hi)]
+  while stack:
+    a, b = stack.pop()
+    if points[a]["basis"] == points[b]["basis"] or b - a <= resolution * (hi - lo):
+      continue
+    mid = (a + b) / 2
+    points[mid] = tracer.evaluate(mid)
+    stack.extend([(a, mid), (mid, b)])
+  # keep only the interval ends where the basis changes
+  thetas = sorted(points)
+  keep = [lo, *(
+    t for prev, t in zip(thetas, thetas[1:-1]) if points[prev]["basis"] != points[t]["basis"]
+  ), hi]
+  return {t: points[t]["profit"] for t in keep}
+
+
+def parametric_curve(parameter, lo, hi, template=None, tol=1e-7, resolution=1e-3, **params):
+  """Trace total profit over ``parameter`` in [lo, hi] with a handful of warm-started solves.
+
+  Returns ``(segments, solves)``: one row per segment between consecutive breakpoints with the
+  profit at both ends, the slope and the per-fuel tonnage of the optimal plan at the segment
+  midpoint. For ``co2_price``/``so2_price``/``roc``/``exchange_rate`` (objective) and
+  ``so2_bubble_limit`` (RHS) the curve is exactly piecewise linear and the breakpoints are
+  exact. ``biomass_limit`` scales matrix coefficients, so its profit is only piecewise smooth:
+  breakpoints are located to ``resolution * (hi - lo)`` by bisection on the optimal basis and
+  the slope column is the secant. ``so2_price`` is traced with the SO2 bubble switched off, as ``run_model`` does
+  for any non-zero price. Any remaining ``run_model`` parameters are held fixed at ``params``.
+  """
+  if parameter not in PARAMETERS:
+    raise ValueError(f"unknown parameter {parameter!r}; choose from {sorted(PARAMETERS)}")
+  if lo >= hi:
+    raise ValueError("lo must be smaller than hi")
+
+  defaults = inspect.signature(solve_model).bind(**params)
+  defaults.apply_defaults()
+  base = {k: v for k, v in defaults.arguments.items() if k not in ("summary", "template", "outputs")}
+  if parameter == "so2_bubble_limit" and base["so2_price"]:
+    raise ValueError("so2_bubble_limit has no effect while so2_price is set")
+  if parameter == "so2_price":
+    # any non-zero SO2 price replaces the bubble; drop it on the whole range so the curve is continuous
+    base["so2_bubble_limit"] = float('inf')
+
+  with nullcontext(template) if template is not None else default_pool().lease_template() as template:
+    tracer = _Tracer(template, parameter, base)
+    if parameter in MATRIX_PARAMETERS:
+      curve = _basis_breakpoints(tracer, lo, hi, resolution)
+    else:
+      curve = _linear_breakpoints(tracer, lo, hi, tol)
+
+    thetas = sorted(curve)
+    rows = []
+    for i, (a, b) in enumerate(zip(thetas, thetas[1:])):
+      mid = tracer.evaluate((a + b) / 2)
+      rows.append({
+        "parameter": parameter,
+        "segment": i,
+        "theta_start": a,
+        "theta_end": b,
+        "profit_start": curve[a],
+        "profit_end": curve[b],
+        "slope": (curve[b] - curve[a]) / (b - a),
+        **dict(zip(template.fuels, mid["tons"].tolist())),
+      })
+  return pl.DataFrame(rows), tracer.solves
+
+
+def breakpoints(segments):
+  """Parameter values where the optimal plan changes (interior segment boundaries)."""
+  return segments["theta_start"].to_list()[1:]
@@ -0,0 +1,190 @@
+import inspect
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import gurobipy as gp
+import numpy as np
+import polars as pl
+
+from .env_pool import worker_env
+from .instance import default_instance
+from .model import CoalPurchaseModel, solve_model
+
+EMISSIONS = ("co2", "so2")
+
+
+class _Frontier:
+  """One warm template with an emission cap, re-solved at given caps (epsilon-constraint)."""
+
+  def __init__(self, instance, base, emission, backend, threads, env):
+    if backend == "highs":
+      from .highs import HighsPurchaseModel
+      self.template = t = HighsPurchaseModel(instance, threads=threads)
+    else:
+      self.template = t = CoalPurchaseModel(instance, env=env)
+    self.params = t.resolve(base)
+    t.update(**self.params)
+    if emission == "co2":
+      self.row = t.add_cap("CO2_Cap", t.co2_factor * (t.k * t.cv)[t.col_fuel])
+    else:
+      # the bubble already caps SO2 after FGD, so it is the epsilon row
+      self.row = t.sulphur_row
+    self.bases, self.last = {}, None
+
+  def solve(self, caps):
+    return [self._solve(cap) for cap in caps]
+
+  def _solve(self, cap):
+    t = self.template
+    t._set_rhs(self.row, cap)
+    nearest = min(self.bases, key=lambda c: abs(c - cap), default=None)
+    if nearest is not None and nearest != self.last:
+      # start from the optimal basis of the nearest cap solved so far, not the last one
+      t.set_basis(*self.bases[nearest])
+    start = time.perf_counter()
+    t.optimize()
+    seconds = time.perf_counter() - start
+    self.bases[cap], self.last = t.basis(), cap
+    X = t.solution()
+    tons = X.sum(axis=(1, 2))
+    return {
+      "cap": cap,
+      "total_profit": t.objval,
+      "co2_emissions": float(t.co2_factor * (t.k * t.cv * tons).sum()),
+      "so2_emissions": float((1 - self.params["so2_reduced_eff"]) * (t.so2 * tons).sum()),
+      "marginal_cost": float(t.duals()[self.row]),
+      "iterations": t.solve_stats()["iterations"],
+      "solve_s": seconds,
+      **dict(zip(t.fuels, tons.tolist())),
+    }
+
+
+# The frontier template of this worker process
+_worker = None
+
+
+def _init_worker(instance, base, emission, backend, threads):
+  global _worker
+  _worker = _Frontier(instance, base, emission, backend, threads, worker_env(threads) if backend == "gurobi" else None)
+
+
+def _solve_caps(caps):
+  return _worker.solve(caps)
+
+
+def _vertex(a, b):
+  # cap where the supporting lines at a and b meet; the frontier is concave, so it lies below
+  return (b["total_profit"] - a["total_profit"] + a["marginal_cost"] * a["cap"] - b["marginal_cost"] * b["cap"]) / (
+    a["marginal_cost"] - b["marginal_cost"]
+  )
+
+
+def pareto_frontier(
+    emission="co2",
+    lo=0.0,
+    hi=None,
+    adaptive=True,
+    n_points=20,
+    tol=1e-6,
+    workers=1,
+    threads=1,
+    backend="gurobi",
+    instance=None,
+    env=None,
+    **params,
+  ):
+  """Total profit against CO2 or SO2 emissions, by warm-started epsilon-constraint solves.
+
+  Profit is maximised with the plan's ``emission`` (tonnes of CO2, or SO2 after FGD) capped
+  at a sequence of caps between ``lo`` and ``hi`` (default: the emissions of the unconstrained
+  optimum, beyond which profit no longer rises). CO2 gets a cap row of its own; SO2 is capped
+  through the bubble row, so ``so2_bubble_limit`` only matters while tracing CO2. Every other
+  ``run_model`` parameter is held at ``params``.
+
+  The frontier of an LP is concave and piecewise linear. ``adaptive=True`` places points only
+  where it bends: the supporting lines at the ends of an interval (slope = the cap's shadow
+  price) are intersected and the cap is solved there, until every point lies on its
+  neighbours' lines within ``tol``, so the points include every vertex and the frontier is
+  exact between them. ``adaptive=False`` solves a uniform grid of ``n_points`` caps instead.
+  Caps are solved in rounds across ``workers`` processes, each keeping one warm template and
+  taking a contiguous run of caps.
+
+  Returns one row per point, sorted by cap: the cap, total profit, CO2 and SO2 emissions, the
+  marginal abatement cost (£ of profit per tonne of cap), simplex iterations, solve time and
+  the tonnes of every fuel.
+  """
+  if emission not in EMISSIONS:
+    raise ValueError(f"unknown emission {emission!r}; choose from {EMISSIONS}")
+  if backend not in ("gurobi", "highs"):
+    raise ValueError(f"unknown backend {backend!r}; use 'gurobi' or 'highs'")
+  instance = instance or default_instance()
+  bound = inspect.signature(solve_model).bind(**params)
+  bound.apply_defaults()
+  base = {k: v for k, v in bound.arguments.items() if k not in ("summary", "template", "outputs")}
+  key = f"{emission}_emissions"
+
+  # an environment made here for the in-process template is disposed on the way out
+  owned = None
+  if env is None and workers <= 1 and backend == "gurobi":
+    env = owned = gp.Env(params={"OutputFlag": 0, "Threads": threads})
+  pools = None
+  points = {}
+  def run(caps):
+    for point in evaluate(np.sort(caps)):
+      points[point["cap"]] = point
+
+  try:
+    if workers > 1:
+      # spawn, not fork: a forked Gurobi environment is not safe to reuse; one process per worker
+      # keeps its template warm from round to round
+      context = multiprocessing.get_context("spawn")
+      pools = [
+        ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=_init_worker,
+                            initargs=(instance, base, emission, backend, threads))
+        for _ in range(workers)
+      ]
+      def evaluate(caps):
+        futures = [pool.submit(_solve_caps, chunk.tolist()) for pool, chunk in zip(pools, np.array_split(caps, workers))]
+        return [point for f in futures for point in f.result()]
+    else:
+      local = _Frontier(instance, base, emission, backend, threads, env)
+      evaluate = lambda caps: local.solve(caps.tolist())
+
+    if hi is None:
+      # unconstrained optimum: caps above its emissions cannot raise profit
+      top, = evaluate(np.array([float('inf')]))
+      hi = top[key]
+    if hi <= lo:
+      raise ValueError(f"hi={hi} must be larger than lo={lo}")
+
+    if not adaptive:
+      run(np.linspace(lo, hi, n_points))
+    else:
+      run(np.array([lo, hi]))
+      intervals = [(lo, hi)]
+      while intervals:
+        split = {}
+        for a, b in intervals:
+          pa, pb = points[a], points[b]
+          if abs(pa["marginal_cost"] - pb["marginal_cost"]) <= tol * max(1., abs(pa["marginal_cost"])):
+            continue
+          cap = _vertex(pa, pb)
+          if cap - a > tol * max(1., abs(a)) and b - cap > tol * max(1., abs(b)):
+            split[cap] = (a, b)
+        if not split:
+          break
+        run(np.array(list(split)))
+        intervals = []
+        for cap, (a, b) in split.items():
+          on_line = points[a]["total_profit"] + points[a]["marginal_cost"] * (cap - a)
+          if abs(points[cap]["total_profit"] - on_line) > tol * max(1., abs(on_line)):
+            intervals.extend([(a, cap), (cap, b)])
+  finally:
+    if pools is not None:
+      for pool in pools:
+        pool.shutdown()
+    if owned is not None:
+      owned.dispose()
+
+  return pl.DataFrame([points[cap] for cap in sorted(points)]).select(pl.lit(emission).alias("emission"), pl.all())
@@ -0,0 +1,22 @@
+import time
+from contextlib import contextmanager
+from functools import cached_property, wraps
+
+
+@contextmanager
+def timed(timings, phase):
+  """Add the wall time of the ``with`` block to ``timings[phase]`` (seconds)."""
+  start = time.perf_counter()
+  try:
+    yield
+  finally:
+    timings[phase] = timings.get(phase, 0.0) + time.perf_counter() - start
+
+
+def timed_property(method):
+  """``cached_property`` that records its first evaluation in ``self.timings``."""
+  @wraps(method)
+  def wrapper(self):
+    with timed(self.timings, method.__name__):
+      return method(self)
+  return cached_property(wrapper)
@@ -0,0 +1,285 @@
+import copy
+from functools import cached_property
+
+import numpy as np
+import polars as pl
+
+from .profiling import timed_property
+
+OUTPUTS = frozenset({"kpis", "fuel_strategy", "biomass_share", "sensitivity"})
+# Sensitivity views collected together by ``sensitivity_frames``
+SENSITIVITY_TABLES = ("sensitivity_var", "sensitivity_constr", "sensitivity_map", "sensitivity_map_buffer")
+
+
+class ModelResult:
+  """One solved scenario.
+
+  The solution vector (and, if ``"sensitivity"`` is in ``outputs``, the raw SA arrays and
+  constraint matrix) are copied off the model at solve time, so a shared template can move on
+  to the next scenario. KPIs, tables and sensitivity frames are only built on first access;
+  ``sensitivity_frames`` collects all sensitivity views once and keeps the DataFrames.
+  ``timings`` holds the seconds spent in each phase so far (``solve_model`` fills in the
+  solve phases, the properties add their first evaluation) and ``solver_stats`` the
+  backend's own runtime and iteration count.
+  """
+
+  def __init__(self, template, outputs=OUTPUTS, summary=False, timings=None):
+    if unknown := set(outputs) - OUTPUTS:
+      raise ValueError(f"unknown outputs {sorted(unknown)}; choose from {sorted(OUTPUTS)}")
+    self.outputs = frozenset(outputs)
+    self.summary = summary
+    self.timings = timings if timings is not None else {}
+    self.params = dict(template.params)
+    self.fuels, self.months, self.bands = template.fuels, template.months, template.bands
+    self.biomass_fuel = template.instance.biomass_fuel
+    self.k, self.cv, self.so2, self.is_biomass = template.k, template.cv, template.so2, template.is_biomass
+    self.transmission_cost, self.co2_factor = template.transmission_cost, template.co2_factor
+    self.price = template.price_matrix(self.params['price'])
+    self.fuel_cost = template.fuel_cost_vector(self.params['fuel_cost'])
+
+    self.status = template.status
+    self.status_name = template.status_name
+    # raises unless the solve is optimal
+    self.X = template.solution()
+    self.objval = template.objval
+    self.solver_stats = template.solve_stats()
+    self._sa = template.sensitivity_arrays() if "sensitivity" in self.outputs else None
+    self._var_index, self._constr_groups = template.var_index, template.constr_groups
+
+  @timed_property
+  def kpis(self):
+    p, X = self.params, self.X
+    energy_fmb = self.k * self.cv[:, None, None] * X
+    energy_mb = energy_fmb.sum(axis=0)
+    so2_tonnes = (1 - p['so2_reduced_eff']) * (self.so2[:, None, None] * X).sum()
+
+    # 𝑃𝑟𝑜𝑓𝑖𝑡 = 𝑅𝑒𝑣𝑒𝑛𝑢𝑒 − (𝑇𝑟𝑎𝑛𝑠𝑚𝑖𝑠𝑠𝑖𝑜𝑛 𝐶𝑜𝑠𝑡 + 𝐶𝑂2 𝐶𝑜𝑠𝑡 + 𝐹𝑢𝑒𝑙 𝐶𝑜𝑠𝑡) + 𝑅𝑂𝐶 𝐼𝑛𝑐𝑒𝑛𝑡𝑖𝑣𝑒
+    rev_minus_tx = ((self.price - self.transmission_cost) * energy_mb).sum()
+    co2_cost = p['co2_price'] * p['exchange_rate'] * self.co2_factor * energy_mb.sum()
+    total_fuel_cost = (self.fuel_cost[:, None, None] * X).sum()
+    roc_incentive = p['roc'] * energy_fmb[self.is_biomass].sum()
+
+    return {
+      **{k: v for k, v in p.items() if k != 'price'},
+      "total_profit": round(self.objval, 2),
+      "revenue_minus_transmission": round(rev_minus_tx, 2),
+      "roc_incentive": round(roc_incentive, 2),
+      "total_fuel_cost": round(total_fuel_cost, 2),
+      "total_co2_cost": round(co2_cost, 2),
+      "total_so2_cost": round(so2_tonnes * p['so2_price'], 2),
+      "co2_emissions": round(self.co2_factor * energy_mb.sum(), 2),
+      "so2_emissions": round(so2_tonnes, 2),
+      "total_generation": round(energy_mb.sum(), 2),
+      **{f: tons for f, tons in zip(self.fuels, self.X.sum(axis=(1, 2)).tolist())}
+    }
+
+  @timed_property
+  def fuel_strategy(self):
+    X = self.X
+    _, M, B = X.shape
+    return (
+      pl.DataFrame({
+        "Month": np.repeat(self.months, B),
+        "Period": np.tile(self.bands, M),
+        **{f: X[i].reshape(-1) for i, f in enumerate(self.fuels)},
+        "Total (tons)": X.sum(axis=0).reshape(-1),
+      })
+      .with_columns(
+        month_index = pl.col("Month").replace_strict({m: i for i, m in enumerate(self.months)}, return_dtype=pl.Int32)
+      )
+      .sort(["month_index", "Period"])
+    )
+
+  @timed_property
+  def biomass_share(self):
+    # transfer the solution into a polars DataFrame:
+    # Fuel Month Band Tons CV_GJ_per_t Energy_MWh
+    X = self.X
+    F, M, B = X.shape
+    df = (
+      pl.DataFrame({
+        "Fuel": np.repeat(self.fuels, M * B),
+        "Month": np.tile(np.repeat(self.months, B), F),
+        "Band": np.tile(self.bands, F * M),
+        "Tons": X.reshape(-1),
+        "CV_GJ_per_t": np.repeat(self.cv, M * B),
+      })
+      .with_columns(pl.col('CV_GJ_per_t').cast(pl.Float32))
+      .with_columns(
+        Energy_MWh=pl.col("Tons") * pl.col("CV_GJ_per_t")
+      )
+    )
+    # Biomass energy per month
+    biomass = (
+      df
+      .filter(pl.col("Fuel") == self.biomass_fuel)
+      .group_by("Month")
+      .agg(pl.col("Energy_MWh").sum().alias("Biomass_MWh"))
+    )
+    # Aggregate total energy per month
+    return (
+        df.group_by("Month")
+        .agg(pl.col("Energy_MWh").sum().alias("Total_MWh"))
+        .join(biomass, on="Month", how="left")
+        .fill_null(0)
+        .sort("Month")
+        .select(pl.all().exclude('Month'))
+        .sum()
+        .with_columns(
+            (pl.col("Biomass_MWh") / pl.col("Total_MWh")).round(3).alias("Biomass Share (%)"),
+            Other_MWh=pl.col("Total_MWh") - pl.col("Biomass_MWh")
+        )
+    )
+
+  def _require_sensitivity(self):
+    if self._sa is None:
+      raise ValueError("sensitivity was not captured; solve with 'sensitivity' in outputs")
+    return self._sa
+
+  @cached_property
+  def sensitivity_var(self):
+    sa = self._require_sensitivity()
+    tol = 1e-6
+    x_tol   = 1e-6
+    rc_tol  = 1e-6
+
+    filter_expr = pl.col("Binding") if self.summary is True else pl.lit(True)
+    return (
+      pl.LazyFrame({
+        "Variable": sa["var_names"],
+        **self._var_index.to_dict(),
+        "Final Value": sa["X"],
+        "Obj": sa["Obj"],
+        "RC": sa["RC"],
+        "Allowable Increase": sa["SAObjUp"] - sa["Obj"],
+        "Allowable Decrease": sa["Obj"] - sa["SAObjLow"],
+        "Binding": np.abs(sa["RC"]) < 1e-6,
+        # "SAObjUp": [],
+        # "SAObjLow": [],
+      })
+      .filter(pl.col("Final Value").abs().le(pl.lit(x_tol)).and_(pl.col("RC").abs().le(pl.lit(rc_tol))).not_())
+      .with_columns(
+        pl.when((pl.col("Final Value") > 0) & (pl.col("RC").abs() < tol))
+        .then(pl.lit("utilised"))
+        .when((pl.col("Final Value") == 0) & (pl.col("RC") < 0))
+        .then(pl.lit("better_if"))
+        .when((pl.col("Final Value") == 0) & (pl.col("RC") > 0))
+        .then(pl.lit("worse_if"))
+        .otherwise(pl.lit("neutral"))
+        .alias("variable_status")
+      )
+      .with_columns(pl.col("*").exclude('Variable', 'Fuel', 'Month', 'Band', 'Binding', 'variable_status').round(5))
+      .filter(filter_expr)
+    )
+
+  @cached_property
+  def sensitivity_constr(self):
+    sa = self._require_sensitivity()
+    tol = 1e-6
+    pi_tol  = 1e-8
+    slack_min_step = 0.1  # e.g., 0.1 kt or 0.1 pp, set to your policy granularity
+
+    filter_expr = pl.col("Binding") if self.summary is True else pl.lit(True)
+    return (
+      pl.LazyFrame({
+        "Constraint": sa["constr_names"],
+        "Group": self._constr_groups,
+        "Slack": sa["Slack"],
+        "Final Value": sa["RHS"] - sa["Slack"],
+        # "SARHSUp": [],
+        # "SARHSLow": [],
+        "Pi (Dual Value)": sa["Pi"],
+        "Binding": np.abs(sa["Slack"]) < 1e-6,
+      })
+      .filter(pl.col("Pi (Dual Value)").abs().le(pl.lit(pi_tol)).and_(pl.col("Slack").lt(slack_min_step)).not_())
+      .with_columns(
+        pl.when((pl.col("Slack").abs() < tol) & (pl.col("Pi (Dual Value)") > tol))
+        .then(pl.lit("binding_resource"))
+        .when((pl.col("Slack").abs() < tol) & (pl.col("Pi (Dual Value)") < -tol))
+        .then(pl.lit("binding_requirement"))
+        .otherwise(pl.lit("non_binding"))
+        .alias("constraint_status")
+      )
+      .with_columns(pl.col("*").exclude('Constraint', 'Group', 'Binding', 'constraint_status').round(5))
+      .filter(filter_expr)
+      # .sort(by='Pi (Dual Value)', descending=True)
+    )
+
+  @cached_property
+  def _sensitivity_map_joined(self):
+    sa = self._require_sensitivity()
+    A = sa["A"]
+    return (
+      pl.LazyFrame({
+        "Constraint": sa["constr_names"].gather(A.row),
+        "Variable": sa["var_names"].gather(A.col),
+        "Coeff": A.data,
+      })
+      .with_columns(pl.col("*").exclude('Variable', 'Constraint').round(5))
+      .join(self.sensitivity_constr, on='Constraint', suffix="_const")
+      .join(self.sensitivity_var, on='Variable', suffix="_var")
+      .rename(dict(Binding='Binding_const'))
+      .with_columns((pl.col("Coeff") * pl.col("Pi (Dual Value)")).alias("margin_profit_gain"))
+    )
+
+  @cached_property
+  def sensitivity_map(self):
+    return (
+      self._sensitivity_map_joined
+      # .filter(pl.col('Constraint').str.contains('CapacityLimit').not_())
+      .group_by("Fuel", "Constraint")
+      .agg(
+        pl.col('margin_profit_gain').sum().alias("total_margin_profit_gain"),
+        pl.col('Pi (Dual Value)').mean().alias("avg_pi"),
+        pl.col('Month').unique().alias('Months'),
+        pl.col('Band').unique().alias('Bands'),
+        # sum marginal gains, average π, list months/bands.
+      )
+      .sort("total_margin_profit_gain", descending=True)
+    )
+
+  @cached_property
+  def sensitivity_map_buffer(self):
+    return (
+      self._sensitivity_map_joined
+      .filter(pl.col('Pi (Dual Value)').eq(0))
+      .with_columns(profit_change_per_unit_tighten=-1 * pl.col("Obj") / pl.col("Coeff"))
+      .group_by("Constraint")
+      .agg(pl.sum("profit_change_per_unit_tighten"))
+    )
+
+  @timed_property
+  def sensitivity_frames(self):
+    # one collect_all, so the joins shared by the map views run once
+    return dict(zip(SENSITIVITY_TABLES, pl.collect_all([getattr(self, name) for name in SENSITIVITY_TABLES])))
+
+  def repriced(self, params, price, fuel_cost, objval):
+    """This solution under objective-only edits that keep its basis optimal, without a re-solve.
+
+    ``params`` are the new resolved inputs, ``price``/``fuel_cost`` their arrays and ``objval``
+    the new objective. The solution tables carry over; KPIs are rebuilt on access.
+    """
+    result = copy.copy(self)
+    result.__dict__.pop("kpis", None)
+    result.params, result.price, result.fuel_cost, result.objval = dict(params), price, fuel_cost, objval
+    result.timings = {}
+    result.solver_stats = {"runtime_s": 0.0, "iterations": 0, "solver_mem_gb": None}
+    return result
+
+  def as_tuple(self):
+    """The legacy ``run_model`` return value; outputs that were not requested are ``None``.
+
+    The model slot is ``None``, as in ``cached_run_model``: the template's model belongs to
+    whoever solves on it next, so handing it out would let a later scenario change it.
+    """
+    sensitivity = (
+      tuple(self.sensitivity_frames[name].lazy() for name in SENSITIVITY_TABLES)
+      if "sensitivity" in self.outputs else (None,) * 4
+    )
+    return (
+      None,
+      self.fuel_strategy if "fuel_strategy" in self.outputs else None,
+      self.kpis,
+      self.biomass_share if "biomass_share" in self.outputs else None,
+      *sensitivity,
+    )
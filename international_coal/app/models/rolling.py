@@ -0,0 +1,227 @@
+import dataclasses
+import inspect
+import time
+from contextlib import nullcontext
+from pathlib import Path
+
+import gurobipy as gp
+import numpy as np
+import polars as pl
+
+from .instance import default_instance
+from .model import CoalPurchaseModel, solve_model
+from .results import ModelResult
+
+BUDGETS = ("pro_rata", "dual")
+
+
+def _window_instance(instance, months, stockpile_limit):
+  return dataclasses.replace(
+    instance,
+    periods=instance.periods.filter(pl.col("month").is_in(months)),
+    unavailable=instance.unavailable.filter(pl.col("month").is_in(months)),
+    stockpile_limit=stockpile_limit,
+  )
+
+
+def _coarse_instance(instance, price, levels):
+  # every month as ``levels`` bands, each a run of its price-sorted bands at the hours-weighted
+  # average price, so the coarse plan still tells peak from off-peak
+  n_bands = len(instance.bands)
+  return dataclasses.replace(instance, periods=(
+    instance.periods
+    .with_columns(price=pl.Series([price[m, b] for m, b in instance.periods.select("month", "band").iter_rows()]))
+    .with_columns(level=((pl.col("price").rank("ordinal").over("month") - 1) * min(levels, n_bands) // n_bands))
+    .group_by("month", "level", maintain_order=True)
+    .agg(
+      hours=pl.col("hours").sum(),
+      price=(pl.col("price") * pl.col("hours")).sum() / pl.col("hours").sum(),
+    )
+    .select("month", band=pl.format("level{}", "level"), hours="hours", price="price")
+  ))
+
+
+def _warm_start(template, previous):
+  # carry over the statuses of the variables and rows the two windows share
+  if previous is None:
+    return
+  names, (cols, rows) = previous
+  col_status = dict(zip(names[0], cols))
+  row_status = dict(zip(names[1], rows))
+  template.set_basis(
+    [col_status.get(n) for n in template.var_names.to_list()],
+    [row_status.get(n) for n in template.constr_names.to_list()],
+  )
+
+
+def rolling_horizon(
+    step=1,
+    lookahead=1,
+    budget="pro_rata",
+    coarse_bands=8,
+    out_dir=None,
+    backend="gurobi",
+    threads=None,
+    instance=None,
+    env=None,
+    progress=None,
+    **params,
+  ):
+  """Solve a long horizon as overlapping windows of ``step + lookahead`` months.
+
+  Each window is optimised on its own model, but only its first ``step`` months are committed
+  before the window moves on by ``step``. The stockpile allowance and the SO2 bubble link all
+  months; what is left of them is carried forward. With ``budget="pro_rata"`` each window may
+  use the remainder in proportion to its share of the remaining hours. With ``budget="dual"``
+  the whole horizon is first solved once with every month collapsed into ``coarse_bands``
+  bands of similar price. An allowance whose row has a shadow price in that coarse solve is
+  scarce: each window may use the remainder in proportion to the coarse plan's use of it over
+  the window's months, so it goes where it is worth most. One that is not scarce is not
+  rationed. The shadow prices are reported per window.
+
+  Every window starts from the basis of the previous one (statuses of the shared variables
+  and rows). Committed fuel strategies go to ``out_dir`` as one Parquet part per window, so
+  memory does not grow with the horizon; either way they are returned as a LazyFrame.
+  ``params`` are the ``run_model`` parameters. ``progress(done, total)`` is called after
+  every window with the number of committed months.
+  """
+  if budget not in BUDGETS:
+    raise ValueError(f"unknown budget {budget!r}; choose from {BUDGETS}")
+  if backend not in ("gurobi", "highs"):
+    raise ValueError(f"unknown backend {backend!r}; use 'gurobi' or 'highs'")
+  if backend == "highs":
+    from .highs import HighsPurchaseModel
+  # an environment made here lives only as long as this call
+  env_scope = (
+    gp.Env(params={"OutputFlag": 0, **({"Threads": threads} if threads else {})})
+    if env is None and backend == "gurobi" else nullcontext(env)
+  )
+  with env_scope as env:
+    build = (
+      (lambda inst: HighsPurchaseModel(inst, threads=threads)) if backend == "highs"
+      else (lambda inst: CoalPurchaseModel(inst, env=env))
+    )
+    instance = instance or default_instance()
+    if not instance.months:
+      raise ValueError("the instance has no months to solve")
+    bound = inspect.signature(solve_model).bind(**params)
+    bound.apply_defaults()
+    base = {k: v for k, v in bound.arguments.items() if k not in ("summary", "template", "outputs")}
+    for name in ("fuel_cost", "price", "so2_bubble_limit"):
+      if base[name] is None:
+        base[name] = getattr(instance, name)
+    if isinstance(base["price"], np.ndarray):
+      # windows and the coarse pass look prices up by (month, band), not by position
+      base["price"] = {
+        (m, b): float(base["price"][i, j]) for i, m in enumerate(instance.months) for j, b in enumerate(instance.bands)
+      }
+    if out_dir is not None:
+      out_dir = Path(out_dir)
+      out_dir.mkdir(parents=True, exist_ok=True)
+
+    months = instance.months
+    month_hours = instance.hours.sum(axis=1)
+    stockpile = instance.stockpile_fuel
+    remaining = {"stockpile": float(instance.stockpile_limit), "so2": None}
+    prices, coarse_used = {"stockpile": 0.0, "so2": 0.0}, None
+    if budget == "dual":
+      coarse = build(_coarse_instance(instance, base["price"], coarse_bands))
+      coarse_params = coarse.resolve({**base, "price": coarse.instance.price})
+      coarse.update(**coarse_params)
+      coarse.optimize()
+      duals, X = coarse.duals(), coarse.solution().sum(axis=2)
+      prices = {"stockpile": float(duals[coarse.stockpile_row]), "so2": float(duals[coarse.sulphur_row])}
+      # tonnes of each allowance the coarse plan uses per month
+      coarse_used = {
+        "stockpile": X[coarse.fuels.index(stockpile)],
+        "so2": (1 - coarse_params["so2_reduced_eff"]) * coarse.so2 @ X,
+      }
+      del coarse
+    totals, windows, strategies, previous = {}, [], [], None
+
+    for start in range(0, len(months), step):
+      window = months[start:start + step + lookahead]
+      committed = len(window[:step])
+      shares = dict.fromkeys(remaining, month_hours[start:start + len(window)].sum() / month_hours[start:].sum())
+      if coarse_used is not None:
+        for k, used in coarse_used.items():
+          if abs(prices[k]) <= 1e-9:
+            shares[k] = 1.0
+          elif used[start:].sum() > 1e-9:
+            shares[k] = used[start:start + len(window)].sum() / used[start:].sum()
+      build_start = time.perf_counter()
+      sub = _window_instance(instance, window, 0.0)
+      template = build(sub)
+      build_s = time.perf_counter() - build_start
+      resolved = template.resolve(base)
+      if remaining["so2"] is None:
+        remaining["so2"] = resolved["so2_bubble_limit"]
+      caps = {k: v * shares[k] for k, v in remaining.items()}
+      template.update(**{**resolved, "so2_bubble_limit": caps["so2"]})
+      template._set_rhs(template.stockpile_row, caps["stockpile"])
+      _warm_start(template, previous)
+      template.optimize()
+      result = ModelResult(template, outputs={"fuel_strategy"})
+      previous = ((template.var_names.to_list(), template.constr_names.to_list()), template.basis())
+
+      # Commit the first ``step`` months
+      X = result.X[:, :committed]
+      coeffs = template.objective_coefficients(**resolved)[:, :committed]
+      energy = template.k * template.cv[:, None, None] * X
+      used = {
+        "stockpile": float(X[template.fuels.index(stockpile)].sum()),
+        "so2": float((1 - resolved["so2_reduced_eff"]) * (template.so2[:, None, None] * X).sum()),
+      }
+      for k in remaining:
+        remaining[k] = max(0.0, remaining[k] - used[k])
+      for k, value in {
+        "total_profit": float((coeffs * X).sum()),
+        "total_generation": float(energy.sum()),
+        "co2_emissions": float(template.co2_factor * energy.sum()),
+        "so2_emissions": used["so2"],
+        **dict(zip(template.fuels, X.sum(axis=(1, 2)).tolist())),
+      }.items():
+        totals[k] = totals.get(k, 0.0) + value
+
+      strategy = (
+        result.fuel_strategy
+        .filter(pl.col("month_index") < committed)
+        .with_columns(month_index=pl.col("month_index") + start)
+      )
+      if out_dir is not None:
+        # write-then-rename so a crash never leaves a truncated part behind
+        path = out_dir / f"part-{start:06d}.parquet"
+        strategy.write_parquet(path.with_suffix(".tmp"))
+        path.with_suffix(".tmp").replace(path)
+      else:
+        strategies.append(strategy)
+      stats = result.solver_stats
+      windows.append({
+        "start": months[start],
+        "months": len(window),
+        "committed": committed,
+        "n_vars": len(template.var_names),
+        "build_s": build_s,
+        "solve_s": stats["runtime_s"],
+        "iterations": stats["iterations"],
+        "stockpile_cap": caps["stockpile"],
+        "so2_cap": caps["so2"],
+        "stockpile_used": used["stockpile"],
+        "so2_used": used["so2"],
+        "stockpile_price": prices["stockpile"],
+        "so2_price": prices["so2"],
+      })
+      del template, result
+      if progress is not None:
+        progress(start + committed, len(months))
+
+    totals["total_profit"] -= resolved["fgd_cost"]
+    return {
+      "kpis": {
+        **{k: v for k, v in resolved.items() if k not in ("price", "fuel_cost")},
+        **{k: round(v, 2) for k, v in totals.items()},
+        "stockpile_left": round(remaining["stockpile"], 2),
+      },
+      "windows": pl.DataFrame(windows),
+      "fuel_strategy": pl.scan_parquet(out_dir / "*.parquet") if out_dir is not None else pl.concat(strategies).lazy(),
+    }
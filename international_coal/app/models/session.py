@@ -0,0 +1,146 @@
+import inspect
+import weakref
+
+import gurobipy as gp
+import numpy as np
+
+from .model import CoalPurchaseModel, solve_model
+from .profiling import timed
+from .results import OUTPUTS, ModelResult
+
+# Inputs that only move objective coefficients (once ``resolve`` has applied the SO2 rules)
+OBJECTIVE_PARAMS = frozenset({"roc", "fuel_cost", "price", "co2_price", "so2_price", "exchange_rate"})
+# Inputs given per cell; ``update`` merges them into the current ones
+CELL_PARAMS = ("fuel_cost", "price")
+
+
+def _dispose(model, env):
+  model.dispose()
+  env.dispose()
+
+
+class ModelSession:
+  """One persistent model for a stream of small edits, e.g. from the price and fuel-cost grids.
+
+  ``solve(**params)`` solves a full scenario; ``update(**changes)`` merges ``changes`` into the
+  current inputs (``price={("October", "WD_peak"): 45.0}`` changes one cell) and diffs them
+  against the previous ones. Edits that only move objective coefficients rewrite just those
+  coefficients. If the moves stay within the objective ranging of the last solve
+  (``SAObjLow``/``SAObjUp``, combined by the 100% rule so several cells may move at once) the
+  basis stays optimal: the solution is unchanged and the objective is computed directly, with
+  no re-solve unless ``"sensitivity"`` is in ``outputs``. Any other edit re-solves from the
+  previous basis. ``last_edit`` reports what the latest call did.
+
+  Without a ``template`` the session builds its own on a private environment, which ``close``
+  (or leaving a ``with`` block) disposes.
+  """
+
+  def __init__(self, template=None, instance=None, outputs=OUTPUTS):
+    self._env = None
+    if template is None:
+      self._env = gp.Env(params={"OutputFlag": 0})
+      template = CoalPurchaseModel(instance, env=self._env)
+      # a session dropped without close() must not keep its environment alive
+      self._finalizer = weakref.finalize(self, _dispose, template.model, self._env)
+    self.template = template
+    self.outputs = frozenset(outputs)
+    self.inputs = None
+    self.result = None
+    self.last_edit = None
+    # objective on the model, and objective, ranging and solution of the last solve
+    self._obj = self._solved_obj = self._low = self._up = self._x = self._objval = None
+
+  def close(self):
+    """Dispose the model and environment the session built; a given template is left alone."""
+    if self._env is not None:
+      self._finalizer()
+      self._env = None
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    self.close()
+
+  def _inputs(self, params):
+    bound = inspect.signature(solve_model).bind(**params)
+    bound.apply_defaults()
+    inputs = {k: v for k, v in bound.arguments.items() if k not in ("summary", "template", "outputs")}
+    instance = self.template.instance
+    inputs["fuel_cost"] = dict(inputs["fuel_cost"] or instance.fuel_cost)
+    inputs["price"] = dict(inputs["price"] or instance.price)
+    return inputs
+
+  def solve(self, **params):
+    """Solve the scenario given by ``solve_model`` keywords from the current basis."""
+    self.inputs = self._inputs(params)
+    self.result = solve_model(**self.inputs, template=self.template, outputs=self.outputs)
+    self._record()
+    self.last_edit = {"mode": "solve", "changed_coeffs": None, "in_range": None, **self._stats()}
+    return self.result
+
+  def _record(self):
+    template = self.template
+    self._obj = self._solved_obj = template.to_cols(template.objective_coefficients(**template.params))
+    self._low, self._up = template.obj_ranging()
+    self._x = template.to_cols(self.result.X)
+    self._objval = self.result.objval
+
+  def _stats(self):
+    return {"objval": self.result.objval, "iterations": self.result.solver_stats["iterations"]}
+
+  def in_range(self, obj):
+    """Whether the basis of the last solve stays optimal for objective ``obj`` (100% rule)."""
+    delta = obj - self._solved_obj
+    with np.errstate(divide="ignore", invalid="ignore"):
+      allowance = np.where(delta > 0, self._up - self._solved_obj, self._solved_obj - self._low)
+      used = np.where(delta != 0, np.abs(delta) / allowance, 0.0)
+    return bool(used.sum() <= 1)
+
+  def update(self, **changes):
+    """Apply ``changes`` to the current inputs and return the new result."""
+    if self.inputs is None:
+      self.solve()
+    inputs = dict(self.inputs)
+    for name, value in changes.items():
+      if name not in inputs:
+        raise TypeError(f"unknown parameter {name!r}")
+      inputs[name] = {**inputs[name], **value} if name in CELL_PARAMS and value is not None else value
+    inputs = self._inputs(inputs)
+    if inputs == self.inputs:
+      self.last_edit = {"mode": "unchanged", "changed_coeffs": 0, "in_range": True, **self._stats()}
+      return self.result
+
+    template = self.template
+    params = template.resolve(inputs)
+    if any(params[k] != template.params[k] for k in params.keys() - OBJECTIVE_PARAMS):
+      self.solve(**inputs)
+      self.last_edit["mode"] = "full"
+      return self.result
+
+    timings = {}
+    with timed(timings, "update"):
+      obj = template.to_cols(template.objective_coefficients(**params))
+      cols = np.flatnonzero(obj != self._obj)
+      template._set_obj_entries(cols, obj[cols])
+      template.params = params
+      self._obj = obj
+    self.inputs = inputs
+    in_range = self.in_range(obj)
+
+    if in_range and "sensitivity" not in self.outputs:
+      objval = self._objval + float((obj - self._solved_obj) @ self._x)
+      self.result = self.result.repriced(
+        params, template.price_matrix(params["price"]), template.fuel_cost_vector(params["fuel_cost"]), objval
+      )
+      self.result.timings = timings
+      mode = "repriced"
+    else:
+      with timed(timings, "optimize"):
+        template.optimize()
+      with timed(timings, "extract"):
+        self.result = ModelResult(template, outputs=self.outputs, timings=timings)
+      self._record()
+      mode = "warm"
+    self.last_edit = {"mode": mode, "changed_coeffs": int(cols.size), "in_range": in_range, **self._stats()}
+    return self.result
@@ -0,0 +1,284 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+
+import gurobipy as gp
+from gurobipy import GRB
+import numpy as np
+import polars as pl
+import scipy.sparse as sp
+
+from .env_pool import worker_env
+from .fgd import _base_params, _options_frame, _so2_upper_bound
+from .model import CoalPurchaseModel, PurchaseLP, default_pool
+
+# Parameters that change the constraint matrix are shared by all scenarios
+_FIRST_STAGE = {"so2_reduced_eff", "fgd_cost", "biomass_limit"}
+
+
+def _scenario_params(lp, base, scenarios):
+  """Resolved second-stage params and normalised weights per scenario."""
+  weights = np.array([s.get("weight", 1.0) for s in scenarios], dtype=float)
+  params = []
+  for s in scenarios:
+    overrides = {k: v for k, v in s.items() if k != "weight"}
+    if fixed := _FIRST_STAGE & overrides.keys():
+      raise ValueError(f"{sorted(fixed)} cannot vary by scenario")
+    if unknown := overrides.keys() - base.keys():
+      raise ValueError(f"unknown scenario parameters {sorted(unknown)}")
+    params.append(lp.resolve({**base, **overrides, "so2_reduced_eff": 0.0, "fgd_cost": 0.0}))
+  return params, weights / weights.sum()
+
+
+def _stage2_objective(lp, params):
+  # stockpile coal is paid for in the first stage, so burning it costs nothing extra here
+  c = lp.objective_coefficients(**params)
+  stock = lp.fuels.index(lp.instance.stockpile_fuel)
+  c[stock] += lp.fuel_cost_vector(params["fuel_cost"])[stock]
+  return lp.to_cols(c)
+
+
+class _Subproblem:
+  """Second-stage dispatch for fixed first-stage decisions, re-solved warm per scenario."""
+
+  def __init__(self, instance, base, options, env):
+    self.template = t = CoalPurchaseModel(instance, env=env)
+    t.update(**t.resolve({**base, "so2_reduced_eff": 0.0, "fgd_cost": 0.0}))
+    eff = options["so2_reduced_eff"].to_numpy()
+    self.cap = eff * _so2_upper_bound(t)
+    self.removed = self.build = None
+    if len(options):
+      names = options["option"].to_list()
+      self.removed = t.model.addMVar(len(names), lb=0, name=[f"so2_removed[{n}]" for n in names])
+      so2_row = t.so2[t.col_fuel]
+      t.model.addMConstr(
+        sp.hstack([sp.csr_matrix(-eff[:, None] * so2_row[None, :]), sp.identity(len(names))]),
+        t._x_list + self.removed.tolist(), GRB.LESS_EQUAL, np.zeros(len(names)),
+        name=[f"FGD_Removal[{n}]" for n in names],
+      )
+      self.build = t.model.addMConstr(
+        sp.identity(len(names), format='csr'), self.removed, GRB.LESS_EQUAL, self.cap,
+        name=[f"FGD_Build[{n}]" for n in names],
+      )
+      for v in self.removed.tolist():
+        t.model.chgCoeff(t.sulphur_constr, v, -1.0)
+
+  def evaluate(self, params, stockpile, invest):
+    """Second-stage profit and its subgradients in the stockpile purchase and each FGD build."""
+    t = self.template
+    t.update(**params)
+    t.x.Obj = _stage2_objective(t, params)
+    t.stockpile_constr.RHS = stockpile
+    if self.build is not None:
+      self.removed.Obj = params["so2_price"]
+      self.build.RHS = self.cap * invest
+    t.optimize()
+    if t.model.Status != GRB.OPTIMAL:
+      raise ValueError(f"second stage: model status {t.model.Status}")
+    grad_invest = self.build.Pi * self.cap if self.build is not None else np.zeros(0)
+    return t.model.ObjVal, t.stockpile_constr.Pi, grad_invest
+
+
+# One subproblem per worker process, plus the scenarios it serves
+_worker = None
+
+
+def _init_worker(instance, base, options, scenarios, threads):
+  global _worker
+  _worker = (_Subproblem(instance, base, options, worker_env(threads)), scenarios)
+
+
+def _evaluate_chunk(indices, stockpile, invest):
+  sub, scenarios = _worker
+  return [sub.evaluate(scenarios[i], stockpile, invest) for i in indices]
+
+
+def _summary(method, options, stockpile, invest, first_stage, values, weights, **extra):
+  chosen = [name for name, y in zip(options["option"], invest) if y > 0.5]
+  return {
+    "method": method,
+    "stockpile_purchase": round(float(stockpile), 4),
+    "fgd_option": chosen[0] if chosen else None,
+    "expected_profit": round(float(first_stage + weights @ values), 2),
+    "scenarios": pl.DataFrame({
+      "scenario": np.arange(len(weights)),
+      "weight": weights,
+      "profit": (first_stage + values).round(2),
+    }),
+    **extra,
+  }
+
+
+def _first_stage_cost(lp, base):
+  fuel_cost = lp.fuel_cost_vector(base["fuel_cost"] if base["fuel_cost"] is not None else lp.instance.fuel_cost)
+  return fuel_cost[lp.fuels.index(lp.instance.stockpile_fuel)]
+
+
+def _extensive_form(lp, base, options, params, weights, env):
+  A, rhs, is_eq = lp.matrix_form(base["biomass_limit"])
+  R, N = A.shape
+  O, K = len(options), len(params)
+  eff = options["so2_reduced_eff"].to_numpy()
+  cap = eff * _so2_upper_bound(lp)
+  so2_row = lp.so2[lp.col_fuel]
+  stock_cost = _first_stage_cost(lp, base)
+
+  # Per scenario: rows x [S, y | x_s, r_s]; stockpile row burns at most S, the bubble nets out r_s
+  first = sp.bmat([
+    [sp.csr_matrix(([-1.0], ([lp.stockpile_row], [0])), shape=(R, 1)), sp.csr_matrix((R, O))],
+    [sp.csr_matrix((O, 1)), sp.csr_matrix((O, O))],
+    [sp.csr_matrix((O, 1)), sp.diags(-cap) if O else None],
+  ], format='csr')
+  local = sp.bmat([
+    [A, sp.csr_matrix((-np.ones(O), (np.full(O, lp.sulphur_row), np.arange(O))), shape=(R, O))],
+    [sp.csr_matrix(-eff[:, None] * so2_row[None, :]), sp.identity(O)],
+    [sp.csr_matrix((O, N)), sp.identity(O)],
+  ], format='csr')
+  choose_one = sp.hstack([sp.csr_matrix((1, 1)), sp.csr_matrix(np.ones((1, O))), sp.csr_matrix((1, K * (N + O)))])
+  M = sp.vstack([sp.hstack([sp.vstack([first] * K), sp.block_diag([local] * K)]), choose_one], format='csr')
+
+  stage_rhs = np.concatenate([rhs, np.zeros(2 * O)])
+  stage_rhs[lp.stockpile_row] = 0.0
+  all_rhs = np.concatenate([
+    *(np.where(np.arange(R + 2 * O) == lp.sulphur_row, min(p["so2_bubble_limit"], GRB.INFINITY), stage_rhs) for p in params),
+    [1.0],
+  ])
+  senses = np.concatenate([
+    *([np.where(np.concatenate([is_eq, np.zeros(2 * O, bool)]), '=', '<')] * K), ['<'],
+  ])
+  obj = np.concatenate([
+    [-stock_cost], -options["fgd_cost"].to_numpy(),
+    *(np.concatenate([w * _stage2_objective(lp, p), np.full(O, w * p["so2_price"])]) for p, w in zip(params, weights)),
+  ])
+  ub = np.full(obj.size, GRB.INFINITY)
+  ub[0] = lp.instance.stockpile_limit
+  ub[1:1 + O] = 1.0
+  vtype = np.full(obj.size, GRB.CONTINUOUS)
+  vtype[1:1 + O] = GRB.BINARY
+
+  model = gp.Model('purchase_extensive', env=env)
+  v = model.addMVar(obj.size, lb=0, ub=ub, obj=obj, vtype=vtype)
+  model.addMConstr(M, v, senses, all_rhs)
+  model.ModelSense = GRB.MAXIMIZE
+  model.optimize()
+  if model.Status != GRB.OPTIMAL:
+    raise ValueError(f"extensive form: model status {model.Status}")
+
+  X = v.X
+  stockpile, invest = X[0], X[1:1 + O]
+  local_x = X[1 + O:].reshape(K, N + O)
+  values = np.array([
+    _stage2_objective(lp, p) @ xs[:N] + p["so2_price"] * xs[N:].sum() for p, xs in zip(params, local_x)
+  ])
+  first_stage = -stock_cost * stockpile - options["fgd_cost"].to_numpy() @ invest
+  return _summary("extensive", options, stockpile, invest, first_stage, values, weights, size=(M.shape[0], M.shape[1]))
+
+
+def _benders(lp, base, options, params, weights, instance, env, workers, threads, tol, max_iterations):
+  O, K = len(options), len(params)
+  stock_cost = _first_stage_cost(lp, base)
+  fgd_cost = options["fgd_cost"].to_numpy()
+
+  master = gp.Model('purchase_master', env=env)
+  S = master.addVar(lb=0, ub=lp.instance.stockpile_limit, obj=-stock_cost, name='stockpile_purchase')
+  y = master.addMVar(O, vtype=GRB.BINARY, obj=-fgd_cost, name='invest_fgd')
+  theta = master.addMVar(K, lb=-GRB.INFINITY, obj=weights, name='theta')
+  if O:
+    master.addConstr(y.sum() <= 1, name='FGD_One_Option')
+  master.ModelSense = GRB.MAXIMIZE
+
+  chunks = [list(c) for c in np.array_split(np.arange(K), min(K, workers * 4)) if len(c)]
+  if workers == 1:
+    sub = _Subproblem(instance, base, options, env)
+    evaluate = lambda s, inv: [sub.evaluate(p, s, inv) for p in params]
+    pool = None
+  else:
+    # spawn, not fork: a forked Gurobi environment is not safe to reuse
+    pool = ProcessPoolExecutor(
+      max_workers=workers,
+      mp_context=multiprocessing.get_context("spawn"),
+      initializer=_init_worker,
+      initargs=(instance, base, options, params, threads),
+    )
+    evaluate = lambda s, inv: [
+      r for rs in pool.map(_evaluate_chunk, chunks, [s] * len(chunks), [inv] * len(chunks)) for r in rs
+    ]
+
+  # Q_s is concave, so the cut at any first stage bounds every theta; start from the full
+  # stockpile and no FGD, which is feasible for any number of options
+  stockpile, invest = lp.instance.stockpile_limit, np.zeros(O)
+  best, history = None, []
+  try:
+    for iteration in range(1, max_iterations + 1):
+      results = evaluate(stockpile, invest)
+      values = np.array([r[0] for r in results])
+      first_stage = -stock_cost * stockpile - fgd_cost @ invest
+      lower = first_stage + weights @ values
+      if best is None or lower > best[0]:
+        best = (lower, stockpile, invest, first_stage, values)
+      for s, (value, grad_stock, grad_invest) in enumerate(results):
+        master.addConstr(
+          theta[s] <= value + grad_stock * (S - stockpile) + grad_invest @ (y - invest),
+          name=f"cut[{iteration},{s}]",
+        )
+      master.optimize()
+      upper = master.ObjVal
+      history.append({"iteration": iteration, "lower": best[0], "upper": upper})
+      if upper - best[0] <= tol * max(1.0, abs(upper)):
+        break
+      stockpile, invest = S.X, np.round(y.X)
+  finally:
+    if pool is not None:
+      pool.shutdown()
+
+  lower, stockpile, invest, first_stage, values = best
+  return _summary(
+    "benders", options, stockpile, invest, first_stage, values, weights,
+    iterations=len(history), gap=upper - lower, history=pl.DataFrame(history),
+  )
+
+
+def stochastic_plan(
+    scenarios,
+    options=(),
+    method="extensive",
+    workers=None,
+    threads=1,
+    tol=1e-6,
+    max_iterations=200,
+    instance=None,
+    env=None,
+    **params,
+  ):
+  """Two-stage stochastic purchase plan over weighted scenarios.
+
+  The first stage commits the stockpile purchase (paid at the base ``fuel_cost``, up to the
+  stockpile limit) and at most one of the FGD ``options`` (dicts with ``option``,
+  ``so2_reduced_eff`` and ``fgd_cost``). Each entry of ``scenarios`` overrides ``run_model``
+  parameters such as ``price``, ``co2_price``, ``so2_price`` or ``fuel_cost`` for the
+  second-stage dispatch, with an optional ``weight`` (default equal). ``biomass_limit`` and
+  the FGD parameters cannot vary by scenario.
+
+  ``method="extensive"`` solves the deterministic equivalent as one LP (MIP with FGD options).
+  ``method="benders"`` runs a multi-cut L-shaped method: a small master over the first stage
+  and the scenario subproblems re-solved warm, across ``workers`` processes if more than one.
+  Returns the first-stage decisions, the expected profit and the profit per scenario.
+  """
+  if max_iterations < 1:
+    raise ValueError(f"max_iterations must be at least 1, got {max_iterations}")
+  base = _base_params(params)
+  options = _options_frame(list(options))
+  lp = PurchaseLP(instance)
+  scenario_params, weights = _scenario_params(lp, base, scenarios)
+
+  with nullcontext(env) if env is not None else default_pool().lease() as env:
+    if method == "extensive":
+      return _extensive_form(lp, base, options, scenario_params, weights, env)
+    if method == "benders":
+      workers = workers or max(1, (os.cpu_count() or 1) // threads)
+      return _benders(
+        lp, base, options, scenario_params, weights, instance, env,
+        min(workers, len(scenario_params)), threads, tol, max_iterations,
+      )
+  raise ValueError(f"unknown method {method!r}; use 'extensive' or 'benders'")
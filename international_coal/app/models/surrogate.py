@@ -0,0 +1,381 @@
+"""Train the KPI surrogate on stored sweeps and print its held-out errors.
+
+Run from ``app/``::
+
+  python -m models.surrogate results/ more_results/
+  python -m models.surrogate --sample 5000 --workers 8 --backend highs
+
+Sweeps are ``python -m international_coal`` output directories (or their ``kpis.parquet``);
+``--sample`` first solves a fresh sample sweep around the instance. The surrogate is written to
+``-o`` (default ``$COAL_SURROGATE`` or ``.surrogate/surrogate.joblib``), where the dashboard
+picks it up.
+"""
+import argparse
+import inspect
+import os
+import sys
+import time
+from pathlib import Path
+
+import joblib
+import lightgbm as lgb
+import numpy as np
+import polars as pl
+from sklearn.metrics import r2_score
+from sklearn.model_selection import train_test_split
+
+from .cli import PARAMS, main as cli_main, scenarios_from_rows
+from .instance import default_instance, load_instance
+from .model import PurchaseLP, solve_model
+from .sweep import run_scenarios, scenario_row
+
+# Scalar inputs used as features, next to one column per fuel cost and per period price
+SCALARS = tuple(p for p in PARAMS if p not in ("fuel_cost", "price"))
+# KPIs learned besides the tonnage of every fuel and the binding share of every constraint group
+KPIS = ("total_profit", "so2_emissions")
+# Training scenarios' Mahalanobis distance quantile beyond which a query is out of distribution
+OOD_QUANTILE = 0.99
+LGBM_PARAMS = {"n_estimators": 300, "learning_rate": 0.05, "num_leaves": 31, "min_child_samples": 10, "verbose": -1}
+# Drawn by ``sample_scenarios`` as (low, high) or (low, high, share of scenarios where it is 0);
+# fuel costs and prices move by up to ``spread`` around the instance's
+SAMPLE_RANGES = {
+  "roc": (35., 55.),
+  "co2_price": (0., 50.),
+  "so2_bubble_limit": (4_000., 20_000.),
+  "so2_price": (50., 300., 0.5),
+  "so2_reduced_eff": (0.5, 0.95),
+  "fgd_cost": (1e6, 3e7, 0.5),
+  "exchange_rate": (0.8, 0.95),
+  "biomass_limit": (0.05, 0.25),
+}
+
+DEFAULT_PATH = Path(os.getenv("COAL_SURROGATE", ".surrogate/surrogate.joblib"))
+
+
+def _apply_rules(X, features):
+  # the SO2 price / FGD rules of ``PurchaseLP.resolve``, row-wise
+  so2_price, bubble, eff, cost = (features.index(n) for n in ("so2_price", "so2_bubble_limit", "so2_reduced_eff", "fgd_cost"))
+  X[X[:, so2_price] != 0, bubble] = np.inf
+  off = (X[:, eff] == 0) | (X[:, cost] == 0)
+  X[off, eff] = 0.0
+  X[off, cost] = 0.0
+  return X
+
+
+def _tree_input(X):
+  # LightGBM routes missing values, so an SO2 bubble switched off by an SO2 price becomes NaN
+  return np.where(np.isinf(X), np.nan, X)
+
+
+def load_training(paths, instance=None):
+  """Scenario inputs and KPIs of stored sweeps, one row per optimal scenario.
+
+  Each path is a ``python -m international_coal`` output directory or its ``kpis.parquet``. If
+  the sweep also wrote ``sensitivity_constr``, ``binding_<group>`` columns give the share of
+  each constraint group's rows that bind.
+  """
+  groups = PurchaseLP(instance or default_instance()).constr_groups.value_counts(name="rows")
+  frames = []
+  for path in map(Path, paths):
+    kpis = path / "kpis.parquet" if path.is_dir() else path
+    df = pl.read_parquet(kpis).filter(pl.col("status") == "optimal")
+    if (constr := kpis.with_name("sensitivity_constr.parquet")).exists():
+      shares = (
+        pl.scan_parquet(constr)
+        .filter("Binding")
+        .group_by("scenario_id", "Group")
+        .len("binding")
+        .join(groups.lazy(), on="Group")
+        .select("scenario_id", pl.format("binding_{}", "Group").alias("group"), pl.col("binding") / pl.col("rows"))
+        .collect()
+        .pivot("group", index="scenario_id", values="binding")
+      )
+      df = df.join(shares, on="scenario_id", how="left").with_columns(
+        pl.col(f"binding_{g}").fill_null(0.0) if f"binding_{g}" in shares.columns else pl.lit(0.0).alias(f"binding_{g}")
+        for g in groups["Group"]
+      )
+    frames.append(df)
+  return pl.concat(frames, how="diagonal_relaxed")
+
+
+def _uniform(rng, n, lo, hi, zero=0.0):
+  return np.where(rng.random(n) < zero, 0.0, rng.uniform(lo, hi, n))
+
+
+def sample_scenarios(n, instance=None, spread=0.2, ranges=SAMPLE_RANGES, seed=0):
+  """``n`` random scenarios in the ``kpis.parquet`` layout, e.g. to train a first surrogate.
+
+  The ``ranges`` parameters are drawn uniformly, and are 0 in the given share of scenarios
+  (an SO2 price or an FGD that is switched off); every fuel cost and period price is the
+  instance's times a uniform factor in ``1 ± spread``.
+  """
+  instance = instance or default_instance()
+  rng = np.random.default_rng(seed)
+  cells = {
+    **{f"{f}_cost": c for f, c in instance.fuel_cost.items()},
+    **{"_".join(mb): p for mb, p in instance.price.items()},
+  }
+  return pl.DataFrame({
+    **{name: _uniform(rng, n, *bounds) for name, bounds in ranges.items()},
+    **{name: value * rng.uniform(1 - spread, 1 + spread, n) for name, value in cells.items()},
+  })
+
+
+class Surrogate:
+  """Gradient-boosted approximations of the KPIs of ``solve_model``, trained on stored sweeps.
+
+  ``fit`` learns one LightGBM model per KPI: total profit, SO2 emissions, the tonnage of every
+  fuel and, where the sweeps kept constraint tables, the share of each constraint group that
+  binds. ``report`` holds their errors on held-out scenarios; the final models are then refit
+  on all of them. ``predict`` answers one scenario in well under a millisecond and
+  ``in_distribution`` tells whether it resembles the training data: every input within its
+  training range and a Mahalanobis distance below the training ``OOD_QUANTILE``. Predictions
+  outside it are not to be trusted; solve those scenarios exactly.
+  """
+
+  def __init__(self, instance, boosters, report, domain):
+    self.instance = instance
+    self.boosters = boosters
+    self.report = report
+    self.domain = domain
+    signature = inspect.signature(solve_model).parameters
+    # feature values of a scenario that leaves every input at its default
+    self.defaults = scenario_row({
+      **{p: signature[p].default for p in SCALARS},
+      "so2_bubble_limit": instance.so2_bubble_limit,
+      "fuel_cost": instance.fuel_cost,
+      "price": instance.price,
+    }, {})
+    self.features = list(self.defaults)
+    lp = PurchaseLP(instance)
+    self._kcv, self._so2, self._is_biomass = lp.k * lp.cv, lp.so2, lp.is_biomass
+    self._transmission_cost, self._co2_factor = lp.transmission_cost, lp.co2_factor
+    # learned KPIs in tonnes, which cannot be negative
+    self._tonnes = {"so2_emissions", *lp.fuels}
+    self._price_cols = [self.features.index("_".join(mb)) for mb in instance.price]
+    hours = np.array([lp.hours[lp.months.index(m), lp.bands.index(b)] for m, b in instance.price])
+    self._hours = hours / hours.sum()
+    self._cost_cols = [self.features.index(f"{f}_cost") for f in lp.fuels]
+
+  @property
+  def targets(self):
+    return list(self.boosters)
+
+  @classmethod
+  def fit(cls, data, instance=None, test_size=0.2, seed=0, **params):
+    """Train on ``data`` from ``load_training``; ``params`` override ``LGBM_PARAMS``."""
+    surrogate = cls(instance or default_instance(), {}, None, None)
+    fuels = surrogate.instance.fuel_names
+    targets = [t for t in (*KPIS, *fuels) if t in data.columns] + sorted(c for c in data.columns if c.startswith("binding_"))
+    X = surrogate._matrix(data)
+    params = {**LGBM_PARAMS, "random_state": seed, **params}
+    rows = []
+    for target in targets:
+      y = data[target].cast(pl.Float64).fill_null(np.nan).to_numpy()
+      known = ~np.isnan(y)
+      X_train, X_test, y_train, y_test = train_test_split(X[known], y[known], test_size=test_size, random_state=seed)
+      predicted = lgb.LGBMRegressor(**params).fit(surrogate._design(X_train), y_train).booster_.predict(surrogate._design(X_test))
+      error = np.abs(predicted - y_test)
+      rows.append({
+        "kpi": target,
+        "n_train": y_train.size,
+        "n_test": y_test.size,
+        "mae": error.mean(),
+        "rmse": np.sqrt((error ** 2).mean()),
+        "p90_abs_error": np.quantile(error, 0.9),
+        "relative_mae": error.mean() / max(np.abs(y_test).mean(), 1e-9),
+        "r2": r2_score(y_test, predicted),
+      })
+      surrogate.boosters[target] = lgb.LGBMRegressor(**params).fit(surrogate._design(X[known]), y[known]).booster_
+    surrogate.report = pl.DataFrame(rows)
+    surrogate.domain = _domain(X)
+    return surrogate
+
+  def _filled(self, frame):
+    # feature columns of a frame in the ``kpis.parquet`` layout, defaults where absent
+    return frame.select(
+      pl.col(f).cast(pl.Float64).fill_null(self.defaults[f]) if f in frame.columns else pl.lit(self.defaults[f], pl.Float64).alias(f)
+      for f in self.features
+    )
+
+  def _matrix(self, frame):
+    return _apply_rules(self._filled(frame).to_numpy(), self.features)
+
+  def _design(self, X):
+    # the trees also see every fuel's margin (£/MWh) at the hours-weighted average price, which
+    # the LP's choices hinge on but no single input shows
+    column = lambda name: X[:, self.features.index(name)][:, None]
+    price = X[:, self._price_cols] @ self._hours
+    margin = (
+      price[:, None] - self._transmission_cost
+      - X[:, self._cost_cols] / self._kcv
+      - column("co2_price") * column("exchange_rate") * self._co2_factor
+      + column("roc") * self._is_biomass
+      - (1 - column("so2_reduced_eff")) * column("so2_price") * self._so2 / self._kcv
+    )
+    return _tree_input(np.hstack([X, price[:, None], margin]))
+
+  def _clip(self, target, values):
+    # trees can extrapolate past physical bounds between training points
+    if target.startswith("binding_"):
+      return np.clip(values, 0.0, 1.0)
+    return np.maximum(values, 0.0) if target in self._tonnes else values
+
+  def _predict(self, X, targets=None):
+    d = self.domain
+    x = self._design(X)
+    # one row is faster on one thread than after waking a thread pool
+    threads = 1 if len(X) == 1 else 0
+    predicted = {t: self._clip(t, self.boosters[t].predict(x, num_threads=threads)) for t in targets or self.targets}
+    finite = np.isfinite(X)
+    in_range = np.where(finite, (X >= d["lo"]) & (X <= d["hi"]), d["inf_seen"]).all(axis=1)
+    distance = _distance(X, d)
+    return predicted, in_range & (distance <= d["threshold"]), distance
+
+  def predict(self, **params):
+    """Predicted KPIs of one scenario given as ``solve_model`` keywords, plus ``in_distribution``
+    and its Mahalanobis ``distance`` to the training scenarios."""
+    inspect.signature(solve_model).bind(**params)
+    row = scenario_row({k: v for k, v in params.items() if v is not None}, {})
+    X = _apply_rules(np.array([[row.get(f, self.defaults[f]) for f in self.features]], dtype=float), self.features)
+    predicted, in_distribution, distance = self._predict(X)
+    return {
+      **{t: float(v[0]) for t, v in predicted.items()},
+      "in_distribution": bool(in_distribution[0]),
+      "distance": float(distance[0]),
+    }
+
+  def predict_frame(self, frame, targets=None):
+    """Predicted KPIs (all, or ``targets``), ``in_distribution`` and ``distance`` for every row of ``frame``."""
+    predicted, in_distribution, distance = self._predict(self._matrix(frame), targets)
+    return pl.DataFrame({**predicted, "in_distribution": in_distribution, "distance": distance})
+
+  def screen(self, candidates, n_best=100, key="total_profit", descending=True, batch_size=100_000, solve=True, **run):
+    """Rank candidate scenarios by a predicted KPI and solve the most promising ones exactly.
+
+    ``candidates`` is a frame (or lazy scan) in the ``kpis.parquet`` layout and is ranked
+    ``batch_size`` rows at a time on ``key`` alone, so millions of rows fit. Returns ``best``,
+    the ``n_best`` in-distribution candidates by predicted ``key`` with their inputs, a
+    ``candidate`` index, ``predicted_<kpi>`` columns and, if ``solve``, the exact KPIs from
+    ``run_scenarios(**run)``; and ``unscreened``, the out-of-distribution candidates, which need
+    exact solves of their own.
+    """
+    candidates = candidates.lazy()
+    best, unscreened, offset = None, [], 0
+    start = time.perf_counter()
+    while (batch := candidates.slice(offset, batch_size).collect()).height:
+      scored = pl.concat([
+        self._filled(batch).with_row_index("candidate", offset=offset),
+        self.predict_frame(batch, [key]).rename({key: f"predicted_{key}"}),
+      ], how="horizontal")
+      offset += batch.height
+      unscreened.append(scored.filter(~pl.col("in_distribution")))
+      top = scored.filter("in_distribution")
+      best = (top if best is None else pl.concat([best, top])).sort(f"predicted_{key}", descending=descending).head(n_best)
+    screened = time.perf_counter() - start
+    if best is not None:
+      others = [t for t in self.targets if t != key]
+      best = pl.concat([
+        best, self.predict_frame(best, others).select(pl.col(others).name.prefix("predicted_")),
+      ], how="horizontal")
+    if solve and best is not None and best.height:
+      scenarios = scenarios_from_rows(best.select(self.features).iter_rows(named=True), self.instance)
+      exact = run_scenarios(scenarios, instance=self.instance, **run)
+      targets = [t for t in self.targets if t in exact.columns]
+      best = best.with_row_index("scenario_id").join(
+        exact.select("scenario_id", "status", *targets), on="scenario_id", how="left"
+      ).drop("scenario_id")
+    return {
+      "best": best,
+      "unscreened": pl.concat(unscreened) if unscreened else None,
+      "candidates": offset,
+      "screen_s": screened,
+      "seconds": time.perf_counter() - start,
+    }
+
+  def save(self, path=DEFAULT_PATH):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # write-then-rename so the dashboard never loads a half-written file
+    joblib.dump(self, path.with_suffix(".tmp"))
+    path.with_suffix(".tmp").replace(path)
+
+  @classmethod
+  def load(cls, path=DEFAULT_PATH):
+    return joblib.load(path)
+
+
+def _domain(X):
+  # training ranges, and the distance threshold of a Mahalanobis check on standardised inputs
+  finite = np.where(np.isfinite(X), X, np.nan)
+  mean = np.nanmean(finite, axis=0)
+  scale = np.nanstd(finite, axis=0)
+  domain = {
+    "lo": np.nanmin(finite, axis=0),
+    "hi": np.nanmax(finite, axis=0),
+    "inf_seen": np.isinf(X).any(axis=0),
+    "mean": mean,
+    "scale": np.where(scale > 0, scale, 1.0),
+  }
+  Z = _standardise(X, domain)
+  domain["precision"] = np.linalg.pinv(np.cov(Z, rowvar=False))
+  domain["threshold"] = np.quantile(_distance(X, domain), OOD_QUANTILE)
+  return domain
+
+
+def _standardise(X, domain):
+  return np.where(np.isfinite(X), (X - domain["mean"]) / domain["scale"], 0.0)
+
+
+def _distance(X, domain):
+  Z = _standardise(X, domain)
+  return np.sqrt(np.maximum(np.einsum("ij,jk,ik->i", Z, domain["precision"], Z), 0.0))
+
+
+def default_surrogate():
+  """The surrogate at ``$COAL_SURROGATE``, or ``None`` if none has been trained."""
+  return Surrogate.load(DEFAULT_PATH) if DEFAULT_PATH.exists() else None
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(prog="python -m models.surrogate", description=__doc__.splitlines()[0])
+  parser.add_argument("sweeps", nargs="*", type=Path, help="sweep output directories or kpis.parquet files")
+  parser.add_argument("-o", "--out", type=Path, default=DEFAULT_PATH, help=f"surrogate file (default: {DEFAULT_PATH})")
+  parser.add_argument("--sample", type=int, help="first solve this many random scenarios and train on them too")
+  parser.add_argument("--workers", type=int, help="solver processes for --sample (default: one per core)")
+  parser.add_argument("--backend", choices=("gurobi", "highs"), default="gurobi")
+  parser.add_argument("--instance", type=Path, help="instance JSON file or directory (default: the case study)")
+  parser.add_argument("--test-size", type=float, default=0.2, help="share of scenarios held out for the error report")
+  parser.add_argument("--seed", type=int, default=0)
+  args = parser.parse_args(argv)
+  if not args.sweeps and not args.sample:
+    parser.error("give sweep directories, --sample, or both")
+
+  instance = load_instance(args.instance) if args.instance else default_instance()
+  sweeps = list(args.sweeps)
+  if args.sample:
+    sample_dir = args.out.parent / "sample"
+    sample_dir.mkdir(parents=True, exist_ok=True)
+    sample_scenarios(args.sample, instance, seed=args.seed).write_parquet(sample_dir / "scenarios.parquet")
+    cli_main([
+      str(sample_dir / "scenarios.parquet"), "-o", str(sample_dir), "--tables", "sensitivity_constr",
+      "--backend", args.backend,
+      *(["--workers", str(args.workers)] if args.workers else []),
+      *(["--instance", str(args.instance)] if args.instance else []),
+    ])
+    sweeps.append(sample_dir)
+
+  # the class as imported by everyone else, not this ``__main__`` copy, so the file loads anywhere
+  from .surrogate import Surrogate as Importable
+  start = time.perf_counter()
+  data = load_training(sweeps, instance)
+  surrogate = Importable.fit(data, instance, test_size=args.test_size, seed=args.seed)
+  surrogate.save(args.out)
+  with pl.Config(tbl_rows=-1, tbl_cols=-1, tbl_width_chars=200):
+    print(surrogate.report)
+  print(f"trained on {data.height} scenarios in {time.perf_counter() - start:.1f}s; wrote {args.out}")
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
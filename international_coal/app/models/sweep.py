@@ -0,0 +1,158 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import islice
+from pathlib import Path
+
+import gurobipy as gp
+import polars as pl
+
+from .model import CoalPurchaseModel, solve_model
+from .results import SENSITIVITY_TABLES
+
+# Per-scenario tables run_scenarios can write next to the KPIs, and the output each one needs
+TABLE_OUTPUTS = {
+  "fuel_strategy": "fuel_strategy",
+  "biomass_share": "biomass_share",
+  **{name: "sensitivity" for name in SENSITIVITY_TABLES},
+}
+
+# One long-lived environment and model per worker process
+_worker_template = None
+
+
+def _init_worker(threads, backend="gurobi", instance=None):
+  global _worker_template
+  if backend == "highs":
+    # imported here so Gurobi workers never load HiGHS
+    from .highs import HighsPurchaseModel
+    _worker_template = HighsPurchaseModel(instance, threads=threads)
+  else:
+    env = gp.Env(params={"OutputFlag": 0, "Threads": threads})
+    _worker_template = CoalPurchaseModel(instance, env=env)
+
+
+def scenario_row(scenario, result):
+  """Flatten a scenario and its ``run_model`` result dict into one table row."""
+  row = {}
+  for key, value in {**scenario, **result}.items():
+    if key == "fuel_cost":
+      row.update({f"{f}_cost": cost for f, cost in value.items()})
+    elif key == "price":
+      row.update({"_".join(mb): p for mb, p in value.items()})
+    else:
+      row[key] = value
+  return row
+
+
+def _table(result, name):
+  return result.sensitivity_frames[name] if name in SENSITIVITY_TABLES else getattr(result, name)
+
+
+def _solve_chunk(chunk, tables=()):
+  rows, frames = [], {name: [] for name in tables}
+  outputs = {"kpis", *(TABLE_OUTPUTS[name] for name in tables)}
+  for scenario_id, scenario in chunk:
+    try:
+      result = solve_model(**scenario, template=_worker_template, outputs=outputs)
+      row = {"scenario_id": scenario_id, "status": result.status_name, **scenario_row(scenario, result.kpis)}
+      extracted = {name: _table(result, name) for name in tables}
+    except (gp.GurobiError, ValueError) as e:
+      rows.append({"scenario_id": scenario_id, "status": f"failed: {e}", **scenario_row(scenario, {})})
+      continue
+    rows.append(row)
+    for name, df in extracted.items():
+      frames[name].append(df.select(pl.lit(scenario_id, dtype=pl.Int64).alias("scenario_id"), pl.all()))
+  tables = {name: pl.concat(dfs, how="diagonal_relaxed") for name, dfs in frames.items() if dfs}
+  return pl.DataFrame(rows, infer_schema_length=None), tables
+
+
+def _chunks(scenarios, chunk_size, done):
+  it = ((i, s) for i, s in enumerate(scenarios) if i not in done)
+  while chunk := list(islice(it, chunk_size)):
+    yield chunk
+
+
+def run_scenarios(
+    scenarios,
+    workers=None,
+    threads=1,
+    chunk_size=64,
+    checkpoint_dir=None,
+    backend="gurobi",
+    tables=(),
+    instance=None,
+  ):
+  """Solve many ``run_model`` scenarios across a process pool.
+
+  Each worker keeps one Gurobi environment (``Threads=threads``) and one ``CoalPurchaseModel``
+  for its lifetime. Finished chunks are written to ``checkpoint_dir`` as Parquet parts; calling
+  again with the same scenarios and directory only solves the scenarios that are missing.
+  Scenarios are identified by their position in ``scenarios``. ``backend="highs"`` solves with
+  HiGHS instead, which needs no Gurobi license per worker.
+
+  ``tables`` names per-scenario tables from ``TABLE_OUTPUTS`` (``fuel_strategy``,
+  ``sensitivity_var``, ...) to write as ``checkpoint_dir/<table>/part-*.parquet``, each with a
+  ``scenario_id`` column; the return value is still the KPI table. ``instance`` replaces the
+  default instance in every worker.
+  """
+  if backend not in ("gurobi", "highs"):
+    raise ValueError(f"unknown backend {backend!r}; use 'gurobi' or 'highs'")
+  if unknown := set(tables) - TABLE_OUTPUTS.keys():
+    raise ValueError(f"unknown tables {sorted(unknown)}; choose from {sorted(TABLE_OUTPUTS)}")
+  if tables and checkpoint_dir is None:
+    raise ValueError("tables are written to checkpoint_dir; pass one")
+  workers = workers or max(1, (os.cpu_count() or 1) // threads)
+  parts, done = [], set()
+
+  if checkpoint_dir is not None:
+    checkpoint_dir = Path(checkpoint_dir)
+    checkpoint_dir.mkdir(parents=True, exist_ok=True)
+    if existing := sorted(checkpoint_dir.glob("part-*.parquet")):
+      parts.append(pl.concat([pl.read_parquet(p) for p in existing], how="diagonal_relaxed"))
+      done = set(parts[0]["scenario_id"].to_list())
+
+  def write(df, directory, first):
+    # write-then-rename so a crash never leaves a truncated part behind
+    directory.mkdir(exist_ok=True)
+    path = directory / f"part-{first:08d}.parquet"
+    df.write_parquet(path.with_suffix(".tmp"))
+    path.with_suffix(".tmp").replace(path)
+
+  def collect(solved):
+    df, frames = solved
+    if checkpoint_dir is not None:
+      first = df['scenario_id'].min()
+      # the KPI part goes last: a chunk only counts as done once it exists
+      for name, frame in frames.items():
+        write(frame, checkpoint_dir / name, first)
+      write(df, checkpoint_dir, first)
+    parts.append(df)
+
+  chunks = _chunks(scenarios, chunk_size, done)
+  if workers == 1:
+    _init_worker(threads, backend, instance)
+    for chunk in chunks:
+      collect(_solve_chunk(chunk, tables))
+  else:
+    # spawn, not fork: a forked Gurobi environment is not safe to reuse
+    with ProcessPoolExecutor(
+      max_workers=workers,
+      mp_context=multiprocessing.get_context("spawn"),
+      initializer=_init_worker,
+      initargs=(threads, backend, instance),
+    ) as pool:
+      pending = set()
+      for chunk in chunks:
+        pending.add(pool.submit(_solve_chunk, chunk, tables))
+        # keep the queue bounded so huge generators are not materialised up front
+        if len(pending) >= 2 * workers:
+          finished = next(as_completed(pending))
+          pending.remove(finished)
+          collect(finished.result())
+      for finished in as_completed(pending):
+        collect(finished.result())
+
+  if not parts:
+    return pl.DataFrame()
+  return pl.concat(parts, how="diagonal_relaxed").sort("scenario_id")
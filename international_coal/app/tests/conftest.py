@@ -0,0 +1,16 @@
+import gurobipy as gp
+import pytest
+
+from models import CoalPurchaseModel
+
+
+@pytest.fixture(scope="session")
+def env():
+  env = gp.Env(params={"OutputFlag": 0})
+  yield env
+  env.dispose()
+
+
+@pytest.fixture
+def template(env):
+  return CoalPurchaseModel(env=env)
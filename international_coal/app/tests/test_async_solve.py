@@ -0,0 +1,49 @@
+import gc
+from functools import partial
+
+import pytest
+
+from models import AsyncSolver, HighsPurchaseModel, ResultCache, cached_run_model
+
+
+class _Interrupted(HighsPurchaseModel):
+  """A template whose every solve is stopped, as ``terminate`` does to a superseded one."""
+
+  def _interrupt(self, event):
+    event.interrupt(True)
+
+
+@pytest.mark.parametrize("case", ["infeasible", "interrupted"])
+def test_failed_solves_are_not_cached(tmp_path, template, case):
+  cache = ResultCache(path=tmp_path)
+  if case == "infeasible":
+    params = {"so2_bubble_limit": -1., "template": template}
+  else:
+    params = {"template": _Interrupted()}
+  for _ in range(2):
+    with pytest.raises(ValueError):
+      cached_run_model(cache, **params)
+  assert cache.stats()["size"] == 0
+  assert not any(tmp_path.iterdir())
+
+
+def test_newest_scenario_wins_and_is_cached(template):
+  cache = ResultCache()
+  solver = AsyncSolver(template=template, solve=partial(cached_run_model, cache), debounce=0.05)
+  superseded = solver.submit(co2_price=10.)
+  latest = solver.submit(co2_price=20.)
+  assert solver.wait(latest, timeout=30)
+  assert superseded.result() is None
+  seq, params, result = solver.latest
+  assert params == {"co2_price": 20.} and result[2]["co2_price"] == 20.
+  assert cache.stats()["size"] == 1
+  solver.shutdown()
+
+
+def test_dropped_solver_shuts_its_thread_down(template):
+  solver = AsyncSolver(template=template, debounce=0.)
+  assert solver.wait(solver.submit(co2_price=12.), timeout=30)
+  executor = solver._executor
+  del solver
+  gc.collect()
+  assert executor._shutdown
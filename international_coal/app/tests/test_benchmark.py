@@ -0,0 +1,22 @@
+import polars as pl
+import pytest
+
+from models.benchmark import compare_to_baseline, load_baseline, run_benchmark, save_baseline
+
+SMALL = {"n_fuels": 3, "n_months": 2, "n_bands": 2}
+
+
+def test_benchmark_round_trips_and_flags_regressions(tmp_path):
+  results = run_benchmark(sizes=(SMALL,), scenarios=({}, {"co2_price": 40.0}), repeat=1)
+  assert results["status"].to_list() == ["ok", "ok"]
+  assert results["total_profit"][0] == pytest.approx(results["total_profit"][1])
+
+  save_baseline(results, tmp_path / "baseline.json")
+  baseline = load_baseline(tmp_path / "baseline.json")
+  assert not compare_to_baseline(results, baseline)["regressed"].any()
+
+  # four times slower to build, but by less than min_seconds
+  baseline = baseline.with_columns(build_s=pl.lit(0.001))
+  slower = results.with_columns(optimize_s=pl.col("optimize_s") * 2 + 0.01, build_s=pl.lit(0.004))
+  regressed = compare_to_baseline(slower, baseline).filter(pl.col("regressed"))
+  assert regressed["phase"].unique().to_list() == ["optimize_s"]
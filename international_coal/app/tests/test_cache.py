@@ -0,0 +1,30 @@
+import pytest
+
+from models import ResultCache, cached_run_model, default_instance, scenario_hash
+
+
+def test_hash_ignores_order_and_spelled_out_defaults():
+  instance = default_instance()
+  assert scenario_hash(co2_price=20., roc=45.) == scenario_hash(roc=45, co2_price=20)
+  assert scenario_hash() == scenario_hash(price=instance.price, fuel_cost=instance.fuel_cost)
+  assert scenario_hash() != scenario_hash(co2_price=20.)
+
+
+def test_lru_and_disk_tiers(tmp_path, template):
+  cache = ResultCache(maxsize=1, path=tmp_path)
+  base = cached_run_model(cache, template=template)
+  cached_run_model(cache, co2_price=30., template=template)
+  # the base scenario was evicted from memory but is read back from disk
+  again = cached_run_model(cache, template=template)
+  assert cache.stats() == {"hits": 0, "disk_hits": 1, "misses": 2, "size": 1, "maxsize": 1}
+  assert again[2]["total_profit"] == pytest.approx(base[2]["total_profit"])
+  assert again[1].equals(base[1])
+
+
+def test_infeasible_scenarios_are_not_cached(tmp_path, template):
+  cache = ResultCache(path=tmp_path)
+  cached_run_model(cache, template=template)
+  with pytest.raises(ValueError, match="inf"):
+    cached_run_model(cache, so2_bubble_limit=-1., template=template)
+  assert cache.stats()["size"] == 1
+  assert len(list(tmp_path.iterdir())) == 1
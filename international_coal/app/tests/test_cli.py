@@ -0,0 +1,31 @@
+import json
+
+import polars as pl
+import pytest
+
+from models import default_instance, solve_model
+from models.cli import main, scenarios_from_rows
+
+
+def test_flat_columns_become_cost_and_price_dicts():
+  instance = default_instance()
+  fuel, (month, band) = instance.fuel_names[0], next(iter(instance.price))
+  scenario, = scenarios_from_rows([{"co2_price": 30., f"{fuel}_cost": 99., f"{month}_{band}": 70., "roc": None}])
+  assert scenario["co2_price"] == 30. and "roc" not in scenario
+  assert scenario["fuel_cost"] == {**instance.fuel_cost, fuel: 99.}
+  assert scenario["price"] == {**instance.price, (month, band): 70.}
+  with pytest.raises(ValueError, match="unknown scenario field"):
+    scenarios_from_rows([{"co2_prise": 30.}])
+
+
+def test_batch_run_writes_kpis_and_tables(tmp_path, capsys):
+  scenarios = [{}, {"co2_price": 30.}]
+  (tmp_path / "scenarios.json").write_text(json.dumps({"scenarios": scenarios}))
+  out = tmp_path / "out"
+  assert main([str(tmp_path / "scenarios.json"), "-o", str(out), "--workers", "1", "--tables", "fuel_strategy"]) == 0
+  kpis = pl.read_parquet(out / "kpis.parquet").sort("scenario_id")
+  assert kpis["status"].to_list() == ["optimal", "optimal"]
+  assert kpis["total_profit"].to_list() == pytest.approx([solve_model(**s).kpis["total_profit"] for s in scenarios])
+  assert pl.read_parquet(out / "fuel_strategy.parquet")["scenario_id"].unique().sort().to_list() == [0, 1]
+  assert not (out / "parts").exists()
+  assert "2 scenarios" in capsys.readouterr().out
@@ -0,0 +1,27 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from models import CoalPurchaseModel, EnvPool, solve_model
+
+
+def test_templates_are_built_once_per_environment_and_shared():
+  pool = EnvPool(size=2, build_template=lambda env: CoalPurchaseModel(env=env))
+  def solve(co2_price):
+    with pool.lease_template() as template:
+      return id(template), solve_model(co2_price=co2_price, template=template, outputs={"kpis"}).kpis["total_profit"]
+  with ThreadPoolExecutor(4) as threads:
+    solved = list(threads.map(solve, [10., 20., 10., 20., 10., 20.]))
+  assert len({template for template, _ in solved}) <= 2
+  assert [p for _, p in solved[::2]] == pytest.approx([solved[0][1]] * 3)
+  stats = pool.stats()
+  assert stats["leases"] == 6 and stats["in_use"] == 0 and stats["timeouts"] == 0
+
+
+def test_lease_times_out_when_every_environment_is_busy():
+  pool = EnvPool(size=1)
+  with pool.lease():
+    with pytest.raises(TimeoutError):
+      with pool.lease(timeout=0.01):
+        pass
+  assert pool.stats()["timeouts"] == 1
@@ -0,0 +1,29 @@
+from datetime import datetime
+
+import polars as pl
+
+from models import ExperimentStore
+
+
+def _sens(value):
+  return pl.DataFrame({"Variable": ["x[a]", "x[b]"], "RC": [value, 0.0], "Binding": [value != 0, False]})
+
+
+def _append(store, key, co2_price, timestamp):
+  constr = pl.DataFrame({"Constraint": ["cap"], "Pi (Dual Value)": [co2_price], "Binding": [True]})
+  return store.append(key, {"co2_price": co2_price, "base_case": key == "h0"}, _sens(co2_price), constr, timestamp=timestamp)
+
+
+def test_append_is_idempotent_and_survives_compaction(tmp_path):
+  store = ExperimentStore(tmp_path)
+  assert _append(store, "h0", 15., datetime(2026, 1, 1, 9))
+  assert not _append(store, "h0", 15., datetime(2026, 1, 1, 10))
+  assert _append(store, "h1", 20., datetime(2026, 1, 1, 11))
+  assert _append(store, "h2", 25., datetime(2026, 1, 2, 9))
+
+  before = store.scan("sens_var").sort("timestamp", "Variable").collect()
+  store.compact()
+  reopened = ExperimentStore(tmp_path)
+  assert len(reopened) == 3
+  assert reopened.scan("sens_var").sort("timestamp", "Variable").collect().equals(before)
+  assert len(list((tmp_path / "sens_var" / "date=2026-01-01").glob("*.parquet"))) == 1
@@ -0,0 +1,24 @@
+import pytest
+
+from models import fgd_decision, synthetic_instance
+
+OPTIONS = [
+  {"option": "basic", "so2_reduced_eff": 0.5, "fgd_cost": 200_000.},
+  {"option": "premium", "so2_reduced_eff": 0.9, "fgd_cost": 1_500_000.},
+]
+
+
+@pytest.mark.parametrize("instance", [None, synthetic_instance(n_fuels=4, n_months=3, n_bands=4)], ids=["case", "synthetic"])
+@pytest.mark.parametrize("bubble", [3_000., 9_000.])
+def test_mip_and_decomposed_agree(env, instance, bubble):
+  mip = fgd_decision(OPTIONS, mode="mip", instance=instance, env=env, so2_bubble_limit=bubble)
+  decomposed = fgd_decision(OPTIONS, mode="decomposed", workers=1, instance=instance, so2_bubble_limit=bubble)
+  assert mip["option"] == decomposed["option"]
+  assert mip["total_profit"] == pytest.approx(decomposed["total_profit"])
+  assert mip["no_invest_profit"] == pytest.approx(decomposed["no_invest_profit"])
+
+
+@pytest.mark.parametrize("mode", ["mip", "decomposed"])
+def test_infeasible_bubble_raises_with_the_status(env, mode):
+  with pytest.raises(ValueError, match="without investment: .*inf|FGD decision: inf"):
+    fgd_decision(OPTIONS, mode=mode, workers=1, env=env, so2_bubble_limit=-1.)
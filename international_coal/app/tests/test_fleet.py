@@ -0,0 +1,25 @@
+import dataclasses
+
+import pytest
+
+from models import CoalPurchaseModel, fleet_decomposition, solve_model, synthetic_instance
+
+FLEET = synthetic_instance(n_plants=4)
+# tight shared limits, so the SO2 multiplier matters
+TIGHT = dataclasses.replace(
+  FLEET, stockpile_limit=0.2 * FLEET.stockpile_limit, so2_bubble_limit=0.3 * FLEET.so2_bubble_limit,
+)
+
+
+@pytest.mark.parametrize("method", ["subgradient", "bundle"])
+def test_decomposition_closes_the_gap_to_the_monolithic_optimum(env, method):
+  # identical plants sharing every row add up to one plant of the total capacity
+  template = CoalPurchaseModel(TIGHT, env=env)
+  optimum = solve_model(template=template, outputs={"kpis"}).kpis["total_profit"]
+  so2_price = template.duals()[template.sulphur_row]
+
+  result = fleet_decomposition(method=method, instance=TIGHT, workers=1, tol=1e-4, env=env)
+  assert result["gap"] <= 1e-4
+  assert result["total_profit"] <= optimum * (1 + 1e-9) <= result["upper_bound"] * (1 + 1e-9)
+  assert result["total_profit"] == pytest.approx(optimum, rel=1e-4)
+  assert result["multipliers"]["so2"] == pytest.approx(so2_price, rel=0.1)
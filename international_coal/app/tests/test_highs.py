@@ -0,0 +1,21 @@
+import numpy as np
+import pytest
+
+from models import CoalPurchaseModel, HighsPurchaseModel, solve_model, synthetic_instance
+
+SCENARIOS = [{}, {"co2_price": 35., "biomass_limit": 0.2}, {"so2_price": 500.}, {"so2_reduced_eff": 0.8, "fgd_cost": 1e5}]
+
+
+@pytest.mark.parametrize("instance", [None, synthetic_instance(n_fuels=5, n_months=4, n_bands=6)], ids=["case", "synthetic"])
+def test_highs_matches_gurobi(env, instance):
+  gurobi, highs = CoalPurchaseModel(instance, env=env), HighsPurchaseModel(instance)
+  for scenario in SCENARIOS:
+    results = [solve_model(**scenario, template=t) for t in (gurobi, highs)]
+    kpis = [r.kpis for r in results]
+    assert kpis[1]["total_profit"] == pytest.approx(kpis[0]["total_profit"], rel=1e-9)
+    assert kpis[1]["so2_emissions"] == pytest.approx(kpis[0]["so2_emissions"], rel=1e-6, abs=1e-6)
+    # duals can differ only where the LP is dual degenerate; their value at the right-hand sides cannot
+    rhs = gurobi.model.getAttr("RHS", gurobi.constrs)
+    duals = [np.where(np.abs(rhs) < 1e100, rhs, 0.0) @ t.duals() for t in (gurobi, highs)]
+    assert duals[1] == pytest.approx(duals[0], rel=1e-6)
+    assert results[1].sensitivity_frames["sensitivity_var"].columns == results[0].sensitivity_frames["sensitivity_var"].columns
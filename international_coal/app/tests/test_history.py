@@ -0,0 +1,51 @@
+from datetime import datetime
+
+import polars as pl
+import pytest
+
+from models import ExperimentStore, change_summary, sensitivity_history
+
+
+def _append(store, key, rc, timestamp, **change_log):
+  sens_var = pl.DataFrame({"Variable": ["x[a]", "x[b]"], "RC": [rc, 0.0], "Binding": [rc != 0, False]})
+  sens_const = pl.DataFrame({"Constraint": ["cap"], "Pi (Dual Value)": [rc], "Binding": [True]})
+  store.append(key, {"base_case": False, **change_log}, sens_var, sens_const, timestamp=timestamp)
+
+
+@pytest.mark.parametrize("against", ["previous", "base"])
+def test_empty_store_gives_an_empty_history(tmp_path, against):
+  history = sensitivity_history(ExperimentStore(tmp_path), "sens_var", against=against).collect()
+  assert history.height == 0
+  assert {"Variable", "RC", "ref_timestamp", "BindingChange", "RCDelta", "RCChange"} <= set(history.columns)
+  assert change_summary(history.lazy()).collect().height == 0
+
+
+def test_changes_against_previous_and_base(tmp_path):
+  store = ExperimentStore(tmp_path)
+  _append(store, "h0", 0.0, datetime(2026, 1, 1, 9), base_case=True)
+  _append(store, "h1", 2.0, datetime(2026, 1, 1, 10))
+  _append(store, "h2", 2.5, datetime(2026, 1, 2, 9))
+
+  previous = sensitivity_history(store).filter(pl.col("Variable") == "x[a]").sort("timestamp").collect()
+  assert previous["RCDelta"].to_list() == [None, 2.0, 0.5]
+  assert previous["BindingChange"].to_list() == [None, True, False]
+
+  base = sensitivity_history(store, against="base").filter(pl.col("Variable") == "x[a]").sort("timestamp").collect()
+  assert base["RCDelta"].to_list() == [0.0, 2.0, 2.5]
+
+
+def test_experiments_in_the_same_second_keep_their_order(tmp_path):
+  store = ExperimentStore(tmp_path)
+  for i, rc in enumerate([1.0, 3.0, 6.0]):
+    _append(store, f"h{i}", rc, None)
+  history = sensitivity_history(store).filter(pl.col("Variable") == "x[a]").sort("timestamp").collect()
+  assert history["timestamp"].n_unique() == 3
+  assert history["RCDelta"].to_list() == [None, 2.0, 3.0]
+
+
+def test_parameters_added_later_are_kept(tmp_path):
+  store = ExperimentStore(tmp_path)
+  _append(store, "h0", 0.0, datetime(2026, 1, 1, 9), co2_price=15.)
+  _append(store, "h1", 1.0, datetime(2026, 1, 1, 10), co2_price=15., so2_price=40.)
+  change_log = store.scan("change_log").sort("timestamp").collect()
+  assert change_log["so2_price"].to_list() == [None, 40.]
@@ -0,0 +1,22 @@
+import pytest
+
+from models import CoalPurchaseModel, default_instance, load_instance, save_instance, solve_model, synthetic_instance
+
+
+@pytest.mark.parametrize("name", ["instance.json", "instance"])
+def test_saved_instance_round_trips(tmp_path, env, name):
+  instance = synthetic_instance(n_fuels=4, n_months=3, n_bands=4)
+  loaded = load_instance(save_instance(instance, tmp_path / name))
+  assert loaded.fingerprint == instance.fingerprint
+  profits = [
+    solve_model(co2_price=20., template=CoalPurchaseModel(i, env=env), outputs={"kpis"}).kpis["total_profit"]
+    for i in (instance, loaded)
+  ]
+  assert profits[0] == pytest.approx(profits[1])
+
+
+def test_case_study_shape():
+  instance = default_instance()
+  assert len(instance.fuel_names) == 5
+  assert (len(instance.months), len(instance.bands)) == (5, 4)
+  assert instance.hours.sum() == pytest.approx(3_672)
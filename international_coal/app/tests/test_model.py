@@ -0,0 +1,48 @@
+import pytest
+
+from models import CoalPurchaseModel, solve_model
+
+# Case-study profit at the default scenario
+BASE_PROFIT = 22_657_167.58
+
+
+def test_reused_template_matches_fresh_builds(env, template):
+  scenarios = [{}, {"co2_price": 30.}, {"biomass_limit": 0.2, "so2_bubble_limit": 5_000.}, {"roc": 40.}, {}]
+  reused = [solve_model(**s, template=template, outputs={"kpis"}).kpis["total_profit"] for s in scenarios]
+  fresh = [
+    solve_model(**s, template=CoalPurchaseModel(env=env), outputs={"kpis"}).kpis["total_profit"]
+    for s in scenarios
+  ]
+  assert reused == pytest.approx(fresh)
+  assert reused[0] == pytest.approx(BASE_PROFIT)
+
+
+def test_matrix_form_is_the_gurobi_model(template):
+  A, rhs, is_equality = template.matrix_form()
+  model = template.model
+  assert abs(model.getA() - A).max() == 0
+  assert model.getAttr("RHS", template.constrs) == pytest.approx(rhs.tolist())
+  assert not is_equality.any()
+  assert template.constr_names.to_list() == [c.ConstrName for c in template.constrs]
+
+
+def test_bulk_sensitivity_arrays_match_per_object_attributes(template):
+  solve_model(template=template, outputs={"kpis"})
+  sa = template.sensitivity_arrays()
+  model = template.model
+  for attr in ("X", "RC", "SAObjUp", "SAObjLow"):
+    assert sa[attr].tolist() == pytest.approx([getattr(v, attr) for v in model.getVars()])
+  for attr in ("Slack", "Pi"):
+    assert sa[attr].tolist() == pytest.approx([getattr(c, attr) for c in model.getConstrs()])
+  assert sa["var_names"].to_list() == [v.VarName for v in model.getVars()]
+
+
+@pytest.mark.parametrize("scenario", [{}, {"roc": 60., "co2_price": 30.}])
+def test_kpi_breakdown_adds_up_to_the_profit(template, scenario):
+  kpis = solve_model(**scenario, template=template, outputs={"kpis"}).kpis
+  parts = (
+    kpis["revenue_minus_transmission"] + kpis["roc_incentive"]
+    - kpis["total_fuel_cost"] - kpis["total_co2_cost"] - kpis["total_so2_cost"] - kpis["fgd_cost"]
+  )
+  assert parts == pytest.approx(kpis["total_profit"])
+  assert kpis["co2_emissions"] == pytest.approx(template.co2_factor * kpis["total_generation"])
@@ -0,0 +1,42 @@
+import inspect
+import math
+
+import numpy as np
+import pytest
+from scipy import stats
+
+from models import PurchaseLP, monte_carlo_risk, solve_model
+from models.montecarlo import QuantileSketch, _Sampler, _scenario
+
+DISTRIBUTIONS = {"price": stats.uniform(0.8, 0.4), "co2_price": stats.uniform(0., 60.)}
+
+
+def test_sketch_quantiles_within_relative_accuracy():
+  values = np.random.default_rng(0).lognormal(15., 1., 5_000) - 2e6
+  merged = QuantileSketch(0.005)
+  for part in np.array_split(values, 7):
+    sketch = QuantileSketch(0.005)
+    sketch.add(part)
+    merged.merge(sketch)
+  assert merged.mean == pytest.approx(values.mean())
+  assert merged.std == pytest.approx(values.std(ddof=1))
+  q = np.array([0.01, 0.5, 0.99])
+  exact = np.sort(values)[np.floor(q * (values.size - 1)).astype(int)]
+  assert merged.quantile(q) == pytest.approx(exact, rel=0.0051)
+
+
+def test_risk_matches_direct_solves():
+  n = 40
+  risk = monte_carlo_risk(DISTRIBUTIONS, n_samples=n, correlation={("price", "co2_price"): 0.5},
+                          alphas=(0.1,), seed=7, workers=1, batch_size=n)
+  # one batch: the same draws the run made
+  draws = _Sampler(DISTRIBUTIONS, {("price", "co2_price"): 0.5}).draw(np.random.default_rng([7, 0]), n)
+  base = {k: p.default for k, p in inspect.signature(solve_model).parameters.items()
+          if k not in ("summary", "template", "outputs")}
+  instance = PurchaseLP().instance
+  base.update(price=instance.price, fuel_cost=instance.fuel_cost, so2_bubble_limit=instance.so2_bubble_limit)
+  profits = np.sort([solve_model(**_scenario(base, draws, i)).kpis["total_profit"] for i in range(n)])
+  k = math.ceil(0.1 * n)
+  assert risk["samples"] == n and risk["failed"] == 0
+  assert risk["risk"]["VaR"][0] == pytest.approx(profits[k - 1])
+  assert risk["risk"]["CVaR"][0] == pytest.approx(profits[:k].mean())
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from models import HighsPurchaseModel, breakpoints, parametric_curve, solve_model
+
+
+def _interpolate(segments, theta):
+  x = np.append(segments["theta_start"].to_numpy(), segments["theta_end"][-1])
+  y = np.append(segments["profit_start"].to_numpy(), segments["profit_end"][-1])
+  return np.interp(theta, x, y)
+
+
+@pytest.mark.parametrize("parameter, lo, hi", [("co2_price", 0., 60.), ("so2_bubble_limit", 1_000., 20_000.)])
+def test_curve_matches_point_solves(template, parameter, lo, hi):
+  segments, solves = parametric_curve(parameter, lo, hi, template=template)
+  thetas = np.linspace(lo, hi, 13)
+  exact = [solve_model(**{parameter: t}, template=template, outputs={"kpis"}).kpis["total_profit"] for t in thetas]
+  assert _interpolate(segments, thetas) == pytest.approx(exact, rel=1e-6, abs=1e-3)
+  # a sandwich search needs a few solves per breakpoint, far fewer than a grid fine enough to find them
+  assert solves <= 3 * (len(breakpoints(segments)) + 2) + segments.height
+
+
+def test_biomass_breakpoints_are_located(template):
+  segments, _ = parametric_curve("biomass_limit", 0., 0.5, template=template, resolution=1e-3)
+  profits = [solve_model(biomass_limit=t, template=template, outputs={"kpis"}).kpis["total_profit"] for t in (0., 0.5)]
+  assert segments["profit_start"][0] == pytest.approx(profits[0])
+  assert segments["profit_end"][-1] == pytest.approx(profits[1])
+  assert (segments["theta_end"] > segments["theta_start"]).all()
+
+
+@pytest.mark.parametrize("parameter, lo, hi", [("co2_price", 0., 60.), ("so2_bubble_limit", 1_000., 20_000.)])
+def test_highs_traces_the_same_curve(template, parameter, lo, hi):
+  gurobi, _ = parametric_curve(parameter, lo, hi, template=template)
+  highs, _ = parametric_curve(parameter, lo, hi, template=HighsPurchaseModel())
+  thetas = np.linspace(lo, hi, 13)
+  assert _interpolate(highs, thetas) == pytest.approx(_interpolate(gurobi, thetas), rel=1e-6, abs=1e-3)
+
+
+def test_highs_locates_biomass_breakpoints(template):
+  segments, _ = parametric_curve("biomass_limit", 0., 0.5, template=HighsPurchaseModel(), resolution=1e-3)
+  # every breakpoint profit is a point solve of the interval end
+  for theta, profit in segments.select("theta_end", "profit_end").iter_rows():
+    assert profit == pytest.approx(solve_model(biomass_limit=theta, template=template, outputs={"kpis"}).kpis["total_profit"])
+  assert segments.height > 1
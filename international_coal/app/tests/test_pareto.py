@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+from models import CoalPurchaseModel, pareto_frontier, solve_model
+
+
+@pytest.mark.parametrize("emission", ["co2", "so2"])
+def test_adaptive_frontier_interpolates_a_uniform_grid(env, emission):
+  adaptive = pareto_frontier(emission, env=env)
+  grid = pareto_frontier(emission, adaptive=False, n_points=9, env=env)
+  assert adaptive["cap"][-1] == pytest.approx(grid["cap"][-1])
+  between = np.interp(grid["cap"].to_numpy(), adaptive["cap"].to_numpy(), adaptive["total_profit"].to_numpy())
+  assert between == pytest.approx(grid["total_profit"].to_numpy(), rel=1e-6)
+  assert (np.diff(adaptive["marginal_cost"].to_numpy()) <= 1e-6).all()
+
+
+@pytest.mark.parametrize("backend", ["gurobi", "highs"])
+def test_frontier_points_match_direct_capped_solves(env, backend):
+  frontier = pareto_frontier("co2", adaptive=False, n_points=4, backend=backend, env=env)
+  for cap, profit in frontier.select("cap", "total_profit").iter_rows():
+    template = CoalPurchaseModel(env=env)
+    solve_model(template=template, outputs={"kpis"})
+    template.add_cap("CO2_Cap", 0.8 * (template.k * template.cv)[template.col_fuel], cap)
+    template.optimize()
+    assert template.objval == pytest.approx(profit, rel=1e-6)
@@ -0,0 +1,28 @@
+import pytest
+
+from models import run_model, solve_model
+
+
+def test_only_requested_outputs_are_built(template):
+  result = solve_model(template=template, outputs={"kpis"})
+  assert result.kpis["total_profit"] > 0
+  assert "fuel_strategy" not in result.__dict__
+  with pytest.raises(ValueError, match="sensitivity was not captured"):
+    result.sensitivity_var
+
+
+def test_results_do_not_follow_later_solves(template):
+  built_now = solve_model(template=template)
+  tables = built_now.sensitivity_frames
+  built_later = solve_model(template=template)
+  solve_model(co2_price=40., biomass_limit=0.3, template=template)
+  assert built_later.kpis["total_profit"] == built_now.kpis["total_profit"]
+  for name in ("sensitivity_var", "sensitivity_constr"):
+    assert built_later.sensitivity_frames[name].equals(tables[name])
+
+
+def test_legacy_tuple_hands_out_no_live_model(template):
+  model, fuel_strategy, kpis, *_ = run_model(template=template)
+  assert model is None
+  assert fuel_strategy.height == 20
+  assert kpis["total_profit"] == pytest.approx(22_657_167.58)
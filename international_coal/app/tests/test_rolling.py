@@ -0,0 +1,55 @@
+import dataclasses
+
+import pytest
+
+from models import CoalPurchaseModel, rolling_horizon, solve_model, synthetic_instance
+
+INSTANCE = synthetic_instance(5, 24, 6)
+# a third of the stockpile allowance and of the SO2 bubble
+TIGHT = dataclasses.replace(INSTANCE, stockpile_limit=0.3 * INSTANCE.stockpile_limit)
+
+
+def _monolithic(env, instance, **params):
+  return solve_model(template=CoalPurchaseModel(instance, env=env), outputs={"kpis"}, **params).kpis["total_profit"]
+
+
+@pytest.mark.parametrize("backend", ["gurobi", "highs"])
+def test_dual_budget_tracks_the_monolithic_solve(env, backend):
+  optimum = _monolithic(env, INSTANCE)
+  dual = rolling_horizon(step=2, lookahead=2, budget="dual", backend=backend, instance=INSTANCE)
+  pro_rata = rolling_horizon(step=2, lookahead=2, budget="pro_rata", backend=backend, instance=INSTANCE)
+  assert dual["kpis"]["total_profit"] == pytest.approx(optimum, rel=1e-6)
+  assert pro_rata["kpis"]["total_profit"] <= optimum * (1 + 1e-9)
+
+  bubble = 0.3 * TIGHT.so2_bubble_limit
+  optimum = _monolithic(env, TIGHT, so2_bubble_limit=bubble)
+  # four price levels per month for six bands: a genuinely coarse first pass
+  dual = rolling_horizon(step=2, lookahead=2, budget="dual", coarse_bands=4, backend=backend, instance=TIGHT,
+                         so2_bubble_limit=bubble)
+  pro_rata = rolling_horizon(step=2, lookahead=2, budget="pro_rata", backend=backend, instance=TIGHT,
+                             so2_bubble_limit=bubble)
+  assert dual["kpis"]["total_profit"] == pytest.approx(optimum, rel=1e-3)
+  assert dual["kpis"]["total_profit"] > pro_rata["kpis"]["total_profit"]
+
+
+def test_fuel_strategy_is_lazy_with_and_without_out_dir(tmp_path):
+  instance = synthetic_instance(3, 4, 2)
+  in_memory = rolling_horizon(step=2, instance=instance)["fuel_strategy"]
+  on_disk = rolling_horizon(step=2, instance=instance, out_dir=tmp_path)["fuel_strategy"]
+  assert on_disk.collect().sort("month_index", maintain_order=True).equals(in_memory.collect())
+
+
+def test_empty_horizon_is_rejected():
+  empty = dataclasses.replace(INSTANCE, periods=INSTANCE.periods.clear(), unavailable=INSTANCE.unavailable.clear())
+  with pytest.raises(ValueError, match="no months"):
+    rolling_horizon(instance=empty)
+
+
+def test_price_matrix_matches_the_price_dict():
+  instance = synthetic_instance(3, 4, 2)
+  by_cell = rolling_horizon(step=1, lookahead=1, budget="dual", instance=instance, price=instance.price)
+  by_position = rolling_horizon(step=1, lookahead=1, budget="dual", instance=instance, price=instance.price_matrix * 1.1)
+  scaled = rolling_horizon(step=1, lookahead=1, budget="dual", instance=instance,
+                           price={k: 1.1 * v for k, v in instance.price.items()})
+  assert by_position["kpis"]["total_profit"] == pytest.approx(scaled["kpis"]["total_profit"])
+  assert by_position["kpis"]["total_profit"] != pytest.approx(by_cell["kpis"]["total_profit"])
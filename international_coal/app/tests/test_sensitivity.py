@@ -0,0 +1,34 @@
+import polars as pl
+import pytest
+
+from models import CoalPurchaseModel, solve_model, synthetic_instance
+
+
+@pytest.mark.parametrize("instance", [None, synthetic_instance(n_fuels=4, n_months=3, n_bands=4)], ids=["case", "synthetic"])
+def test_indices_match_the_model_names(env, instance):
+  frames = solve_model(template=CoalPurchaseModel(instance, env=env)).sensitivity_frames
+  var = frames["sensitivity_var"]
+  parsed = var["Variable"].str.extract_groups(r"^x\[(?<Fuel>[^,]+),(?<Month>[^,]+),(?<Band>[^\]]+)\]$").struct.unnest()
+  assert var.select("Fuel", "Month", "Band").equals(parsed)
+  constr = frames["sensitivity_constr"]
+  assert constr["Group"].equals(constr["Constraint"].str.replace(r"\[.*$", "").alias("Group"))
+
+
+def test_summary_keeps_binding_rows_and_map_sums_gains(template):
+  full = solve_model(template=template).sensitivity_frames
+  binding = solve_model(summary=True, template=template).sensitivity_frames
+  for name in ("sensitivity_var", "sensitivity_constr"):
+    assert binding[name].equals(full[name].filter(pl.col("Binding")))
+  gains = full["sensitivity_map"].select(pl.col("total_margin_profit_gain").sum()).item()
+  constr = full["sensitivity_constr"].select("Constraint", "Pi (Dual Value)")
+  A = template.model.getA().tocoo()
+  names = pl.DataFrame({
+    "Constraint": template.constr_names.gather(A.row),
+    "Variable": template.var_names.gather(A.col),
+    "Coeff": A.data,
+  })
+  expected = (
+    names.join(constr, on="Constraint").join(full["sensitivity_var"].select("Variable"), on="Variable")
+    .select((pl.col("Coeff").round(5) * pl.col("Pi (Dual Value)")).sum()).item()
+  )
+  assert gains == pytest.approx(expected)
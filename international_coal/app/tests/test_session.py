@@ -0,0 +1,35 @@
+import gurobipy as gp
+import pytest
+
+from models import ModelSession, solve_model
+
+
+@pytest.mark.parametrize("changes, mode", [
+  ({"price": {("June", "WD_peak"): 36.03}}, "repriced"),
+  ({"co2_price": 60.0}, "warm"),
+  ({"biomass_limit": 0.3}, "full"),
+])
+def test_edits_match_a_fresh_solve(template, changes, mode):
+  session = ModelSession(template, outputs={"kpis"})
+  session.solve()
+  result = session.update(**changes)
+  assert session.last_edit["mode"] == mode
+  expected = solve_model(**session.inputs, outputs={"kpis"}).kpis
+  assert result.kpis["total_profit"] == pytest.approx(expected["total_profit"])
+  assert result.kpis["co2_emissions"] == pytest.approx(expected["co2_emissions"])
+
+
+def test_default_template_is_silent(capfd):
+  ModelSession().solve()
+  assert capfd.readouterr().out == ""
+
+
+def test_close_disposes_the_own_environment(template):
+  with ModelSession() as session:
+    session.solve()
+  assert session._env is None
+  with pytest.raises(gp.GurobiError):
+    session.template.model.optimize()
+  given = ModelSession(template)
+  given.close()
+  assert given.solve().kpis["total_profit"] > 0
@@ -0,0 +1,19 @@
+import pytest
+
+from models import CoalPurchaseModel, HighsPurchaseModel, solve_model, synthetic_instance
+
+
+@pytest.mark.parametrize("backend", ["gurobi", "highs"])
+def test_unavailable_triples_get_no_columns(env, backend):
+  instance = synthetic_instance(n_fuels=4, n_months=4, n_bands=3, unavailable_share=0.3, seed=1)
+  unavailable = set(instance.unavailable.rows())
+  assert unavailable
+  template = CoalPurchaseModel(instance, env=env) if backend == "gurobi" else HighsPurchaseModel(instance)
+  F, M, B = len(template.fuels), len(template.months), len(template.bands)
+  assert len(template.var_names) == (F * M - len(unavailable)) * B
+  assert not any(f"x[{f},{m}," in name for f, m in unavailable for name in template.var_names)
+
+  X = solve_model(template=template, outputs={"kpis"}).X
+  assert X.shape == (F, M, B)
+  for f, m in unavailable:
+    assert (X[template.fuels.index(f), template.months.index(m)] == 0).all()
@@ -0,0 +1,36 @@
+import pytest
+
+from models import stochastic_plan
+
+OPTIONS = [
+  {"option": "basic", "so2_reduced_eff": 0.5, "fgd_cost": 200_000.},
+  {"option": "premium", "so2_reduced_eff": 0.9, "fgd_cost": 1_500_000.},
+]
+SCENARIOS = [
+  {"co2_price": 0., "weight": 0.5},
+  {"co2_price": 30., "so2_price": 300., "weight": 0.3},
+  {"co2_price": 60., "weight": 0.2},
+]
+
+
+@pytest.mark.parametrize("options", [(), OPTIONS], ids=["lp", "fgd"])
+def test_extensive_form_and_benders_agree(env, options):
+  extensive = stochastic_plan(SCENARIOS, options, method="extensive", env=env, so2_bubble_limit=6_000.)
+  benders = stochastic_plan(SCENARIOS, options, method="benders", workers=1, env=env, so2_bubble_limit=6_000.)
+  assert benders["fgd_option"] == extensive["fgd_option"]
+  assert benders["stockpile_purchase"] == pytest.approx(extensive["stockpile_purchase"], rel=1e-6)
+  assert benders["expected_profit"] == pytest.approx(extensive["expected_profit"], rel=1e-6)
+  assert benders["gap"] <= 1e-6 * abs(benders["expected_profit"])
+
+
+@pytest.mark.parametrize("max_iterations", [1, 2])
+def test_benders_returns_a_feasible_plan_when_cut_short(env, max_iterations):
+  plan = stochastic_plan(SCENARIOS, OPTIONS, method="benders", workers=1, max_iterations=max_iterations, env=env,
+                         so2_bubble_limit=6_000.)
+  assert plan["iterations"] == max_iterations
+  assert plan["gap"] >= 0
+
+
+def test_benders_needs_an_iteration(env):
+  with pytest.raises(ValueError, match="max_iterations"):
+    stochastic_plan(SCENARIOS, OPTIONS, method="benders", max_iterations=0, env=env)
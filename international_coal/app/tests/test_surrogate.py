@@ -0,0 +1,48 @@
+import numpy as np
+import polars as pl
+import pytest
+
+from models.cli import main as cli_main
+from models.surrogate import SAMPLE_RANGES, Surrogate, load_training, sample_scenarios
+
+
+@pytest.fixture(scope="module")
+def surrogate(tmp_path_factory):
+  out = tmp_path_factory.mktemp("sample")
+  sample_scenarios(200, seed=1).write_parquet(out / "scenarios.parquet")
+  cli_main([str(out / "scenarios.parquet"), "-o", str(out), "--workers", "1", "--tables", "sensitivity_constr"])
+  return Surrogate.fit(load_training([out]), n_estimators=50)
+
+
+def test_sample_covers_so2_price_fgd_and_exchange_rate():
+  sample = sample_scenarios(1_000, seed=0)
+  for name, (lo, hi, *zero) in SAMPLE_RANGES.items():
+    drawn = sample[name].filter(sample[name] != 0)
+    assert drawn.min() >= lo and drawn.max() <= hi
+    # only the inputs with an off share are ever 0
+    assert (sample[name] == 0).mean() == pytest.approx(zero[0] if zero else 0.0, abs=0.05)
+  assert {"so2_price", "so2_reduced_eff", "fgd_cost", "exchange_rate"} <= set(sample.columns)
+
+
+class _Constant:
+  def __init__(self, value):
+    self.value = value
+
+  def predict(self, x, num_threads=0):
+    return np.full(len(x), self.value)
+
+
+def test_predictions_stay_within_physical_bounds(surrogate):
+  binding = next(t for t in surrogate.targets if t.startswith("binding_"))
+  assert surrogate.report["kpi"].to_list() == surrogate.targets
+  # stand-ins for trees that extrapolate past the bounds
+  surrogate.boosters.update({
+    "total_profit": _Constant(-1e6), "so2_emissions": _Constant(-3.), "Biomass": _Constant(-50.), binding: _Constant(1.4),
+  })
+  predicted = surrogate.predict(co2_price=30.)
+  assert predicted["total_profit"] == -1e6
+  assert predicted["so2_emissions"] == 0.0 and predicted["Biomass"] == 0.0
+  assert predicted[binding] == 1.0
+  frame = surrogate.predict_frame(pl.DataFrame({"co2_price": [0., 30.]}))
+  assert frame.select(pl.col("so2_emissions", "Biomass").min()).row(0) == (0.0, 0.0)
+  assert frame[binding].to_list() == [1.0, 1.0]
@@ -0,0 +1,37 @@
+import polars as pl
+import pytest
+
+from models import sweep
+from models.sweep import run_scenarios
+
+
+def test_statuses_are_read_from_the_solver():
+  kpis = run_scenarios([{}, {"so2_bubble_limit": -1.}], workers=1)
+  assert kpis["status"][0] == "optimal"
+  assert kpis["status"][1].startswith("failed: Gurobi: inf")
+  assert kpis["total_profit"][1] is None
+
+
+def test_resume_only_solves_missing_chunks(tmp_path, monkeypatch):
+  scenarios = [{"co2_price": float(p)} for p in range(0, 60, 10)]
+  first = run_scenarios(scenarios, workers=1, chunk_size=2, checkpoint_dir=tmp_path)
+  (tmp_path / "part-00000002.parquet").unlink()
+
+  solved = []
+  solve_chunk = sweep._solve_chunk
+  def counting(chunk, tables=()):
+    solved.extend(i for i, _ in chunk)
+    return solve_chunk(chunk, tables)
+  monkeypatch.setattr(sweep, "_solve_chunk", counting)
+
+  resumed = run_scenarios(scenarios, workers=1, chunk_size=2, checkpoint_dir=tmp_path)
+  assert solved == [2, 3]
+  assert resumed.select("scenario_id", "total_profit").equals(first.select("scenario_id", "total_profit"))
+
+
+def test_process_pool_matches_serial(tmp_path):
+  scenarios = [{"co2_price": float(p)} for p in range(0, 40, 10)]
+  serial = run_scenarios(scenarios, workers=1)
+  parallel = run_scenarios(scenarios, workers=2, chunk_size=1, checkpoint_dir=tmp_path, tables=["fuel_strategy"])
+  assert parallel["total_profit"].to_list() == pytest.approx(serial["total_profit"].to_list())
+  assert pl.read_parquet(tmp_path / "fuel_strategy" / "*.parquet")["scenario_id"].n_unique() == 4